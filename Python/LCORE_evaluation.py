@@ -0,0 +1,284 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import pandas as pd
+import numpy as np
+
+from LCORE_calculator import LCORE_function
+from complete_simulation import complete_sim
+from extra_simplified_simulation import extra_simplified_sim
+from time import perf_counter
+from early_termination import DeficitBoundExceeded, LCOREBound, LCORE_budget
+from representative_days import rep_complete_sim, rep_extra_simplified_sim
+from sim_record import new_record, year_record, to_frame, YEAR_DTYPE
+from degradation_projection import project_degradation
+
+
+'''
+LCORE evaluation of a design
+
+- scenario_setup : sizing lattice and techno-economic parameters of the selected price year
+- design_sizes : component sizes of LCORE_function from the output of the first-year simulation
+- LCORE_evaluation : complete first-year simulation, projection of the degradation, simplified simulation
+                     of the following years and LCORE, for any input dataframe
+                     (a compressed year of representative days, with the 'weight' column, is simulated with
+                     the simulations of representative_days.py)
+
+'''
+
+#%%
+def scenario_setup(year = 2020, prices_file = 'prices_excel.xlsx'):
+    '''
+    year : reference year of the component prices (2020, 2030, 2050)
+    prices_file : Excel file with the component prices
+    
+    returns the scenario dictionary: comp_dict, components, electricity, hydrogen, lifetime, r
+    '''
+    
+    'definition of maximum sizes and simulation resolution for each component'
+    comp_dict = {}
+
+    comp_dict['EL']   = {'max_s': 70,    # EL   (max n cells (9.45 kW) = - kW)
+                         'res': 5      } # EL   (5 cells)
+
+    comp_dict['FC']   = {'max_s': 90,    # FC   (max n cells (13 kW) = - kW)
+                         'res': 5      } # FC   (5 cells)
+
+    comp_dict['Tank']  = {'max_s': 10000,      # Tank (max 10 000 h2 kg)
+                          'res': 100        }  # Tank (100 h2 kg)
+
+    comp_dict['BESS']  = {'max_s': 25000,     # BESS (max 25 000 kWh)
+                          'res': 50        }  # BESS (50 kWh modules)
+
+    comp_dict['PV']   = {'max_s': 200,      # PV   (max + 200 x 10 kWp arrays = 2160 kWp)
+                         'res': 5        }  # PV (extra 10 kWp arrays)
+
+    'definition of economic parameters'
+
+    prices = pd.read_excel(prices_file, sheet_name = ['Li-BESS', 'ALK EL', 'PEM FC', 'H2 Tank', 'PV', 'Onshore WT'],
+                           usecols = 'V:Y', skiprows= [0,1], nrows = 3 )
+
+
+    if year == 2020:
+        k = 0
+    elif year == 2030:
+        k = 1
+    elif year == 2050:
+        k = 2
+
+    EL_cost      = prices['ALK EL']['avg'][k]           # €/kW
+    FC_cost      = prices['PEM FC']['avg'][k]           # €/kW     
+    HP_tank_cost = prices['H2 Tank']['avg'][k]           # €/kg_h2
+    LP_tank_cost = prices['H2 Tank']['avg'][k]           # €/kg_h2
+    bess_cost    = prices['Li-BESS']['avg'][k]           # €/MWh
+    WT_cost      = prices['Onshore WT']['avg'][k]          # €/kW
+    PV_cost      = prices['PV']['avg'][k]           # €/kWp
+
+    comp_cost = 60000    #€/unit
+
+    components = {}
+
+    EN_cost      = 165000 #  #€/MWh    cost of electricity
+
+    components['EL'] = {'total installation costs': EL_cost,        # €/
+                        'OeM': 0.0275*EL_cost,                      # €/kW/y
+                        'lifetime': 10, 'relpacement': 0.4}
+
+    components['FC'] = {'total installation costs': FC_cost,           # €/kW - ref. file 'Costi.xls' 460 €/kg
+                        'OeM': 0.0275*FC_cost,                          # €/kW/h
+                        'lifetime': 10, 'relpacement': 0.4}
+
+    components['BESS'] = {'total installation costs': bess_cost,       # €/MWh
+                          'OeM': 0.025*bess_cost,                      # €/MWh/y
+                          'lifetime': 10, 'relpacement': 0.8}
+
+    components['HP_tank'] = {'total installation costs': HP_tank_cost,      # €/kg
+                            'OeM': 0.01*HP_tank_cost,                       # €/kg/y
+                            'lifetime': 25, 'relpacement': 0}
+
+    components['LP_tank'] = {'total installation costs': LP_tank_cost,      # €/kg
+                            'OeM': 0.01*LP_tank_cost,                       # €/kg/y
+                            'lifetime': 25, 'relpacement': 0}
+
+    components['WT'] = {'total installation costs': WT_cost,           # €/kW - ref. file 'Costi.xls' 460 €/kg
+                         'OeM': 0.025*WT_cost,                                    # €/kW/h
+                         'lifetime': 25, 'relpacement': 0}
+
+    components['PV'] = {'total installation costs': PV_cost,           # €/kW - ref. file 'Costi.xls' 460 €/kg
+                        'OeM': 0.025*PV_cost,                          # €/kW/h
+                        'lifetime': 25, 'relpacement': 0}
+
+    components['compressor'] = {'total installation costs': comp_cost,           # €/kW - ref. file 'Costi.xls' 460 €/kg
+                                'OeM': 0.025*comp_cost,                                    # €/kW/h
+                                'lifetime': 25, 'relpacement': 0, 'size' : 1}
+
+    lifetime = 20       #time horizon of the economic analysis (1 stack substitution, 1 bess substitution, no substitution of RES)
+    r = 0.05     #interest rate
+
+    'energy vectors dictionaries'
+    electricity = {'purchase price from grid': EN_cost, 'sale price to grid': 0}   # electricity dictionary
+    hydrogen = {'sale price': 0}     # hydrogen dictionary
+
+    return {'year': year,
+            'comp_dict': comp_dict,
+            'components': components,
+            'electricity': electricity,
+            'hydrogen': hydrogen,
+            'lifetime': lifetime,
+            'r': r}
+
+
+#%%
+def design_sizes(complete_output):
+    'component sizes of LCORE_function from the output of the first-year simulation'
+    sizes = {}
+    sizes['EL']      =   complete_output['EL_n_cells'][0] * 9.45         # kW
+    sizes['FC']      =   complete_output['FC_n_cells'][0] * 13.57        # kW
+    sizes['BESS']    =   complete_output['BESS[MWh]'][0]         # MWh 
+    sizes['HP_tank'] =   complete_output['HP_tank[kg]'][0]                # kg
+    sizes['LP_tank'] =   complete_output['LP_tank[kg]'][0]                # kg
+    sizes['PV']      =   complete_output['PV_power[kWp]'][0]                # kWp
+    sizes['WT']      =   800                           # kW
+    
+    # if sizes['EL'] == 0 or sizes['FC'] == 0:
+    if complete_output['EL_h_work'][0] == 0 or complete_output['FC_h_work'][0] == 0:
+        sizes['compressor'] = 0
+        
+    else:
+        sizes['compressor'] = 1
+    
+    return sizes
+
+
+def LCORE_evaluation(s, df_data, scenario, full_output = False, profiler = None, incumbent = None, checkpoints = None):
+    '''
+    s : design vector in grid units [EL, FC, BESS, Tank, PV] (scaled in place by the resolutions of comp_dict)
+    df_data : input dataframe (wind_power, PV_power, load, temperature), full or compressed year (compress_year)
+    scenario : dictionary returned by scenario_setup
+    full_output : if True the yearly outputs of the lifetime are returned with the LCORE
+    profiler : optional SimProfiler (sim_profiler.py) filled with the stages of the evaluation ('eval/...')
+               and of the first-year simulation
+    incumbent : optional best LCORE found so far, the simulations are stopped as soon as the LCORE lower bound
+                of the design exceeds it and the bound is returned as LCOREBound (early_termination.py)
+    checkpoints : optional TankCheckpoints (tank_reuse.py), the first year of a design is resumed from the stored
+                  trajectory of a design differing only in the HP tank size
+    '''
+    
+    prof = profiler is not None
+    if prof:
+        t0 = perf_counter()
+    
+    comp_dict   = scenario['comp_dict']
+    components  = scenario['components']
+    electricity = scenario['electricity']
+    hydrogen    = scenario['hydrogen']
+    lifetime    = scenario['lifetime']
+    r           = scenario['r']
+
+    s[0] = s[0] * comp_dict['EL']['res']
+    s[1] = s[1] * comp_dict['FC']['res']
+    s[2] = s[2] * comp_dict['BESS']['res']
+    s[3] = s[3] * comp_dict['Tank']['res']
+    s[4] = s[4] * comp_dict['PV']['res']
+    
+    if 'weight' in df_data.columns:
+        first_year_sim, simplified_sim = rep_complete_sim, rep_extra_simplified_sim
+    else:
+        first_year_sim, simplified_sim = complete_sim, extra_simplified_sim
+        if checkpoints is not None:
+            first_year_sim = checkpoints.simulate
+    
+    'early termination: LCORE lower bound with the sizes known before the simulation (compressor not included)'
+    early_stop = incumbent is not None and np.isfinite(incumbent)
+    E_deficit_max = None
+    if early_stop:
+        sizes_0 = {'EL': s[0] * 9.45, 'FC': s[1] * 13.57, 'BESS': s[2], 'HP_tank': s[3], 'LP_tank': 10,
+                   'PV': 160 * (1 + s[4]/16), 'WT': 800, 'compressor': 0}
+        budget = LCORE_budget(sizes_0, components, electricity, lifetime, hydrogen, r)
+        
+        if budget.base >= incumbent:
+            return (LCOREBound(budget.base), None) if full_output else LCOREBound(budget.base)
+        
+        E_deficit_max = budget.max_deficit(incumbent, [])
+            
+    'complete sumulation of the first year to assess the degradation of components and actual performance indexes'
+    try:
+        if prof and profiler.detail:
+            complete_output, _ = first_year_sim(df_data, s, profiler = profiler, E_deficit_max = E_deficit_max)
+            t0 = profiler.lap('eval/first_year', t0)
+        elif prof:
+            complete_output = first_year_sim(df_data, s, E_deficit_max = E_deficit_max)
+            t0 = profiler.lap('eval/first_year', t0)
+        else:
+            complete_output = first_year_sim(df_data, s, E_deficit_max = E_deficit_max)
+    
+    except DeficitBoundExceeded as e:
+        LCORE = LCOREBound(budget.lower_bound([e.E_deficit]))
+        return (LCORE, None) if full_output else LCORE
+    
+    'components size definition'
+    sizes = design_sizes(complete_output)
+    
+    'future degradated parameters (closed-form projection, degradation_projection.py)'
+    projection = project_degradation(complete_output)
+    Capacity_list = projection['Capacity'][0]       # MWh
+    EL_CF_list = projection['EL_CF'][0]             # kg/MWh
+    FC_CF_list = projection['FC_CF'][0]             # kg/MWh
+    
+    if prof:
+        t0 = profiler.lap('eval/projection', t0)
+    
+    'simplified simulation of fugure years with degradated components'
+    
+    #yearly result records (structured array), converted to a DataFrame only for the full output
+    output_years = new_record(YEAR_DTYPE, 20)
+    output_years[0] = year_record(complete_output)[0]
+    
+    if early_stop:
+        #bound updated with the actual compressor size
+        budget = LCORE_budget(sizes, components, electricity, lifetime, hydrogen, r)
+    
+    for i in range(1,20):
+        if early_stop:
+            E_deficit_max = budget.max_deficit(incumbent, list(output_years['E_H2_deficit[MWh]'][:i]))
+            if E_deficit_max < 0:
+                LCORE = LCOREBound(budget.lower_bound(list(output_years['E_H2_deficit[MWh]'][:i])))
+                return (LCORE, None) if full_output else LCORE
+        
+        try:
+            simp_output_i = simplified_sim(df_data, s, Capacity_list[i], EL_CF_list[i]/1000, FC_CF_list[i]/1000,
+                                                 E_deficit_max = E_deficit_max)
+        except DeficitBoundExceeded as e:
+            LCORE = LCOREBound(budget.lower_bound(list(output_years['E_H2_deficit[MWh]'][:i]) + [e.E_deficit]))
+            return (LCORE, None) if full_output else LCORE
+        
+        output_years[i] = simp_output_i[0]
+            
+    
+    if prof:
+        t0 = profiler.lap('eval/simplified_years', t0)
+    
+    'LCORE'    
+    LCORE = LCORE_function(sizes, output_years['E_H2_deficit[MWh]'], components, electricity , lifetime, hydrogen, r)
+    
+    if prof:
+        profiler.lap('eval/LCORE', t0)
+
+    # print('config: ' + str(s) + '\nLCORE: ' +  str(LCORE), flush = True)
+
+    if full_output:
+        df_output_years = to_frame(output_years)
+        #component sizes of the design, with the yearly deficits they define the LCORE under any cost scenario
+        df_output_years.attrs['sizes'] = sizes
+        return LCORE, df_output_years
+
+    return LCORE
+
+    
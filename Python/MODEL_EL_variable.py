@@ -18,12 +18,17 @@ from scipy import interpolate
 V_array_ideal = np.array([1.64,1.9])
 i_array_ideal = np.array([2,10])              #current density [kA/m2]
 
-def EL_model(T_el, h_work_tot, n_cells, kWh_factor, i_array_ideal = i_array_ideal, V_array_ideal = V_array_ideal):
+#degradation coefficients (module constants, set by sensitivity.py)
+V_degr = 3 * 10 ** -6     # uV/h time voltage increase
+V_T = 5 * 10 ** -3        # 5mV/°C cool down voltage increase
+
+def EL_model(T_el, h_work_tot, n_cells, kWh_factor, i_array_ideal = i_array_ideal, V_array_ideal = V_array_ideal, profiler = None):
     '''
     conv_factor : efficiency of conversion Power to H2.
     f_i_V : Current to voltage function.
     f_H2_i : H2 production to current function.
     V_array : Array containing Min e max voltage.
+    profiler : optional SimProfiler counting the high voltage warnings
     
     full description in section 2.2.1 of https://doi.org/10.1016/j.renene.2023.03.077
     
@@ -34,8 +39,6 @@ def EL_model(T_el, h_work_tot, n_cells, kWh_factor, i_array_ideal = i_array_idea
     H2_design = 18         # [kg/h] nominal produced hydrogen flow from the 1MW module
     
     T_operation = 71
-    V_degr = 3 * 10 ** -6     # uV/h time voltage increase
-    V_T = 5 * 10 ** -3        # 5mV/°C cool down voltage increase
     S_cell = 0.5              # m^2 surface of cells
 
 
@@ -45,6 +48,8 @@ def EL_model(T_el, h_work_tot, n_cells, kWh_factor, i_array_ideal = i_array_idea
     #limit on the time degradation for cell voltage
     if max(V_array - V_T * (T_operation-T_el)) > 2.3:
         print('High voltage, new electrolyzer is needed')   
+        if profiler is not None:
+            profiler.count('EL_high_voltage')
         
     #cell current = stack current 
     I_array     = i_array_ideal*S_cell     
@@ -19,6 +19,10 @@ from scipy import interpolate
 I_array       = [0,40,80,120,160,200,230, 250] 
 V_array_ideal = [94,78,73,69,66,62,59, 57] 
 
+#degradation coefficients of a cell (module constants, set by sensitivity.py)
+V_degr_cell = 5 * 10 ** -6      # uV/h time degradation for dynamic operation   https://doi.org/10.1016/j.ijhydene.2022.04.011
+V_T_cell = 5 * 10 ** -4         # mV/°C temperature degradation                https://doi.org/10.3390/en13123144
+
 def FC_model(T_FC, h_work_tot, n_stacks, kWh_factor, V_array_ideal = V_array_ideal):
     
     '''
@@ -36,8 +40,8 @@ def FC_model(T_FC, h_work_tot, n_stacks, kWh_factor, V_array_ideal = V_array_ide
     FC_CF_nom = 59 / 1000         # kg/kWh 
         
     T_operation = 60              # °C
-    V_degr = 5 * 10 ** -6  * n_cells      # uV/h time degradation for dynamic operation   https://doi.org/10.1016/j.ijhydene.2022.04.011
-    V_T    = 5 * 10 ** -4   * n_cells      # mV/°C temperature degradation                https://doi.org/10.3390/en13123144
+    V_degr = V_degr_cell * n_cells      # uV/h time degradation for dynamic operation
+    V_T    = V_T_cell * n_cells         # mV/°C temperature degradation
 
     #voltage decreases for usage in time and for opeartion at temeprature below nominal conditions
     V_array     = [(V - V_degr * h_work_tot - V_T * (T_operation - T_FC)) for V in V_array_ideal] 
@@ -117,7 +121,8 @@ def FC_transit(H2_req,f_i_V, f_H2_i, T_FC, n_stacks, T_ext, kWh_factor):
     
 
     if H2_req > 0:  
-        I_op = f_H2_i(H2_req)
+        #cold stacks with high temperature degradation need more H2 than the nominal curve at full power: maximum current
+        I_op = f_H2_i(min(H2_req, f_H2_i.x[-1]))
         V_op = f_i_V(I_op)
         q_gain = n_stacks * (V_tn-V_op)*I_op*1000     # [V]*[kA]*1000 = [V]*[A] = [W] produce thermal power
                 
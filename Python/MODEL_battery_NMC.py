@@ -5,6 +5,22 @@ import functools
 import math  
 from scipy import interpolate
 import rainflow
+from time import perf_counter
+
+
+# https://doi.org/10.1016/j.jclepro.2021.129753
+SOC_max = 0.95
+SOC_min = 0.15
+C_rate_C_max = 1
+C_rate_D_max = 3
+
+# https://doi.org/10.1016/j.apenergy.2018.08.058 - cycles to end of life EoL = a * DoD ** b
+EoL_a = 1512.45
+EoL_b = - 0.968423
+
+# https://ieeexplore.ieee.org/document/8770143 - 10.1109/TPWRS.2019.2930450
+coeff_c = [100.968, -0.259233, -6.41535, 0.0799907, 1.84443, 0.255217, -0.563289, -0.171151, 0.0549735]
+coeff_d = [100.147, 0.0997555, -6.07639, -0.24408, 0.150757, 0.0434057, 0.879053, -0.0354527, -0.00266084]
 
 
 '''Function for efficiency variation depending on SOC'''
@@ -22,18 +38,9 @@ def eta(soc, c_rate, coeff):
 
 
 '''Battery operation according to input power'''
-def battery_operation(i, P_RES, P_goal, Capacity, SOC_old, SOH_old, Degr, SOC_day, C_rate_day, kWh_factor):
-    
-    # https://doi.org/10.1016/j.jclepro.2021.129753
-    SOC_max = 0.95
-    SOC_min = 0.15
-    C_rate_C_max = 1
-    C_rate_D_max = 3
-    
-    # https://ieeexplore.ieee.org/document/8770143 - 10.1109/TPWRS.2019.2930450
-    coeff_c = [100.968, -0.259233, -6.41535, 0.0799907, 1.84443, 0.255217, -0.563289, -0.171151, 0.0549735]
-    coeff_d = [100.147, 0.0997555, -6.07639, -0.24408, 0.150757, 0.0434057, 0.879053, -0.0354527, -0.00266084]
+def battery_operation(i, P_RES, P_goal, Capacity, SOC_old, SOH_old, Degr, SOC_day, C_rate_day, kWh_factor, profiler = None):
     
+    #SOC and C-rate limits and efficiency coefficients are module constants (shared with optimal_dispatch.py)
     Cap_actual = Capacity * SOH_old 
     
     P_bess_target = P_RES - P_goal  # the battery must compensate the mismatch between the RES power production and the power target   
@@ -71,7 +78,16 @@ def battery_operation(i, P_RES, P_goal, Capacity, SOC_old, SOH_old, Degr, SOC_da
 
     'daily degradation'
     if (i+1) % kWh_factor*24 == 0:  
-        Degr = Battery_degradation_day(SOC_day, Degr)
+        if profiler is not None:
+            t0 = perf_counter()
+            Degr = Battery_degradation_day(SOC_day, Degr)
+            #rainflow time is removed from the 'battery' stage of the caller
+            dt = perf_counter() - t0
+            profiler.times['degradation'] += dt
+            profiler.times['battery'] -= dt
+            profiler.count('degradation_calls')
+        else:
+            Degr = Battery_degradation_day(SOC_day, Degr)
 
     SOH_new = 1 - 0.3 * Degr
         
@@ -81,9 +97,8 @@ def battery_operation(i, P_RES, P_goal, Capacity, SOC_old, SOH_old, Degr, SOC_da
 '''Daily battery degradation'''
 def Battery_degradation_day(SOC_day, Degr):
     
-    # https://doi.org/10.1016/j.apenergy.2018.08.058
-    a = 1512.45
-    b = - 0.968423
+    a = EoL_a
+    b = EoL_b
     
     #count cycles perfoemd at each DOD
     rainflow_out = rainflow.count_cycles(SOC_day, ndigits=3)
@@ -26,15 +26,16 @@ def eta(soc, c_rate, coeff):
     return eta/100
 
 
+# https://doi.org/10.1016/j.jclepro.2021.129753
+SOC_max = 0.95
+SOC_min = 0.15
+C_rate_C_max = 1
+C_rate_D_max = 3
+
+
 '''Battery operation according to input power'''
 def battery_operation(i, P_RES, P_goal, Capacity, SOC_old, kWh_factor):
     
-    # https://doi.org/10.1016/j.jclepro.2021.129753
-    SOC_max = 0.95
-    SOC_min = 0.15
-    C_rate_C_max = 1
-    C_rate_D_max = 3
-    
     eta_c = 0.995
     eta_d = 0.995
     
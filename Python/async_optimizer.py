@@ -0,0 +1,276 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import os
+import queue
+from multiprocessing import Pool
+from time import perf_counter
+
+import numpy as np
+from scipy.optimize import OptimizeResult
+from scipy.stats import qmc
+
+
+'''
+Asynchronous steady-state differential evolution on integer decision variables
+
+differential_evolution(updating = 'deferred', workers = ...) evaluates a whole generation and waits for its slowest
+design before the next one: designs without hydrogen take a fraction of the time of large EL/FC designs and the
+workers sit idle at the barrier. Here a new trial is sent as soon as a worker is free:
+
+- AsyncDE is an ask/tell interface: ask() gives a trial design, tell(tag, f) inserts its objective in the population,
+  the trial replaces its target as soon as it is not worse (steady state, no generations)
+- trials follow the defaults of differential_evolution: best1bin, dithered mutation (0.5, 1), recombination 0.7,
+  population of popsize * number of variables, Latin hypercube initialization (or an initial population array)
+- designs already evaluated are answered from the history without a new evaluation
+- async_de drives an AsyncDE with a pool of processes keeping all the workers busy, with the stop criterion of
+  differential_evolution (standard deviation of the population energies below atol + tol * |mean|)
+- a failed evaluation (exception in the objective or task lost by the executor) is told as an infinite objective,
+  the search goes on with the other designs
+
+'''
+
+def _evaluate(args):
+    'objective of a design and its evaluation time'
+    fun, x = args
+    t0 = perf_counter()
+    f = fun(x)
+    return f, perf_counter() - t0
+
+
+class AsyncDE:
+    '''
+    bounds : list of (min, max) integer bounds of the decision variables
+    popsize : population size multiplier (population of popsize * number of variables)
+    mutation : differential weight or (min, max) dithering range, drawn for each trial
+    recombination : crossover probability
+    init : 'latinhypercube' or (n, number of variables) array of initial designs
+    seed : seed of the random generator
+    '''
+
+    def __init__(self, bounds, popsize = 15, mutation = (0.5, 1), recombination = 0.7, init = 'latinhypercube', seed = None):
+        self.rng = np.random.default_rng(seed)
+        self.lo = np.array([int(np.ceil(b[0])) for b in bounds])
+        self.hi = np.array([int(np.floor(b[1])) for b in bounds])
+        self.mutation = mutation
+        self.recombination = recombination
+
+        if isinstance(init, str):
+            n_pop = popsize * len(bounds)
+            U = qmc.LatinHypercube(d = len(bounds), seed = self.rng).random(n_pop)
+            population = self.lo + np.floor(U * (self.hi - self.lo + 1))
+        else:
+            population = np.asarray(init, dtype = float)
+        self.population = np.clip(np.rint(population), self.lo, self.hi).astype(int)
+        self.energies = np.full(len(self.population), np.inf)
+        self.evaluated = np.zeros(len(self.population), dtype = bool)
+
+        self.history = {}       # design -> objective
+        self.pending = {}       # tag -> (design, target member)
+        self.n_init = 0         # initial members sent
+        self.n_tags = 0
+        self.nfev = 0
+        self.n_history_hits = 0
+        self.n_improved = 0
+        self.max_hits = 10 * len(self.population)     # consecutive history answers before ask gives up
+
+    def _trial(self):
+        'best1bin trial vector and its target member'
+        candidates = np.flatnonzero(self.evaluated)
+        target = self.rng.choice(candidates)
+        best = self.population[candidates[np.argmin(self.energies[candidates])]]
+        r1, r2 = self.rng.choice(np.delete(np.arange(len(self.population)), target), 2, replace = False)
+
+        F = self.rng.uniform(*self.mutation) if np.ndim(self.mutation) > 0 else self.mutation
+        mutant = best + F * (self.population[r1] - self.population[r2])
+
+        cross = self.rng.random(len(self.lo)) < self.recombination
+        cross[self.rng.integers(len(self.lo))] = True
+        trial = np.where(cross, mutant, self.population[target])
+
+        #out of bounds variables are drawn again in the bounds, as differential_evolution does
+        out = (trial < self.lo) | (trial > self.hi + 1)
+        trial[out] = self.lo[out] + self.rng.random(out.sum()) * (self.hi[out] - self.lo[out] + 1)
+        return np.clip(np.floor(trial), self.lo, self.hi).astype(int), target
+
+    def ask(self):
+        '''
+        returns (tag, design) of the next design to evaluate, or None when a result must be told first
+        (all the initial designs are out and none of them has been evaluated yet) or when only designs of the
+        history are generated
+        '''
+        for _ in range(self.max_hits):
+            if self.n_init < len(self.population):
+                x, target = self.population[self.n_init], self.n_init
+                self.n_init = self.n_init + 1
+            elif self.evaluated.any():
+                x, target = self._trial()
+            else:
+                return None
+
+            key = tuple(int(v) for v in x)
+            tag = self.n_tags
+            self.n_tags = self.n_tags + 1
+            self.pending[tag] = (key, target)
+
+            if key not in self.history:
+                return tag, list(key)
+
+            #design already evaluated: told at once
+            self.n_history_hits = self.n_history_hits + 1
+            self.tell(tag, self.history[key], evaluated = False)
+
+        return None
+
+    def tell(self, tag, f, evaluated = True):
+        'objective f of the design of tag: the design replaces its target member if it is not worse'
+        key, target = self.pending.pop(tag)
+        f = float(f) if np.isfinite(f) else np.inf
+        if evaluated:
+            self.history[key] = f
+            self.nfev = self.nfev + 1
+
+        if not self.evaluated[target]:
+            self.energies[target] = f
+            self.evaluated[target] = True
+        elif f <= self.energies[target]:
+            self.n_improved = self.n_improved + (f < self.energies[target])
+            self.population[target] = key
+            self.energies[target] = f
+
+    @property
+    def x(self):
+        return self.population[np.argmin(self.energies)]
+
+    @property
+    def fun(self):
+        return float(np.min(self.energies))
+
+    def convergence(self, tol = 0.01, atol = 0):
+        'True when the spread of the population energies is below atol + tol * |mean| (differential_evolution)'
+        if not self.evaluated.all() or not np.all(np.isfinite(self.energies)):
+            return False
+        return np.std(self.energies) <= atol + tol * np.abs(np.mean(self.energies))
+
+
+def async_de(fun, bounds, maxiter = 1000, popsize = 15, tol = 0.01, atol = 0, mutation = (0.5, 1), recombination = 0.7,
+             seed = None, init = 'latinhypercube', workers = -1, n_workers = None, maxfev = None, callback = None, disp = False):
+    '''
+    fun : objective function of a design (list of integers), picklable for workers != 1 (LCORE_min_wrapper)
+    bounds : list of (min, max) integer bounds of the decision variables
+    maxiter : evaluation budget in generations of differential_evolution, (maxiter + 1) * population size evaluations
+    maxfev : evaluation budget (overrides maxiter)
+    workers : number of processes (-1 all the cores, 1 evaluations in this process) or an executor with
+              submit(fn, arg) returning futures (concurrent.futures)
+    n_workers : evaluations kept in flight on the executor (required with an executor, ignored otherwise)
+    callback : optional function (x, convergence) called after each told result, the optimization stops if it
+               returns True
+    other inputs : see AsyncDE and differential_evolution
+
+    returns an OptimizeResult with the best design (x) and objective (fun), the final population and energies,
+    the number of evaluations (nfev), of failed evaluations (n_failed), of designs answered by the history
+    (n_history_hits) and the worker utilization (busy time of the workers / (wall time * number of workers))
+    '''
+    opt = AsyncDE(bounds, popsize, mutation, recombination, init, seed)
+    if maxfev is None:
+        maxfev = (maxiter + 1) * len(opt.population)
+
+    done = queue.Queue()
+    pool = None
+    if hasattr(workers, 'submit'):
+        if n_workers is None or n_workers < 1:
+            raise ValueError('async_de with an executor needs the number of evaluations in flight (n_workers >= 1)')
+        def submit(tag, x):
+            #the exception of a failed future is put on the queue instead of being raised in the callback
+            workers.submit(_evaluate, (fun, x)).add_done_callback(
+                lambda future: done.put((tag, future.exception() if future.exception() is not None else future.result())))
+    elif workers == 1:
+        n_workers = 1
+        def submit(tag, x):
+            #as with the pool, an exception of the objective is a failed evaluation and not the end of the run
+            try:
+                result = _evaluate((fun, x))
+            except Exception as e:
+                result = e
+            done.put((tag, result))
+    else:
+        n_workers = os.cpu_count() if workers == -1 else workers
+        pool = Pool(n_workers)
+        def submit(tag, x):
+            pool.apply_async(_evaluate, ((fun, x),), callback = lambda result: done.put((tag, result)),
+                             error_callback = lambda error: done.put((tag, error)))
+
+    t_start = perf_counter()
+    busy = 0
+    n_failed = 0
+    n_flight = 0
+    n_sent = 0
+    message = 'maximum number of function evaluations reached'
+    success = False
+
+    try:
+        while True:
+            #keep every worker busy
+            while n_flight < n_workers and n_sent < maxfev:
+                asked = opt.ask()
+                if asked is None:
+                    break
+                submit(*asked)
+                n_flight = n_flight + 1
+                n_sent = n_sent + 1
+
+            if n_flight == 0:
+                if opt.convergence(tol, atol):
+                    message = 'Optimization terminated successfully.'
+                    success = True
+                elif n_sent < maxfev:
+                    message = 'no new trial designs, all of them already evaluated'
+                break
+
+            tag, result = done.get()
+            n_flight = n_flight - 1
+            if isinstance(result, BaseException):
+                n_failed = n_failed + 1
+                print('async DE: evaluation failed, ' + repr(result), flush = True)
+                opt.tell(tag, np.inf)
+            else:
+                f, t_eval = result
+                busy = busy + t_eval
+                opt.tell(tag, f)
+
+            if disp and opt.nfev % len(opt.population) == 0:
+                print('async DE: ' + str(opt.nfev) + ' evaluations, f(x) = ' + str(opt.fun), flush = True)
+
+            converged = opt.convergence(tol, atol)
+            if callback is not None and callback(opt.x, converged):
+                message = 'callback function requested stop early'
+                break
+            if converged:
+                message = 'Optimization terminated successfully.'
+                success = True
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    wall = perf_counter() - t_start
+
+    return OptimizeResult(x = opt.x,
+                          fun = opt.fun,
+                          population = opt.population.copy(),
+                          population_energies = opt.energies.copy(),
+                          nfev = opt.nfev,
+                          n_failed = n_failed,
+                          nit = opt.nfev // len(opt.population),
+                          n_history_hits = opt.n_history_hits,
+                          utilization = busy / (wall * n_workers) if wall > 0 else 0.0,
+                          success = success,
+                          message = message)
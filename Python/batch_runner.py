@@ -0,0 +1,296 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import pickle
+import queue
+import time
+from multiprocessing import Pool
+
+import numpy as np
+from scipy.optimize import differential_evolution
+
+from LCORE_evaluation import scenario_setup
+from nsga2_optimizer import nsga2
+from eval_server import init_worker, evaluate_design, lattice_bounds
+from warm_start import X_NAMES, warm_start_population
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:         # optional dependency, only needed for parquet outputs
+    pa = None
+    pq = None
+
+
+'''
+Config-driven batch runner
+
+python batch_runner.py sweep.json [--output results.csv] [--workers 8]
+
+The config file (JSON, or TOML with Python >= 3.11) defines the inputs and the work:
+
+    {"data": "df_load_and_power.pkl",                   input dataframe (pickle)
+     "prices": "prices_excel.xlsx", "year": 2020,       cost scenario
+     "scenario": {"r": 0.05, "comp_dict": {"BESS": {"max_s": 10000}}},     overrides of scenario_setup
+     "designs": [[2, 2, 4, 1, 2], [0, 0, 4, 0, 2]],     explicit designs (grid units) and/or
+     "grid": {"EL": [0, 2, 4], "FC": [0, 2], "BESS": {"start": 1, "stop": 100, "step": 10},
+              "Tank": [0, 1], "PV": [0]},               cartesian grid (lists or inclusive ranges)
+     "optimizer": {"method": "DE", "maxiter": 100, "popsize": 15, "seed": 0, "warm_start": ["journal2020.jsonl"]},
+                                                        or {"method": "Pareto", "pop_size": 40, "n_gen": 50}
+     "output": "results.csv",                           .csv (';' separated) or .parquet (requires pyarrow)
+     "workers": -1, "max_in_flight": 64, "chunk_size": 256}
+
+- designs are generated lazily and at most max_in_flight evaluations are queued on the worker pool:
+  the memory does not grow with the size of the sweep
+- each result row is written as soon as its evaluation finishes (csv rows flushed one by one,
+  parquet row groups of chunk_size rows)
+- with an optimizer spec every evaluation of the optimizer is written, the result is printed at the end
+
+'''
+
+KPI_NAMES = ['H2_SC[%]', 'E_H2_excess[MWh]', 'E_H2_deficit[MWh]', 'H2_prod_EL[kg]', 'SOH_final']
+COLUMNS = X_NAMES + ['year', 'LCORE'] + KPI_NAMES + ['time[s]', 'error']
+
+
+def load_config(path):
+    if path.endswith('.toml'):
+        import tomllib          # Python >= 3.11
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    with open(path) as f:
+        return json.load(f)
+
+
+def _update(d, overrides):
+    'recursive update of the scenario dictionaries'
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(d.get(key), dict):
+            _update(d[key], value)
+        else:
+            d[key] = value
+    return d
+
+
+def _axis(spec):
+    'values of a grid variable: list or inclusive range {"start", "stop", "step"}'
+    if isinstance(spec, dict):
+        return range(int(spec['start']), int(spec['stop']) + 1, int(spec.get('step', 1)))
+    return [int(v) for v in spec]
+
+
+def design_stream(config):
+    'explicit designs, then the cartesian grid (generated lazily)'
+    for design in config.get('designs', []):
+        yield [int(v) for v in design]
+    if 'grid' in config:
+        for design in itertools.product(*[_axis(config['grid'][name]) for name in X_NAMES]):
+            yield list(design)
+
+
+def result_row(result):
+    row = dict(zip(X_NAMES, result['config']), year = result['year'], LCORE = result.get('LCORE'),
+               error = result.get('error'))
+    row.update(result.get('kpis', {}))
+    row['time[s]'] = result.get('time')
+    return row
+
+
+#%%
+class ResultWriter:
+    '''
+    path : .csv (';' separated, one flushed line per row) or .parquet (one row group every chunk_size rows)
+    '''
+
+    def __init__(self, path, columns = COLUMNS, chunk_size = 256):
+        self.path = path
+        self.columns = list(columns)
+        self.chunk_size = chunk_size
+        self.n_rows = 0
+
+        if path.endswith('.parquet'):
+            if pa is None:
+                raise ImportError('pyarrow is required to write parquet results')
+            fields = [(col, pa.int64()) for col in X_NAMES + ['year']] + \
+                     [(col, pa.float64()) for col in ['LCORE'] + KPI_NAMES + ['time[s]']] + [('error', pa.string())]
+            self.schema = pa.schema([field for field in fields if field[0] in self.columns])
+            self.writer = pq.ParquetWriter(path, self.schema)
+            self.buffer = []
+        else:
+            self.file = open(path, 'w', newline = '')
+            self.writer = csv.DictWriter(self.file, fieldnames = self.columns, delimiter = ';', extrasaction = 'ignore')
+            self.writer.writeheader()
+            self.buffer = None
+
+    def write(self, row):
+        self.n_rows = self.n_rows + 1
+        if self.buffer is None:
+            self.writer.writerow(row)
+            self.file.flush()
+        else:
+            self.buffer.append(dict((col, row.get(col)) for col in self.columns))
+            if len(self.buffer) >= self.chunk_size:
+                self._flush()
+
+    def _flush(self):
+        if len(self.buffer) > 0:
+            self.writer.write_table(pa.Table.from_pylist(self.buffer, schema = self.schema))
+            self.buffer = []
+
+    def close(self):
+        if self.buffer is None:
+            self.file.close()
+        else:
+            self._flush()
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+#%%
+class BatchRunner:
+    '''
+    df_data : input dataframe
+    scenario : cost scenario (scenario_setup)
+    year : label of the scenario in the results
+    workers : number of worker processes (-1 all the cores, 1 evaluations in this process)
+    max_in_flight : maximum number of queued evaluations
+    '''
+
+    def __init__(self, df_data, scenario, year, workers = -1, max_in_flight = 64):
+        self.year = year
+        self.max_in_flight = max_in_flight
+        init_worker(df_data, {year: scenario})
+        self.processes = os.cpu_count() if workers == -1 else workers
+        self.pool = Pool(self.processes, init_worker, (df_data, {year: scenario})) if self.processes > 1 else None
+
+    def stream(self, designs):
+        'yields the result of each design of the (possibly lazy) iterable as soon as it is evaluated'
+        if self.pool is None:
+            for design in designs:
+                yield evaluate_design((design, self.year))
+            return
+
+        done = queue.Queue()
+        n_flight = 0
+        for design in designs:
+            self.pool.apply_async(evaluate_design, ((design, self.year),), callback = done.put)
+            n_flight = n_flight + 1
+            if n_flight >= self.max_in_flight:
+                yield done.get()
+                n_flight = n_flight - 1
+        while n_flight > 0:
+            yield done.get()
+            n_flight = n_flight - 1
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+
+def run_sweep(config, runner, writer):
+    'evaluates the designs of the config, returns the number of evaluations and errors'
+    n_eval = 0
+    n_error = 0
+    for result in runner.stream(design_stream(config)):
+        writer.write(result_row(result))
+        n_eval = n_eval + 1
+        n_error = n_error + ('error' in result)
+    return n_eval, n_error
+
+
+def run_optimizer(config, runner, writer, scenario):
+    '''
+    optimizer spec of the config ('DE' as main.py, 'Pareto' NSGA-II), each population is a batch of the runner
+    and its new evaluations are written to the results
+
+    returns the OptimizeResult
+    '''
+    spec = dict(config['optimizer'])
+    method = spec.pop('method', 'DE')
+    bounds = [tuple(b) for b in spec.pop('bounds', lattice_bounds(scenario['comp_dict']))]
+    history = {}
+
+    def evaluate_batch(designs):
+        new = []
+        for design in designs:
+            key = tuple(int(round(v)) for v in design)
+            if key not in history and key not in new:
+                new.append(key)
+        for result in runner.stream([list(key) for key in new]):
+            writer.write(result_row(result))
+            history[tuple(result['config'])] = result
+        return [history[tuple(int(round(v)) for v in design)] for design in designs]
+
+    if method == 'Pareto':
+        def batch_map(func, designs):
+            return [([r['LCORE'], -r['kpis']['H2_SC[%]'], r['kpis']['E_H2_excess[MWh]']], dict(r['kpis'], LCORE = r['LCORE']))
+                    if 'error' not in r else ([np.inf, np.inf, np.inf], None) for r in evaluate_batch(list(designs))]
+        return nsga2(None, bounds, workers = batch_map, **spec)
+
+    def batch_map(func, population):
+        return [r.get('LCORE', np.inf) for r in evaluate_batch(list(population))]
+
+    warm_start = spec.pop('warm_start', [])
+    popsize = spec.pop('popsize', 15)
+    init = 'latinhypercube'
+    if len(warm_start) > 0:
+        init = warm_start_population(warm_start, bounds, scenario, n_pop = popsize * len(bounds), seed = spec.get('seed'))
+
+    return differential_evolution(lambda x: np.inf, bounds, integrality = [True] * len(bounds),
+                                  updating = 'deferred', workers = batch_map, popsize = popsize, init = init,
+                                  polish = False, **spec)
+
+
+#%%
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description = 'batch evaluation of designs or optimization from a config file')
+    parser.add_argument('config', help = 'JSON (or TOML) config file')
+    parser.add_argument('--output', default = None, help = 'results file (.csv or .parquet), overrides the config')
+    parser.add_argument('--workers', type = int, default = None, help = 'worker processes, overrides the config')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    output = args.output if args.output is not None else config.get('output', 'results.csv')
+    workers = args.workers if args.workers is not None else config.get('workers', -1)
+    year = config.get('year', 2020)
+
+    with open(config.get('data', 'df_load_and_power.pkl'), 'rb') as f:
+        df_data = pickle.load(f)
+
+    scenario = _update(scenario_setup(year, config.get('prices', 'prices_excel.xlsx')), config.get('scenario', {}))
+
+    start_time = time.time()
+    runner = BatchRunner(df_data, scenario, year, workers, config.get('max_in_flight', 64))
+    try:
+        with ResultWriter(output, chunk_size = config.get('chunk_size', 256)) as writer:
+            if 'optimizer' in config:
+                result = run_optimizer(config, runner, writer, scenario)
+                print(result.message, flush = True)
+                print('x: ' + str([[int(v) for v in x] for x in np.atleast_2d(result.x)]), flush = True)
+                print('fun: ' + str(result.fun if 'fun' in result else result.F), flush = True)
+            else:
+                n_eval, n_error = run_sweep(config, runner, writer)
+                print(str(n_eval) + ' designs evaluated, ' + str(n_error) + ' errors', flush = True)
+    finally:
+        runner.close()
+
+    print('results: ' + output + ' (' + str(writer.n_rows) + ' rows)')
+    print("--- %s seconds ---" % (time.time() - start_time))
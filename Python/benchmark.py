@@ -0,0 +1,304 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+import scipy
+
+from synthetic_data import synthetic_year
+from complete_simulation import complete_sim
+from extra_simplified_simulation import extra_simplified_sim
+from MODEL_battery_NMC import battery_operation, Battery_degradation_day
+from MODEL_EL_variable import EL_model, EL_transit
+from MODEL_FC_variable import FC_model, FC_transit
+from LCORE_calculator import LCORE_function
+from LCORE_evaluation import scenario_setup, LCORE_evaluation
+
+
+'''
+Benchmark suite of the simulation models on deterministic synthetic years
+
+- throughput (steps/s or calls/s) and peak memory of each model
+- scaling of the simulations with the horizon length
+- results saved as JSON to compare performance across commits:
+
+    python benchmark.py --days 1 7 30
+    python benchmark.py --compare benchmark_results/old.json benchmark_results/new.json
+
+'''
+
+kWh_factor = 60
+
+design_grid = [6, 8, 40, 20, 8]      # [EL, FC, BESS, Tank, PV] in grid units of comp_dict
+design      = [30, 40, 2000, 2000, 40]  # same design in the units of the simulations
+
+
+#%%
+'measurement'
+
+def measure(fun, memory = True):
+    '''
+    fun : function without arguments returning the number of performed steps (or calls)
+
+    returns wall time [s], throughput [steps/s] and peak memory allocated by Python [MB]
+    (memory is measured in a second run, since tracemalloc slows down the execution)
+    '''
+    t0 = time.perf_counter()
+    n_steps = fun()
+    dt = time.perf_counter() - t0
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fun()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak = peak / 1e6
+
+    return {'n_steps': int(n_steps),
+            'time_s': dt,
+            'steps_per_s': n_steps / dt if dt > 0 else np.inf,
+            'peak_memory_MB': peak}
+
+
+#%%
+'benchmark cases'
+
+def case_complete_sim(df_data):
+    def run():
+        complete_sim(df_data, list(design))
+        return len(df_data)
+    return run
+
+
+def case_extra_simplified_sim(df_data):
+    def run():
+        extra_simplified_sim(df_data, list(design), design[2], 0.017, 0.062)
+        return len(df_data)
+    return run
+
+
+def case_battery_operation(df_data):
+    P_RES = (df_data['wind_power'] + df_data['PV_power']).to_numpy()
+    P_load = df_data['load'].to_numpy()
+    def run():
+        SOC, SOH, Degr = 0.4, 1, 0
+        SOC_day, C_rate_day = [0], [0]
+        for i in range(len(P_RES)):
+            _, SOC, SOH, Degr, C_rate_C, C_rate_D = battery_operation(i, P_RES[i], P_load[i], Capacity = design[2],
+                                                                      SOC_old = SOC, SOH_old = SOH, Degr = Degr,
+                                                                      SOC_day = SOC_day, C_rate_day = C_rate_day,
+                                                                      kWh_factor = kWh_factor)
+            SOC_day.append(SOC)
+            C_rate_day.append(C_rate_C + C_rate_D)
+            if (i+1) % kWh_factor*24 == 0:
+                SOC_day, C_rate_day = [], []
+        return len(P_RES)
+    return run
+
+
+def case_Battery_degradation_day(df_data):
+    #daily SOC profiles of a battery following the RES - load mismatch
+    n_day = 24 * kWh_factor
+    n_days = max(len(df_data) // n_day, 1)
+    mismatch = (df_data['wind_power'] + df_data['PV_power'] - df_data['load']).to_numpy()
+    SOC = np.clip(0.5 + np.cumsum(mismatch) / kWh_factor / design[2] * 0.1, 0.15, 0.95)
+    days = [list(SOC[d*n_day:(d+1)*n_day]) for d in range(n_days)]
+    def run():
+        Degr = 0
+        for SOC_day in days:
+            Degr = Battery_degradation_day(SOC_day, Degr)
+        return len(days)
+    return run
+
+
+def case_EL(df_data):
+    T_ext = df_data['temperature'].to_numpy()
+    def run():
+        T, h = 71, 0
+        for i in range(len(T_ext)):
+            CF, f_i_V, f_H2_i, _ = EL_model(T, h, design[0], kWh_factor)
+            H2 = 0.5 * design[0] * 9.45 * CF / kWh_factor if i % 2 == 0 else 0
+            T = EL_transit(H2, f_i_V, f_H2_i, T, design[0], T_ext[i], kWh_factor)
+            h = h + (1/kWh_factor if H2 > 0 else 0)
+        return len(T_ext)
+    return run
+
+
+def case_FC(df_data):
+    T_ext = df_data['temperature'].to_numpy()
+    def run():
+        T, h = 60, 0
+        for i in range(len(T_ext)):
+            CF, f_i_V, f_H2_i = FC_model(T, h, design[1], kWh_factor)
+            H2 = 0.5 * design[1] * 13.57 * CF / kWh_factor if i % 2 == 0 else 0
+            T = FC_transit(H2, f_i_V, f_H2_i, T, design[1], T_ext[i], kWh_factor)
+            h = h + (1/kWh_factor if H2 > 0 else 0)
+        return len(T_ext)
+    return run
+
+
+def case_LCORE_function(scenario, n_calls = 1000):
+    sizes = {'EL': design[0] * 9.45, 'FC': design[1] * 13.57, 'BESS': design[2], 'HP_tank': design[3],
+             'LP_tank': 10, 'PV': 160 * (1 + design[4] / 16), 'WT': 800, 'compressor': 1}
+    E_def_list = list(np.linspace(100, 150, scenario['lifetime']))
+    def run():
+        for _ in range(n_calls):
+            LCORE_function(sizes, E_def_list, scenario['components'], scenario['electricity'],
+                           scenario['lifetime'], scenario['hydrogen'], scenario['r'])
+        return n_calls
+    return run
+
+
+def case_LCORE_evaluation(df_data, scenario):
+    def run():
+        LCORE_evaluation(list(design_grid), df_data, scenario)
+        return len(df_data) * scenario['lifetime']
+    return run
+
+
+#%%
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output = True, text = True,
+                             cwd = os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() if out.returncode == 0 else 'unknown'
+    except OSError:
+        return 'unknown'
+
+
+def run_benchmarks(horizons = (1, 7, 30), seed = 0, memory = True, lcore_days = 7, cases = None):
+    '''
+    horizons : lengths [days] of the synthetic years used for the simulation benchmarks
+    seed : seed of the synthetic years
+    memory : measure the peak memory of each case
+    lcore_days : horizon [days] of the end-to-end LCORE evaluation (1 complete + 19 simplified simulations)
+    cases : names of the cases to run (all if None)
+
+    returns the dictionary saved as JSON
+    '''
+    scenario = scenario_setup(2020, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prices_excel.xlsx'))
+
+    sim_cases = {'complete_sim': case_complete_sim,
+                 'extra_simplified_sim': case_extra_simplified_sim,
+                 'battery_operation': case_battery_operation,
+                 'Battery_degradation_day': case_Battery_degradation_day,
+                 'EL_model+EL_transit': case_EL,
+                 'FC_model+FC_transit': case_FC}
+
+    results = []
+
+    def record(name, days, res):
+        res = dict(res, name = name, horizon_days = days)
+        results.append(res)
+        print('%-26s %6s days  %10.0f steps/s  %8.3f s  peak %s MB' % (name, '-' if days is None else days, res['steps_per_s'], res['time_s'],
+              'n/a' if res['peak_memory_MB'] is None else '%.1f' % res['peak_memory_MB']), flush = True)
+
+    for days in horizons:
+        df_data = synthetic_year(n_days = days, kWh_factor = kWh_factor, seed = seed)
+        for name, case in sim_cases.items():
+            if cases is None or name in cases:
+                record(name, days, measure(case(df_data), memory))
+
+    if cases is None or 'LCORE_function' in cases:
+        record('LCORE_function', None, measure(case_LCORE_function(scenario), memory))
+
+    if cases is None or 'LCORE_evaluation' in cases:
+        df_data = synthetic_year(n_days = lcore_days, kWh_factor = kWh_factor, seed = seed)
+        record('LCORE_evaluation', lcore_days, measure(case_LCORE_evaluation(df_data, scenario), memory))
+
+    'scaling with the horizon: exponent of time ~ steps^p (p = 1 linear scaling)'
+    scaling = {}
+    df_res = pd.DataFrame(results)
+    for name, group in df_res.groupby('name'):
+        group = group.dropna(subset = ['horizon_days'])
+        if len(group['horizon_days'].unique()) > 1:
+            p = np.polyfit(np.log(group['n_steps']), np.log(group['time_s']), 1)[0]
+            scaling[name] = float(p)
+
+    return {'meta': {'commit': git_commit(),
+                     'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                     'python': platform.python_version(),
+                     'numpy': np.__version__,
+                     'pandas': pd.__version__,
+                     'scipy': scipy.__version__,
+                     'machine': platform.platform(),
+                     'processor': platform.processor(),
+                     'seed': seed,
+                     'design': design},
+            'results': results,
+            'scaling': scaling}
+
+
+def compare(file_old, file_new):
+    'throughput ratio new/old of the cases in common (> 1 faster)'
+
+    with open(file_old) as f:
+        old = json.load(f)
+    with open(file_new) as f:
+        new = json.load(f)
+
+    df_old = pd.DataFrame(old['results']).set_index(['name', 'horizon_days'])
+    df_new = pd.DataFrame(new['results']).set_index(['name', 'horizon_days'])
+
+    df_cmp = pd.DataFrame()
+    df_cmp['old[steps/s]'] = df_old['steps_per_s']
+    df_cmp['new[steps/s]'] = df_new['steps_per_s']
+    df_cmp['speed-up'] = df_cmp['new[steps/s]'] / df_cmp['old[steps/s]']
+    df_cmp['old_peak[MB]'] = df_old['peak_memory_MB']
+    df_cmp['new_peak[MB]'] = df_new['peak_memory_MB']
+    df_cmp = df_cmp.dropna(subset = ['speed-up'])
+
+    print('old: ' + old['meta']['commit'] + '   new: ' + new['meta']['commit'])
+    print(df_cmp.to_string())
+
+    return df_cmp
+
+
+#%%
+if __name__ == "__main__":
+
+    warnings.filterwarnings('ignore')
+
+    parser = argparse.ArgumentParser(description = 'benchmark of the simulation models on synthetic years')
+    parser.add_argument('--days', type = int, nargs = '+', default = [1, 7, 30], help = 'horizons of the synthetic years [days]')
+    parser.add_argument('--lcore-days', type = int, default = 7, help = 'horizon of the end-to-end LCORE evaluation [days]')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--cases', nargs = '+', default = None, help = 'subset of the benchmark cases')
+    parser.add_argument('--no-memory', action = 'store_true', help = 'skip the peak memory measurement')
+    parser.add_argument('--output', default = None, help = 'JSON file of the results')
+    parser.add_argument('--compare', nargs = 2, metavar = ('OLD', 'NEW'), help = 'compare two JSON result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+
+    else:
+        bench = run_benchmarks(args.days, args.seed, not args.no_memory, args.lcore_days, args.cases)
+
+        output = args.output
+        if output is None:
+            os.makedirs('benchmark_results', exist_ok = True)
+            output = os.path.join('benchmark_results', 'benchmark_' + bench['meta']['commit'] + '.json')
+
+        with open(output, 'w') as f:
+            json.dump(bench, f, indent = 2)
+
+        print('scaling exponents: ' + str(bench['scaling']))
+        print('results saved in ' + output)
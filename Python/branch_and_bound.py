@@ -0,0 +1,207 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import heapq
+import os
+from multiprocessing import Pool
+
+import numpy as np
+from scipy.optimize import OptimizeResult
+
+
+'''
+Deterministic branch-and-bound search on a bounded integer lattice
+
+- the lattice is split into boxes [lo, hi] (inclusive, grid units)
+- every box gets a lower bound of the objective, computed without simulating its designs
+- boxes whose lower bound exceeds the best design found so far (incumbent) are pruned as a whole
+- the frontier is processed in batches: the best boxes of the queue are bisected and the bounds of their children
+  are computed together, boxes reduced to a single design are evaluated with the exact objective a batch at a time
+  (bounds and evaluations in parallel with workers)
+- the search ends with the optimum, or with the optimality gap (incumbent - lowest bound of the open boxes) when
+  the evaluation budget is reached
+
+The optimum and the gap are certified only as far as lower_bound is a true bound of the objective: with a bound
+resting on modelling assumptions (monotonic deficit) they hold under those assumptions.
+
+'''
+
+def _box_bound(args):
+    'lower bound of a box (mapped over the workers)'
+    lower_bound, lo, hi = args
+    return lower_bound(lo, hi)
+
+
+def branch_and_bound(fun, lower_bound, bounds, branch_order = None, x0 = None, max_eval = np.inf, tol = 0, disp = False,
+                     workers = 1, batch = None, certified = True):
+    '''
+    fun : exact objective, called on single lattice points (list of int)
+    lower_bound : function (lo, hi) -> value <= fun(s) for every s in the box lo <= s <= hi
+    bounds : list of (min, max) integer bounds of the decision variables
+    branch_order : order in which variables are split, a variable is split until it is fixed before moving to the next one.
+                   Variables not listed are split afterwards, widest range first.
+    x0 : optional starting design, evaluated first to provide an initial incumbent
+    max_eval : maximum number of exact evaluations, the search stops with a gap when it is reached
+    tol : absolute tolerance, boxes with lower bound >= incumbent - tol are pruned
+    workers : number of parallel processes (-1 all the available cores) or a map-like callable, used for the
+              exact evaluations and for the bounds (lower_bound picklable for processes)
+    batch : boxes bisected and designs evaluated together (default the number of processes)
+    certified : False if lower_bound holds only under modelling assumptions (optimum and gap under those assumptions)
+
+    returns an OptimizeResult with the best design (x), its objective (fun), the lower bound of the lattice (lower_bound),
+    the optimality gap (gap = 0 when the search is completed), the exact and bound evaluations (nfev, nbev)
+
+    '''
+
+    lo0 = [int(np.ceil(b[0])) for b in bounds]
+    hi0 = [int(np.floor(b[1])) for b in bounds]
+    n_var = len(bounds)
+
+    if branch_order is None:
+        branch_order = []
+
+    x_best = None
+    f_best = np.inf
+    nfev = 0
+    nbev = 0
+    n_pruned = 0
+
+    if callable(workers):
+        mapper = workers
+        pool = None
+    elif workers == 1:
+        mapper = map
+        pool = None
+    else:
+        pool = Pool(None if workers == -1 else workers)
+        mapper = pool.map
+
+    if batch is None:
+        batch = 1 if workers == 1 else (os.cpu_count() if workers == -1 or callable(workers) else workers)
+
+    def evaluate(designs):
+        nonlocal x_best, f_best, nfev
+        if len(designs) == 0:
+            return
+        results = list(mapper(fun, [list(s) for s in designs]))
+        nfev = nfev + len(designs)
+        for s, f in zip(designs, results):
+            if f < f_best:
+                x_best = list(s)
+                f_best = f
+                if disp:
+                    print('BnB incumbent: ' + str(x_best) + ' objective: ' + str(f_best), flush = True)
+
+    def split_variable(lo, hi):
+        #ordered variables first
+        for j in branch_order:
+            if hi[j] > lo[j]:
+                return j
+        #then the widest range
+        widths = [hi[j] - lo[j] for j in range(n_var)]
+        return int(np.argmax(widths))
+
+    if x0 is not None:
+        evaluate([[int(v) for v in x0]])
+
+    'best-first search: the boxes with the lowest bound are always explored first'
+    counter = 0     #tie breaker for boxes with equal bound
+    queue = [(lower_bound(lo0, hi0), counter, lo0, hi0)]
+    nbev = nbev + 1
+    pending = []    #single designs waiting for the exact evaluation (bound, design)
+
+    try:
+        while (len(queue) > 0 or len(pending) > 0) and nfev < max_eval:
+
+            'frontier: the best batch boxes of the queue, single designs collected and the other boxes bisected'
+            children = []
+            n_popped = 0
+            while len(queue) > 0 and n_popped < batch and len(pending) < batch:
+
+                lb, _, lo, hi = heapq.heappop(queue)
+                n_popped = n_popped + 1
+
+                #pruning of the whole box
+                if lb >= f_best - tol:
+                    n_pruned = n_pruned + 1
+                    continue
+
+                #single design: exact evaluation (not beyond the evaluation budget, the box stays open)
+                if lo == hi:
+                    if nfev + len(pending) >= max_eval:
+                        counter = counter + 1
+                        heapq.heappush(queue, (lb, counter, lo, hi))
+                        break
+                    if lo != x_best and all(lo != s for _, s in pending):
+                        pending.append((lb, lo))
+                    continue
+
+                #bisection of the box along the selected variable
+                j = split_variable(lo, hi)
+                mid = (lo[j] + hi[j]) // 2
+
+                hi_left = list(hi)
+                hi_left[j] = mid
+                lo_right = list(lo)
+                lo_right[j] = mid + 1
+
+                children += [(lb, lo, hi_left), (lb, lo_right, hi)]
+
+            'bounds of the children, in parallel'
+            if len(children) > 0:
+                lbs = list(mapper(_box_bound, [(lower_bound, lo_c, hi_c) for _, lo_c, hi_c in children]))
+                nbev = nbev + len(children)
+
+                for (lb, lo_c, hi_c), lb_c in zip(children, lbs):
+                    #the bound of a child can not be lower than the bound of its parent
+                    lb_c = max(lb_c, lb)
+
+                    if lb_c < f_best - tol:
+                        counter = counter + 1
+                        heapq.heappush(queue, (lb_c, counter, lo_c, hi_c))
+                    else:
+                        n_pruned = n_pruned + 1
+
+            'exact evaluation of a batch of single designs (or of the last ones), pruned again with the current incumbent'
+            if len(pending) >= batch or len(children) == 0:
+                n_pruned = n_pruned + sum(1 for lb, _ in pending if lb >= f_best - tol)
+                evaluate([s for lb, s in pending if lb < f_best - tol])
+                pending = []
+
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    'lower bound on the whole lattice'
+    if len(queue) > 0 or len(pending) > 0:
+        lb_open = min([item[0] for item in queue] + [lb for lb, _ in pending])
+        lb_global = min(lb_open, f_best)
+    else:
+        lb_global = f_best
+
+    gap = f_best - lb_global
+
+    if gap <= tol:
+        message = 'optimum certified on the lattice' + ('' if certified else ' (under the assumptions of the lower bound)')
+    else:
+        message = 'maximum number of evaluations reached, optimality gap: ' + str(gap) + \
+                  ('' if certified else ' (under the assumptions of the lower bound)')
+
+    return OptimizeResult(x = np.array(x_best) if x_best is not None else None,
+                          fun = f_best,
+                          lower_bound = lb_global,
+                          gap = gap,
+                          success = gap <= tol,
+                          message = message,
+                          nfev = nfev,
+                          nbev = nbev,
+                          n_pruned = n_pruned,
+                          n_open = len(queue))
@@ -0,0 +1,501 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import argparse
+import importlib.util
+import itertools
+import os
+import pickle
+import socket
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from concurrent.futures import Future, InvalidStateError
+from multiprocessing import Process
+from multiprocessing.connection import Client, Listener
+
+
+'''
+Distributed evaluation of the designs on the worker processes of any number of nodes
+
+- Broker : work queue in the process of the optimizer, listening on a TCP address (localhost by default, the
+  address of an interface of the node, or ('0.0.0.0', port), to accept the workers of other nodes) or on a Unix
+  socket path (local tests); the worker processes connect, pull one task at a time (function and design vector)
+  and push back the result record
+- the broker and the workers share an authentication key: there is no default key, the connections carry
+  pickled functions and results, so the key must be kept secret
+- the workers send a heartbeat while evaluating: a worker silent for heartbeat_timeout seconds (node down,
+  network lost) or a task running for more than task_timeout seconds is re-queued at the front of the queue,
+  up to max_retries times (the first result of a task is kept, late duplicates are discarded)
+- broker(fn, iterable) is a map-like callable (differential_evolution(workers = broker), nsga2), submit(fn, arg)
+  returns a concurrent.futures.Future (executor of async_de)
+- the function of a map is sent once to each worker, the objective of the optimizer must be importable on the
+  nodes: the script of the optimizer is imported as __main__ by the workers (--main, as the spawn start method
+  of multiprocessing does), with its input files in the working directory of the node
+
+python broker.py --address node0:6000 --authkey <shared key> --processes -1 --main main.py
+
+'''
+
+FUNCTION_CACHE = 8          # functions kept by each worker (same eviction order on the broker)
+
+
+def _check_authkey(authkey):
+    'the shared key must be given (an empty key would disable the authentication of the connections)'
+    if not authkey:
+        raise ValueError('an authkey shared by the broker and the workers is required')
+    return authkey if isinstance(authkey, bytes) else authkey.encode()
+
+
+def parse_address(text):
+    "'host:port' -> (host, port), anything else is the path of a Unix socket"
+    host, _, port = text.rpartition(':')
+    if host and port.isdigit():
+        return (host, int(port))
+    return text
+
+
+class Broker:
+    '''
+    address : (host, port) of the listener, port 0 for any free port, or the path of a Unix socket (default
+              localhost, ('0.0.0.0', port) to accept the workers of other nodes)
+    authkey : shared key of the broker and of the workers (bytes or str), required
+    heartbeat_timeout : seconds without messages after which a worker is lost and its tasks re-queued
+    task_timeout : optional seconds after which a running task is re-queued to another worker
+    max_retries : re-queues of a task before it fails
+    poll : seconds an idle worker waits on the queue before asking again
+    '''
+
+    def __init__(self, address = ('127.0.0.1', 6000), *, authkey, heartbeat_timeout = 30,
+                 task_timeout = None, max_retries = 3, poll = 1.0):
+        authkey = _check_authkey(authkey)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.task_timeout = task_timeout
+        self.max_retries = max_retries
+        self.poll = poll
+
+        self.lock = threading.Condition()
+        self.pending = deque()
+        self.tasks = {}
+        self.jobs = {}
+        self.workers = {}
+        self.closed = False
+        self._ids = itertools.count()
+        self.n_done = 0
+        self.n_failed = 0
+        self.n_requeued = 0
+        self.n_duplicates = 0
+        self.n_lost = 0
+
+        self.listener = Listener(address, authkey = authkey)
+        self.address = self.listener.address
+        threading.Thread(target = self._accept, daemon = True).start()
+        threading.Thread(target = self._reap, daemon = True).start()
+
+    #%%
+    'optimizer side'
+
+    def _job(self, fn):
+        'job of the function (one per map, reused while its tasks are running)'
+        for job_id, job in self.jobs.items():
+            if job['fn'] is fn:
+                return job_id
+        job_id = next(self._ids)
+        self.jobs[job_id] = {'fn': fn, 'tasks': 0}
+        return job_id
+
+    def _submit(self, job_id, arg):
+        task_id = next(self._ids)
+        future = Future()
+        self.tasks[task_id] = {'job': job_id, 'arg': arg, 'future': future, 'attempts': 0, 'worker': None, 'start': None}
+        self.jobs[job_id]['tasks'] = self.jobs[job_id]['tasks'] + 1
+        self.pending.append(task_id)
+        return future
+
+    def submit(self, fn, arg):
+        'evaluation of fn(arg) on a worker, returns its Future'
+        with self.lock:
+            if self.closed:
+                raise RuntimeError('broker closed')
+            future = self._submit(self._job(fn), arg)
+            self.lock.notify_all()
+        return future
+
+    def __call__(self, fn, iterable):
+        'map-like: [fn(x) for x in iterable] evaluated by the workers'
+        with self.lock:
+            if self.closed:
+                raise RuntimeError('broker closed')
+            job_id = self._job(fn)
+            futures = [self._submit(job_id, x) for x in iterable]
+            self.lock.notify_all()
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    map = __call__
+
+    @property
+    def n_workers(self):
+        with self.lock:
+            return sum(1 for w in self.workers.values() if not w['lost'])
+
+    def wait_workers(self, n = 1, timeout = None):
+        'waits until n workers are connected (False after timeout seconds)'
+        t_end = time.time() + timeout if timeout is not None else None
+        with self.lock:
+            while sum(1 for w in self.workers.values() if not w['lost']) < n:
+                remaining = t_end - time.time() if t_end is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.lock.wait(remaining)
+        return True
+
+    def info(self):
+        'connected and lost workers, completed, failed, re-queued and duplicated tasks, tasks of each worker'
+        with self.lock:
+            return {'workers': sum(1 for w in self.workers.values() if not w['lost']), 'lost': self.n_lost,
+                    'queued': len(self.pending), 'running': sum(len(w['tasks']) for w in self.workers.values()),
+                    'done': self.n_done, 'failed': self.n_failed, 'requeued': self.n_requeued,
+                    'duplicates': self.n_duplicates,
+                    'per_worker': dict((w['name'], {'done': w['done'], 'busy': w['busy']}) for w in self.workers.values())}
+
+    def close(self):
+        'stops the workers (at their next request) and the listener, pending tasks are cancelled'
+        with self.lock:
+            self.closed = True
+            futures = [task['future'] for task in self.tasks.values()]
+            self.lock.notify_all()
+        for future in futures:
+            future.cancel()
+        self.listener.close()
+
+    #%%
+    'queue'
+
+    def _finish(self, task_id):
+        'removes a completed task (lock held), returns it'
+        task = self.tasks.pop(task_id)
+        if task['worker'] in self.workers:
+            self.workers[task['worker']]['tasks'].discard(task_id)
+        job = self.jobs[task['job']]
+        job['tasks'] = job['tasks'] - 1
+        if job['tasks'] == 0:
+            del self.jobs[task['job']]
+        return task
+
+    def _requeue(self, task_id, reason):
+        'running task back at the front of the queue (lock held), failed after max_retries'
+        task = self.tasks.get(task_id)
+        if task is None:
+            return None
+        if task['worker'] in self.workers:
+            self.workers[task['worker']]['tasks'].discard(task_id)
+        task['worker'] = None
+        if task['attempts'] > self.max_retries:
+            self._finish(task_id)
+            self.n_failed = self.n_failed + 1
+            return task['future'], RuntimeError('task ' + reason + ' ' + str(task['attempts']) + ' times')
+        self.pending.appendleft(task_id)
+        self.n_requeued = self.n_requeued + 1
+        self.lock.notify_all()
+        return None
+
+    def _next(self, worker_id):
+        'next task of a worker (waits up to poll seconds), None if the queue is empty'
+        with self.lock:
+            t_end = time.time() + self.poll
+            while not self.closed:
+                while self.pending:
+                    task_id = self.pending.popleft()
+                    task = self.tasks.get(task_id)
+                    if task is None:
+                        continue
+                    if task['future'].cancelled():
+                        self._finish(task_id)
+                        continue
+                    w = self.workers[worker_id]
+                    task['attempts'] = task['attempts'] + 1
+                    task['worker'] = worker_id
+                    task['start'] = time.time()
+                    w['tasks'].add(task_id)
+
+                    #function sent once to each worker
+                    fn = None
+                    if task['job'] not in w['jobs']:
+                        fn = self.jobs[task['job']]['fn']
+                        w['jobs'][task['job']] = True
+                        while len(w['jobs']) > FUNCTION_CACHE:
+                            w['jobs'].popitem(last = False)
+                    return ('task', task_id, task['job'], fn, task['arg'])
+
+                remaining = t_end - time.time()
+                if remaining <= 0:
+                    return None
+                self.lock.wait(remaining)
+            return None
+
+    def _complete(self, worker_id, task_id, ok, value, t_eval):
+        with self.lock:
+            w = self.workers[worker_id]
+            w['tasks'].discard(task_id)
+            w['busy'] = w['busy'] + t_eval
+            task = self.tasks.get(task_id)
+            if task is None:
+                #late result of a re-queued task
+                self.n_duplicates = self.n_duplicates + 1
+                return
+            self._finish(task_id)
+            if task['future'].cancelled():
+                return
+            w['done'] = w['done'] + 1
+            if ok:
+                self.n_done = self.n_done + 1
+            else:
+                self.n_failed = self.n_failed + 1
+        try:
+            if ok:
+                task['future'].set_result(value)
+            else:
+                task['future'].set_exception(RuntimeError('evaluation failed on ' + w['name'] + ':\n' + value))
+        except InvalidStateError:
+            pass
+
+    def _fail(self, failures):
+        for future, error in failures:
+            try:
+                future.set_exception(error)
+            except InvalidStateError:
+                pass
+
+    #%%
+    'connections of the workers'
+
+    def _accept(self):
+        while not self.closed:
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError):
+                if self.closed:
+                    return
+                continue
+            except Exception:
+                #wrong authentication key
+                continue
+            threading.Thread(target = self._serve, args = (conn,), daemon = True).start()
+
+    def _serve(self, conn):
+        with self.lock:
+            worker_id = next(self._ids)
+            w = {'name': str(worker_id), 'conn': conn, 'last_seen': time.time(), 'lost': False,
+                 'tasks': set(), 'jobs': OrderedDict(), 'done': 0, 'busy': 0.0}
+            self.workers[worker_id] = w
+            self.lock.notify_all()
+
+        try:
+            while True:
+                msg = conn.recv()
+                with self.lock:
+                    w['last_seen'] = time.time()
+                    if w['lost']:
+                        #back after a timeout: its tasks were already re-queued
+                        w['lost'] = False
+                        self.lock.notify_all()
+
+                if msg[0] == 'hello':
+                    w['name'] = msg[1]
+                elif msg[0] == 'get':
+                    task = self._next(worker_id)
+                    if self.closed:
+                        conn.send(('stop',))
+                        break
+                    if task is None:
+                        conn.send(('idle',))
+                        continue
+                    try:
+                        payload = pickle.dumps(task)
+                    except Exception as e:
+                        with self.lock:
+                            future = self.tasks[task[1]]['future']
+                            w['tasks'].discard(task[1])
+                            w['jobs'].pop(task[2], None)
+                            self._finish(task[1])
+                            self.n_failed = self.n_failed + 1
+                        self._fail([(future, e)])
+                        conn.send(('idle',))
+                        continue
+                    conn.send_bytes(payload)
+                elif msg[0] == 'result':
+                    self._complete(worker_id, *msg[1:])
+                if self.closed and msg[0] != 'get':
+                    break
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            failures = []
+            with self.lock:
+                if not w['lost']:
+                    w['lost'] = True
+                    self.n_lost = self.n_lost + (0 if self.closed else 1)
+                for task_id in list(w['tasks']):
+                    failure = self._requeue(task_id, 'lost')
+                    if failure is not None:
+                        failures.append(failure)
+                self.lock.notify_all()
+            self._fail(failures)
+
+    def _reap(self):
+        'workers without heartbeat and tasks over time: tasks re-queued'
+        period = min(self.heartbeat_timeout, self.task_timeout or self.heartbeat_timeout) / 4
+        while not self.closed:
+            time.sleep(period)
+            now = time.time()
+            failures = []
+            with self.lock:
+                for w in self.workers.values():
+                    if not w['lost'] and now - w['last_seen'] > self.heartbeat_timeout:
+                        w['lost'] = True
+                        self.n_lost = self.n_lost + 1
+                        for task_id in list(w['tasks']):
+                            failures.append(self._requeue(task_id, 'lost'))
+                if self.task_timeout is not None:
+                    for task_id, task in list(self.tasks.items()):
+                        if task['worker'] is not None and now - task['start'] > self.task_timeout:
+                            failures.append(self._requeue(task_id, 'timed out'))
+            self._fail([failure for failure in failures if failure is not None])
+
+
+#%%
+'worker side'
+
+def _connect(address, authkey, retry):
+    'connection to the broker, retried for retry seconds (workers started before the broker)'
+    t_end = time.time() + retry
+    while True:
+        try:
+            return Client(address, authkey = authkey)
+        except (OSError, EOFError):
+            if time.time() > t_end:
+                raise
+            time.sleep(1)
+
+
+def run_worker(address, authkey, name = None, heartbeat = 5.0, retry = 60.0):
+    '''
+    address : address of the broker, (host, port) or path of the Unix socket
+    authkey : key of the broker (bytes or str), required
+    name : name of the worker (default host:pid)
+    heartbeat : seconds between two heartbeats during an evaluation
+    retry : seconds of connection attempts
+
+    pulls and evaluates tasks until the broker is closed, returns the number of evaluated tasks
+    '''
+    name = name or socket.gethostname() + ':' + str(os.getpid())
+    conn = _connect(address, _check_authkey(authkey), retry)
+    lock = threading.Lock()
+    functions = OrderedDict()
+    n_done = 0
+
+    def beat(stop):
+        while not stop.wait(heartbeat):
+            try:
+                with lock:
+                    conn.send(('heartbeat',))
+            except OSError:
+                #broker closed, noticed by the next request
+                return
+
+    try:
+        conn.send(('hello', name))
+        while True:
+            conn.send(('get',))
+            msg = conn.recv()
+            if msg[0] == 'stop':
+                break
+            if msg[0] != 'task':
+                continue
+
+            _, task_id, job_id, fn, arg = msg
+            if fn is not None:
+                functions[job_id] = fn
+                while len(functions) > FUNCTION_CACHE:
+                    functions.popitem(last = False)
+
+            stop = threading.Event()
+            beater = threading.Thread(target = beat, args = (stop,), daemon = True)
+            beater.start()
+            t_start = time.perf_counter()
+            try:
+                value, ok = functions[job_id](arg), True
+            except Exception:
+                value, ok = traceback.format_exc(), False
+            t_eval = time.perf_counter() - t_start
+            stop.set()
+            beater.join()
+
+            with lock:
+                try:
+                    conn.send(('result', task_id, ok, value, t_eval))
+                except (pickle.PicklingError, TypeError, AttributeError):
+                    conn.send(('result', task_id, False, traceback.format_exc(), t_eval))
+            n_done = n_done + 1
+    except (EOFError, OSError):
+        #broker closed
+        pass
+    finally:
+        conn.close()
+    return n_done
+
+
+def import_main(path):
+    'script of the optimizer imported as __main__ (its objective functions are pickled as __main__.name)'
+    spec = importlib.util.spec_from_file_location('__mp_main__', path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['__mp_main__'] = module
+    sys.modules['__main__'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+#%%
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description = 'worker processes of a node pulling designs from the broker')
+    parser.add_argument('--address', required = True, help = 'host:port of the broker or path of its Unix socket')
+    parser.add_argument('--authkey', required = True, help = 'key shared with the broker (broker_authkey of main.py)')
+    parser.add_argument('--processes', type = int, default = 1, help = 'worker processes of the node (-1 all the cores)')
+    parser.add_argument('--main', default = None, help = 'script of the optimizer (main.py), imported once before the workers start')
+    parser.add_argument('--heartbeat', type = float, default = 5.0)
+    parser.add_argument('--retry', type = float, default = 60.0, help = 'seconds of connection attempts')
+    args = parser.parse_args()
+
+    address = parse_address(args.address)
+    authkey = args.authkey.encode()
+    if args.main is not None:
+        #input data and scenario loaded once, shared by the forked workers
+        import_main(args.main)
+
+    processes = os.cpu_count() if args.processes == -1 else args.processes
+    if processes == 1:
+        n_done = run_worker(address, authkey, heartbeat = args.heartbeat, retry = args.retry)
+        print(str(n_done) + ' tasks evaluated', flush = True)
+    else:
+        node = [Process(target = run_worker, args = (address, authkey), kwargs = {'heartbeat': args.heartbeat, 'retry': args.retry})
+                for _ in range(processes)]
+        for p in node:
+            p.start()
+        for p in node:
+            p.join()
@@ -0,0 +1,107 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import numpy as np
+
+
+'''
+Projection of the degradation of the lifetime from the first simulated year
+
+The curves of the LCORE evaluation, in closed form and for a batch of designs at once:
+
+- BESS capacity fade: SOH = a * x^1.06 + 1 fitted on (0, 1), (0.5, (1 + SOH_1)/2 + corr), (1, SOH_1), the least
+  squares a is sum(x^1.06 (y - 1)) / sum(x^2.12); capacity of each year from the average SOH of the year
+- EL conversion factor at the end of each year: line through (-1, 18) and (0, EL_CF_fin), the average of the
+  year shifted by 1.1 * (SOH - SOH_1) from the one of the first year
+- FC conversion factor: a * x^1.25 + FC_CF_1, with a function of the BESS size
+- years (of 10) above the end of life limits (SOH > 0.7, EL_CF_lim, FC_CF_lim) define the lifetimes, the kept
+  years are repeated over the lifetime of the analysis as the lists of LCORE_evaluation were
+
+'''
+
+SOH_EOL = 0.7
+EL_CF_NEW = 18                                           # kg/MWh
+EL_CF_LIM = 18 / 106 / (2.3 * 5000 / 1000000)            # kg/MWh  (EL_H2_nom / (EL_V_max * EL_I_id))
+FC_CF_LIM = 59 / 74 / (46.2 * 230 / 1000)                # FC_H2_nom / (FC_V_min * FC_I_id)
+
+_X = np.arange(0, 11)
+_X_SOH = _X ** 1.06                                      # SOH fit, years 0-10
+_X_FC = _X[:10] ** 1.25                                  # FC fit, years 0-9
+_W = 0.5 ** 1.06                                         # SOH fit, middle point
+
+
+def _repeat(keep, n_years):
+    '''
+    keep : (n, 10) mask of the years above the end of life limit
+
+    returns the (n, n_years) columns of the kept years repeated one lifetime after the other, and the lifetimes
+    '''
+    life = keep.sum(axis = 1)
+    if np.any(life == 0):
+        raise ZeroDivisionError('component at the end of life in the first year')
+
+    #kept years first, in their order
+    order = np.argsort(~keep, axis = 1, kind = 'stable')
+    cols = np.arange(n_years)[None, :] % life[:, None]
+    return np.take_along_axis(order, cols, axis = 1), life
+
+
+def _field(outputs, name):
+    return np.atleast_1d(np.asarray(outputs[name], dtype = float))
+
+
+def project_degradation(outputs, n_years = 20):
+    '''
+    outputs : output(s) of the first-year simulation, records of complete_sim (sim_record.py), DataFrame or dict
+              of arrays with SOH_final, BESS[MWh], EL_CF_fin, EL_CF[kg/MWh], FC_CF[kg/MWh], EL_h_work, FC_h_work
+    n_years : years of the projection
+
+    returns a dictionary of (n, n_years) arrays: Capacity [MWh], EL_CF and FC_CF [kg/MWh] of each year,
+    and of the lifetimes (years) of BESS, EL and FC
+    '''
+    SOH_1 = _field(outputs, 'SOH_final')
+    BESS = _field(outputs, 'BESS[MWh]')
+    EL_CF_fin = _field(outputs, 'EL_CF_fin') * 1000
+    EL_CF_1 = _field(outputs, 'EL_CF[kg/MWh]')
+    FC_CF_1 = _field(outputs, 'FC_CF[kg/MWh]')
+    no_H2 = (_field(outputs, 'EL_h_work') == 0) | (_field(outputs, 'FC_h_work') == 0)
+
+    'BESS Exp capacity fade'
+    corr = np.maximum(-5.43e-07 * BESS + 0.00763, 0)
+    a = (_W * ((1 + SOH_1) / 2 + corr - 1) + (SOH_1 - 1)) / (_W ** 2 + 1)
+
+    SOH = a[:, None] * _X_SOH + 1
+    SOH_avg = (SOH[:, :-1] + SOH[:, 1:]) / 2
+    cols, life_BESS = _repeat(SOH[:, :-1] > SOH_EOL, n_years)
+    SOH_years = np.take_along_axis(SOH[:, :-1], cols, axis = 1)
+    Capacity = np.take_along_axis(SOH_avg, cols, axis = 1) * BESS[:, None]
+
+    'EL conversion factor fade'
+    EL_CF_end = (EL_CF_fin - EL_CF_NEW)[:, None] * _X[:10] + EL_CF_fin[:, None]
+    keep = (EL_CF_end > EL_CF_LIM) | no_H2[:, None]
+    cols, life_EL = _repeat(keep, n_years)
+
+    #delta CF function of BESS SOH trend
+    DCF = 1.1 * (SOH_years - SOH_1[:, None]) + (EL_CF_fin - EL_CF_1)[:, None]
+    EL_CF = np.take_along_axis(EL_CF_end, cols, axis = 1) - DCF
+
+    'FC conversion factor fade'
+    a_FC = 700.23 * np.exp(BESS / 1000 * -0.386) / 1000
+    FC_CF_all = a_FC[:, None] * _X_FC + FC_CF_1[:, None]
+    keep = (FC_CF_all > FC_CF_LIM) | no_H2[:, None]
+    cols, life_FC = _repeat(keep, n_years)
+    FC_CF = np.take_along_axis(FC_CF_all, cols, axis = 1)
+
+    'designs without hydrogen conversion: constant factors, lifetimes of 10 years'
+    EL_CF[no_H2] = EL_CF_NEW / 1000
+    FC_CF[no_H2] = 59 / 1000
+
+    return {'Capacity': Capacity, 'EL_CF': EL_CF, 'FC_CF': FC_CF,
+            'lifetimes': {'BESS': life_BESS, 'EL': life_EL, 'FC': life_FC}}
@@ -0,0 +1,685 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+from time import perf_counter
+
+import numpy as np
+
+from MODEL_EL_variable import EL_model, EL_transit
+from MODEL_FC_variable import FC_model, FC_transit
+from MODEL_battery_NMC import battery_operation
+from MODEL_battery_NMC_simplified import battery_operation as battery_operation_simplified
+import MODEL_battery_NMC_simplified
+from early_termination import DeficitBoundExceeded
+from res_cache import res_profile
+from sim_record import new_record, COMPLETE_DTYPE, YEAR_DTYPE
+
+
+'''
+Rule-based dispatch engine with selectable fidelity
+
+One loop for the cascade RES -> BESS -> EL / FC -> LP tank -> compressor -> HP tank of every simulation, the
+component models are chosen by a Fidelity:
+
+- battery : 'degrading' (MODEL_battery_NMC: efficiency maps, daily rainflow damage, SOH) or 'constant'
+            (MODEL_battery_NMC_simplified: constant efficiency, SOH 1)
+- conversion : 'dynamic' (EL_model / FC_model at each step from temperature and working hours, or the stacks of a
+               MultiStack) or 'constant' (EL_CF and FC_CF given)
+- thermal : stack temperatures from EL_transit / FC_transit, otherwise the stacks stay at 71 / 60 °C
+- H2_requires_FC : hydrogen chain off when EL or FC have no cells, otherwise only without EL cells
+- record : 'complete' (COMPLETE_DTYPE with the RES KPIs and the final conversion factors) or 'year' (YEAR_DTYPE,
+           the cumulative values are carried in the state for the stitching of parallel_in_time.py and the
+           weighted days of representative_days.py)
+
+complete_sim (COMPLETE) and extra_simplified_sim (SIMPLIFIED) are configurations of dispatch, with their outputs
+unchanged.
+
+'''
+
+###########################################################################################################################################
+'Compressor'
+R = 8.314 # Universal gas constant [J / (mol * K)]
+MM_h2 = 0.00216        # [kg/mol]
+R_specific = R / MM_h2 # [J / (kg * K)]
+
+T_1 = 25 + 273.15  # [K]
+P_i = 30 # bar
+P_f = 350 # bar
+
+eff_compr = 0.75
+
+k = 1.43 # from CoolProp
+
+n_stages = 3
+beta = (P_f/P_i)**(1/n_stages)  #compression ration in each stage
+
+l_ad_ms = n_stages * k/(k-1) * R_specific * T_1 * ( (beta)**((k-1)/k) - 1 )      # [J/kg]
+l_real_ms = l_ad_ms/eff_compr    #[J/kg]
+l_compr_ms = l_real_ms / 3600 / 1000 # [kWh/kg]
+
+###########################################################################################################################################
+'Dispatch thresholds (module constants, set by sensitivity.py)'
+EL_P_MIN_FRACTION = 0.2     # share of the EL nominal power required to start the hydrogen production
+FC_P_MIN_FRACTION = 0.01    # share of the FC nominal power required to start
+LP_TANK_TRIGGER = 0.9       # LP tank filling that starts the compressor
+
+###########################################################################################################################################
+
+class Fidelity:
+    '''
+    battery : 'degrading' or 'constant'
+    conversion : 'dynamic' or 'constant'
+    thermal : True for the thermal model of the stacks (dynamic conversion)
+    H2_requires_FC : True if the hydrogen chain needs both EL and FC cells
+    record : 'complete' or 'year'
+    '''
+
+    def __init__(self, battery = 'degrading', conversion = 'dynamic', thermal = True, H2_requires_FC = True, record = 'complete'):
+        if battery not in ('degrading', 'constant'):
+            raise ValueError('battery must be degrading or constant')
+        if conversion not in ('dynamic', 'constant'):
+            raise ValueError('conversion must be dynamic or constant')
+        if record not in ('complete', 'year'):
+            raise ValueError('record must be complete or year')
+        self.battery = battery
+        self.conversion = conversion
+        self.thermal = thermal and conversion == 'dynamic'
+        self.H2_requires_FC = H2_requires_FC
+        self.record = record
+
+    def __repr__(self):
+        return ('Fidelity(battery = ' + repr(self.battery) + ', conversion = ' + repr(self.conversion) +
+                ', thermal = ' + repr(self.thermal) + ', H2_requires_FC = ' + repr(self.H2_requires_FC) +
+                ', record = ' + repr(self.record) + ')')
+
+
+COMPLETE = Fidelity('degrading', 'dynamic', thermal = True, H2_requires_FC = True, record = 'complete')
+SIMPLIFIED = Fidelity('constant', 'constant', thermal = False, H2_requires_FC = False, record = 'year')
+
+
+#%%
+###########################################################################################################################################
+'MAIN'
+
+def dispatch(df_data, s, fidelity = COMPLETE, BESS_size = None, EL_CF = None, FC_CF = None,
+             profiler = None, trace = None, E_deficit_max = None, state = None, stacks = None):
+    '''
+    df_data : input dataframe (wind_power, PV_power, load, temperature)
+    s : design vector [EL cells, FC cells, BESS kWh, HP tank kg, PV upgrade]
+    fidelity : Fidelity of the component models (COMPLETE, SIMPLIFIED or a custom one)
+    BESS_size : battery capacity [kWh] (default s[2])
+    EL_CF, FC_CF : conversion factors [kg/kWh] of a constant conversion
+    profiler : optional SimProfiler (sim_profiler.py) recording stage timings and event counters,
+               if given the function returns (output, profiler report)
+    trace : optional TraceWriter (trace_export.py) receiving the time series of each step
+    E_deficit_max : optional deficit energy [MWh], checked at the end of each day: when exceeded the simulation
+                    stops raising DeficitBoundExceeded (early_termination.py)
+    state : optional dictionary of the initial and final state of a block (see complete_sim and
+            extra_simplified_sim), with 'sync' / 'target' the steps with saturated SOC are recorded / matched
+    stacks : optional MultiStack (multi_stack.py), dynamic conversion only
+
+    returns the result record (COMPLETE_DTYPE or YEAR_DTYPE)
+    '''
+
+    degrading = fidelity.battery == 'degrading'
+    dynamic = fidelity.conversion == 'dynamic'
+    thermal = fidelity.thermal
+    year_record = fidelity.record == 'year'
+    if not dynamic and (EL_CF is None or FC_CF is None):
+        raise ValueError('constant conversion requires EL_CF and FC_CF')
+    if stacks is not None and not dynamic:
+        raise ValueError('stacks require the dynamic conversion')
+
+    #instrumentation flag: with profiler = None the loop only pays a boolean check per stage
+    prof = profiler is not None
+    tracing = trace is not None
+    stop_check = E_deficit_max is not None and np.isfinite(E_deficit_max)
+    if prof:
+        t0 = perf_counter()
+
+    #datasets creation (positional arrays)
+    P_load = df_data['load'].to_numpy()
+    T_ext = df_data['temperature'].to_numpy()
+
+    kWh_factor = 60   #dati min
+
+    EL_size = s[0]
+    FC_size = s[1]
+    Tank_size = s[3]
+    PV_upgrade = s[4]
+
+    if EL_size == 0 or (FC_size == 0 and fidelity.H2_requires_FC):
+        H2_storage = False
+    else:
+        H2_storage = True
+
+    'power fluxes'
+    #available power form RES (array) and RES-only KPIs, cached for the input data and PV size
+    RES = res_profile(df_data, PV_upgrade)
+    P_RES = RES['P_RES']
+
+    'ELECTROLYZER'
+    EL_cell_power = 9.45         #kW
+    #number of availabe cells
+    EL_cell_number = EL_size
+    #electrolyzer stack nominal pwoer [kW]
+    EL_P_nom = EL_cell_number * EL_cell_power
+    #power required by the alkaline electrolyzer to start the hydrogen production
+    EL_P_min = EL_P_MIN_FRACTION * EL_P_nom
+    #new electrolyzer condition
+    EL_h_work = 0
+    # intial electrolyzer temperature
+    EL_T_0 = 71
+    EL_T = EL_T_0
+    #conversion factor
+    EL_CF_0 = 0.018 # kg/kWh  hydrogen mass that the electrolyzer can produce with 1kWh
+    if dynamic:
+        EL_CF = EL_CF_0
+    #sum and number of the CF while EL is active
+    EL_CF_active_sum = 0
+    EL_CF_active_n = 0
+
+    'FUEL CELL'
+    FC_cell_power = 13.57         #kW
+    #number of availabe cells
+    FC_cell_number = FC_size
+    #fuel cell nominal pwoer [kW]
+    FC_P_nom = FC_cell_number * FC_cell_power
+    #power required by the fuel cell to start
+    FC_P_min = FC_P_MIN_FRACTION * FC_P_nom
+    #new fuel cell condition
+    FC_h_work = 0
+    # intial fuel cell temperature
+    FC_T_0 = 60
+    FC_T = FC_T_0
+    #conversion factor
+    FC_CF_0 = 0.059 # kg/kWh  hydrogen mass that the fuel cell requires to produce 1kWh
+    if dynamic:
+        FC_CF = FC_CF_0
+    #sum and number of the CF while FC is active
+    FC_CF_active_sum = 0
+    FC_CF_active_n = 0
+
+    'BESS'
+    #battery capacity [kWh]
+    BESS_capacity = s[2] if BESS_size is None else BESS_size
+    #new bess condition
+    BESS_degr = 0
+    BESS_SOH = 1
+    # initial SOC hypotesis
+    BESS_SOC = 0.4
+    #SOC and C-rate profiles for the degradation assessment
+    BESS_SOC_day    = [0]
+    BESS_C_rate_day = [0]
+
+    'TANK - high pressure (350 bar)'
+    #high pressure tank capacity [kg]
+    tank = Tank_size
+    H2_buffer = 0.1*tank
+    if tank == 0:
+        H2_buffer = 0
+
+    'TANK - low pressure (30 bar)'
+    #low pressure tank capacity [kg]
+    lp_tank = 10
+    H2_lp_buffer = 0
+    counter = 0
+
+    time_to_compress = lp_tank / (60/kWh_factor)   # [min] 1kg/min compression
+    #compressor power while running [kW]
+    P_compressor_on = l_compr_ms*(lp_tank/time_to_compress)*kWh_factor
+
+    'cumulative values'
+    E_load_cumulative = 0
+    EL_P_recieved_cumulative = 0
+    EL_H2_prod_cumulative = 0
+    EL_H2_prod_y_cumulative = 0
+    C_H2_prod_cumulative = 0
+    C_P_cumulative = 0
+    FC_P_delivered_cumulative = 0
+    FC_H2_req_cumulative = 0
+    P_BESS_excess_cumulative = 0
+    P_BESS_deficit_cumulative = 0
+    P_excess_cumulative = 0
+    P_deficit_cumulative = 0
+
+    'initial state of a block'
+    sync = False
+    if state is not None:
+        if 'SOC' in state:
+            BESS_SOC = state['SOC']
+            #the block starts at the beginning of an hour, after the reset of the SOC profile for the degradation
+            BESS_SOC_day = []
+            BESS_C_rate_day = []
+        if degrading:
+            BESS_degr = state.get('Degr', BESS_degr)
+            BESS_SOH = 1 - 0.3 * BESS_degr
+        EL_h_work = state.get('EL_h_work', EL_h_work)
+        FC_h_work = state.get('FC_h_work', FC_h_work)
+        EL_T = state.get('EL_T', EL_T_0)
+        FC_T = state.get('FC_T', FC_T_0)
+        H2_lp_buffer = state.get('H2_lp', H2_lp_buffer)
+        H2_buffer = state.get('H2_hp', H2_buffer)
+        counter = state.get('counter', counter)
+        if year_record and 'cumulative' in state:
+            (E_load_cumulative, EL_P_recieved_cumulative, EL_H2_prod_cumulative, EL_H2_prod_y_cumulative,
+             C_H2_prod_cumulative, C_P_cumulative, FC_P_delivered_cumulative, FC_H2_req_cumulative,
+             P_BESS_excess_cumulative, P_BESS_deficit_cumulative, P_excess_cumulative, P_deficit_cumulative) = state['cumulative']
+
+        #synchronization points: steps with saturated SOC, where trajectories starting from different states can merge
+        #(constant battery and conversion: the state is SOC, tank levels and compressor counter)
+        sync_points = state.get('sync')
+        target = state.get('target')
+        sync = sync_points is not None or target is not None
+        #SOC limits read at call time (they can be changed at run time, sensitivity.py)
+        SOC_sat_max = MODEL_battery_NMC_simplified.SOC_max - 1e-3
+        SOC_sat_min = MODEL_battery_NMC_simplified.SOC_min + 1e-3
+
+    'smallest margins of the HP tank limits: full tank (room left after compression) and empty tank (H2 left after the FC request)'
+    #while they are positive the trajectory does not depend on the tank size (tank_reuse.py)
+    margins = state is not None
+    HP_headroom = np.inf
+    HP_reserve = np.inf
+
+    'multi-stack EL and FC (the stacks restart from the state of the previous block if given)'
+    multi_stack = stacks is not None and H2_storage
+    if multi_stack:
+        stacks.setup(EL_cell_number, FC_cell_number, kWh_factor, state)
+
+    'for loop for each timestep of the timeframe'
+    #deficit of the day and of the completed days (early termination)
+    day_steps = kWh_factor * 24
+    E_deficit_cum = (P_deficit_cumulative / kWh_factor) / 1000
+    P_deficit_day = 0
+
+    if prof:
+        t0 = profiler.lap('setup', t0)
+        profiler.count('steps', len(P_RES))
+
+    for i in range(len(P_RES)):
+
+        P_compressor = P_compressor_on
+        #########################################################
+        'target power'
+        #if the battery supports the load
+        if counter != 0: # If the counter is not equal to 0, the compressor will work so extra load
+            P_requested = P_load[i] + P_compressor
+
+        else: # If the counter is 0, the low pressure tank is not full yet so the compressor is off
+            P_requested = P_load[i]
+
+        E_load_cumulative += P_load[i]
+
+        #########################################################
+        'battery operation'
+        if degrading:
+            P_BESS, BESS_SOC, BESS_SOH, BESS_degr, C_rate_C, C_rate_D = battery_operation(i,P_RES[i],P_requested, Capacity=BESS_capacity,
+                                                                              SOC_old=BESS_SOC,SOH_old=BESS_SOH,Degr=BESS_degr,
+                                                                              SOC_day=BESS_SOC_day,C_rate_day = BESS_C_rate_day,
+                                                                              kWh_factor=kWh_factor, profiler=profiler)
+
+            BESS_SOC_day.append(BESS_SOC)
+            BESS_C_rate_day.append(C_rate_C + C_rate_D)
+
+            if (i+1) % kWh_factor*24 == 0:
+                BESS_SOC_day    = [ ]                  #new SOC profile for degradation assessment
+                BESS_C_rate_day = [ ]
+        else:
+            P_BESS, BESS_SOC = battery_operation_simplified(i, P_RES[i], P_requested, Capacity=BESS_capacity,
+                                                            SOC_old=BESS_SOC, kWh_factor=kWh_factor)
+
+        if prof:
+            t0 = profiler.lap('battery', t0)
+
+        #########################################################
+        'residualP_RESmismatch'
+
+        if P_BESS > P_requested:
+            P_BESS_excess = P_BESS - P_requested
+            P_BESS_deficit = 0
+
+            if counter != 0:
+                H2_to_c = lp_tank/time_to_compress #H2 to be compressed min
+                counter = counter - 1 # The compressor will work until the counter is back at 0.
+                H2_lp_buffer = H2_lp_buffer - lp_tank/time_to_compress # Amount of h2 left in low pressure tank
+
+                if prof:
+                    profiler.count('compressor_on')
+
+            else:
+                H2_to_c = 0
+                P_compressor = 0
+
+        else:
+            P_BESS_excess = 0
+            P_BESS_deficit = P_requested - P_BESS
+            H2_to_c = 0
+            P_compressor = 0
+
+        P_BESS_excess_cumulative += P_BESS_excess
+        P_BESS_deficit_cumulative += P_BESS_deficit
+
+
+        if H2_storage == True:
+
+            #########################################################
+            'eletrolyzer activation'
+            #conversion factor update
+            if prof:
+                t0 = profiler.lap('mismatch', t0)
+
+            if multi_stack:
+                #conversion factor and minimum power of the stacks dispatched for the available power
+                EL_CF, EL_P_min = stacks.EL.allocate(P_BESS_excess)
+                if prof and stacks.EL.high_voltage:
+                    profiler.count('EL_high_voltage')
+            elif dynamic:
+                EL_CF,EL_f_i_V,EL_f_H2_i,_ = EL_model(EL_T, EL_h_work, EL_cell_number, kWh_factor, profiler=profiler)
+
+            if prof:
+                t0 = profiler.lap('EL_model', t0)
+
+            #H2 production calculation in the given minute
+            if P_BESS_excess > EL_P_min:
+                if P_BESS_excess < EL_P_nom:
+                    EL_P_given = P_BESS_excess
+                else:
+                    EL_P_given = EL_P_nom
+
+                EL_H2_prod = EL_P_given * EL_CF / kWh_factor
+
+                #produce only the hydrogen mass that fits in the lp_tank
+                if EL_H2_prod + H2_lp_buffer > lp_tank:
+                    EL_H2_prod = lp_tank - H2_lp_buffer
+                    EL_P_given = EL_H2_prod / EL_CF * kWh_factor
+
+                    if prof:
+                        profiler.count('EL_clipped_lp_tank')
+
+                if margins:
+                    HP_headroom = min(HP_headroom, tank - H2_to_c - H2_buffer)
+                if H2_to_c + H2_buffer > tank:
+                    H2_to_c = (tank - H2_buffer) if (tank - H2_buffer) > 0 else 0
+                    EL_H2_prod = 0
+                    EL_P_given = 0
+
+                    if prof:
+                        profiler.count('HP_tank_saturated')
+
+                EL_CF_active_sum += EL_CF
+                EL_CF_active_n += 1
+
+            else:
+                EL_H2_prod = 0
+                EL_P_given = 0
+
+            #power fed to the electrolyzer
+            EL_P_recieved_cumulative += EL_P_given
+            #H2 produced
+            EL_H2_prod_cumulative += EL_H2_prod
+            #annual hydrogen yield
+            EL_H2_prod_y_cumulative += EL_H2_prod
+
+            #H2 produced during compression
+            C_H2_prod_cumulative += H2_to_c
+            C_P_cumulative += P_compressor
+
+            if prof:
+                t0 = profiler.lap('EL_dispatch', t0)
+
+            'Thermal management'
+            if multi_stack:
+                EL_T = stacks.EL.transit(EL_H2_prod, T_ext[i])
+            elif thermal:
+                EL_T = EL_transit(EL_H2_prod, EL_f_i_V, EL_f_H2_i, EL_T, EL_cell_number, T_ext[i], kWh_factor)
+
+            if prof:
+                t0 = profiler.lap('EL_transit', t0)
+
+            #working hours counting only if activated
+            if EL_H2_prod > 0:
+                EL_h_work = EL_h_work + 1/kWh_factor
+
+                if prof:
+                    profiler.count('EL_on')
+
+            #########################################################
+            'Excess power from RES, not converted to H2'
+            P_excess = P_BESS_excess - EL_P_given
+            ########################################################
+
+
+            #########################################################
+            'fuel cell activation'
+
+            if multi_stack:
+                FC_CF, FC_P_min = stacks.FC.allocate(P_BESS_deficit)
+            elif dynamic:
+                FC_CF,FC_f_i_V,FC_f_H2_i = FC_model(FC_T, FC_h_work, FC_cell_number, kWh_factor)
+
+            if prof:
+                t0 = profiler.lap('FC_model', t0)
+
+            # H2 consumption calculation in the given minute
+            if P_BESS_deficit > FC_P_min:
+
+                if P_BESS_deficit < FC_P_nom:
+                    FC_P_delivered = P_BESS_deficit
+                else:
+                    FC_P_delivered = FC_P_nom
+
+                FC_H2_req = FC_P_delivered * FC_CF / kWh_factor
+
+                #conversion in electricity of the residual hydrogen in the tank
+                if margins:
+                    HP_reserve = min(HP_reserve, H2_buffer + H2_lp_buffer - FC_H2_req)
+                if (H2_buffer + H2_lp_buffer) < FC_H2_req:
+                    FC_H2_req = H2_buffer + H2_lp_buffer
+                    FC_P_delivered = (H2_buffer + H2_lp_buffer) / FC_CF * kWh_factor
+
+                    if prof:
+                        profiler.count('FC_limited_H2')
+
+                FC_CF_active_sum += FC_CF
+                FC_CF_active_n += 1
+
+            else:
+                FC_H2_req = 0
+                FC_P_delivered = 0
+
+            #power delivered by the fuel cell
+            FC_P_delivered_cumulative += FC_P_delivered
+            #H2 consumed
+            FC_H2_req_cumulative += FC_H2_req
+
+            if prof:
+                t0 = profiler.lap('FC_dispatch', t0)
+
+            'Thermal management'
+            if multi_stack:
+                FC_T = stacks.FC.transit(FC_H2_req, T_ext[i])
+            elif thermal:
+                FC_T = FC_transit(FC_H2_req, FC_f_i_V, FC_f_H2_i, FC_T, FC_cell_number, T_ext[i], kWh_factor)
+
+            if prof:
+                t0 = profiler.lap('FC_transit', t0)
+
+            #working hours counting only if activated
+            if FC_H2_req > 0:
+                FC_h_work = FC_h_work + 1/kWh_factor
+
+                if prof:
+                    profiler.count('FC_on')
+
+            #########################################################
+            'Deficit power, not covered by H2'
+            P_deficit = P_BESS_deficit - FC_P_delivered
+            #########################################################
+            'tank management'
+            H2_lp_buffer = H2_lp_buffer + EL_H2_prod
+
+            if H2_lp_buffer/lp_tank > LP_TANK_TRIGGER:
+                counter = time_to_compress # compressor starts working for the given amount of time when tank is full.
+
+
+            H2_buffer = H2_buffer + H2_to_c
+
+            if H2_lp_buffer > FC_H2_req:
+                H2_lp_buffer = H2_lp_buffer - FC_H2_req
+
+            else:
+                H2_buffer = H2_buffer - (FC_H2_req - H2_lp_buffer)
+                H2_lp_buffer = 0
+
+            if prof:
+                t0 = profiler.lap('tanks_compressor', t0)
+
+        else:
+            P_excess = P_BESS_excess
+            P_deficit = P_BESS_deficit
+
+            if prof:
+                t0 = profiler.lap('mismatch', t0)
+
+        P_excess_cumulative += P_excess
+        P_deficit_cumulative += P_deficit
+
+        if tracing:
+            if H2_storage == True:
+                trace.step(P_RES[i], P_load[i], P_BESS, BESS_SOC, BESS_SOH, P_BESS_excess, P_BESS_deficit,
+                           EL_P_given, EL_H2_prod, EL_T if dynamic else np.nan, EL_CF,
+                           FC_P_delivered, FC_H2_req, FC_T if dynamic else np.nan, FC_CF,
+                           H2_lp_buffer, H2_buffer, P_compressor, P_excess, P_deficit)
+            else:
+                trace.step(P_RES[i], P_load[i], P_BESS, BESS_SOC, BESS_SOH, P_BESS_excess, P_BESS_deficit,
+                           0, 0, np.nan, np.nan, 0, 0, np.nan, np.nan,
+                           H2_lp_buffer, H2_buffer, P_compressor, P_excess, P_deficit)
+
+        if stop_check:
+            P_deficit_day += P_deficit
+            if (i+1) % day_steps == 0:
+                E_deficit_cum = E_deficit_cum + (P_deficit_day/kWh_factor)/1000
+                P_deficit_day = 0
+                if E_deficit_cum > E_deficit_max:
+                    raise DeficitBoundExceeded(E_deficit_cum, i+1)
+
+        if sync and (BESS_SOC > SOC_sat_max or BESS_SOC < SOC_sat_min):
+            fast_state = (BESS_SOC, H2_lp_buffer, H2_buffer, counter)
+            if target is not None and i in target and target[i][0] == fast_state:
+                state['stitch'] = i
+                break
+            if sync_points is not None:
+                sync_points[i] = (fast_state, (E_load_cumulative, EL_P_recieved_cumulative, EL_H2_prod_cumulative, EL_H2_prod_y_cumulative,
+                                               C_H2_prod_cumulative, C_P_cumulative, FC_P_delivered_cumulative, FC_H2_req_cumulative,
+                                               P_BESS_excess_cumulative, P_BESS_deficit_cumulative, P_excess_cumulative, P_deficit_cumulative))
+
+    'Data saving after the for loop'
+    if year_record:
+        E_load = ( E_load_cumulative / kWh_factor ) / 1000                  #[MWh]  total energy required by load
+    else:
+        E_load = RES['E_load']                                              #[MWh]  total energy required by load
+
+    #final conversion factors to estimate time degradation: they only depend on the final working hours
+    if H2_storage and dynamic and not multi_stack:
+        EL_CF_final,_,_,_ = EL_model(71, EL_h_work, EL_cell_number, kWh_factor)
+        FC_CF_final,_,_ = FC_model(60, FC_h_work, FC_cell_number, kWh_factor)
+    else:
+        EL_CF_final = 0
+        FC_CF_final = 0
+
+    if prof:
+        t0 = profiler.lap('CF_final', t0)
+
+    if multi_stack:
+        #equivalent working hours and final conversion factors of the stacks
+        EL_h_work = stacks.EL.h_work_eq()
+        FC_h_work = stacks.FC.h_work_eq()
+        EL_CF_final = stacks.EL.CF_final()
+        FC_CF_final = stacks.FC.CF_final()
+        if state is not None:
+            state.update(EL_stacks = stacks.EL.get_state(), FC_stacks = stacks.FC.get_state())
+
+    if state is not None:
+        state.update(SOC = BESS_SOC, Degr = BESS_degr, EL_h_work = EL_h_work, FC_h_work = FC_h_work,
+                     EL_T = EL_T, FC_T = FC_T, H2_lp = H2_lp_buffer, H2_hp = H2_buffer, counter = counter,
+                     EL_CF_active = (EL_CF_active_sum, EL_CF_active_n),
+                     FC_CF_active = (FC_CF_active_sum, FC_CF_active_n), E_load = E_load,
+                     HP_headroom = HP_headroom, HP_reserve = HP_reserve)
+        if year_record:
+            state.update(cumulative = (E_load_cumulative, EL_P_recieved_cumulative, EL_H2_prod_cumulative, EL_H2_prod_y_cumulative,
+                                       C_H2_prod_cumulative, C_P_cumulative, FC_P_delivered_cumulative, FC_H2_req_cumulative,
+                                       P_BESS_excess_cumulative, P_BESS_deficit_cumulative, P_excess_cumulative, P_deficit_cumulative))
+
+    #excess and deficit with BESS
+    E_deficit_BESS = (P_BESS_deficit_cumulative/kWh_factor)/1000          #[MWh]  deficit energy after BESS storage
+    E_excess_BESS = (P_BESS_excess_cumulative/kWh_factor)/1000            #[MWh]  excess energy after BESS storage
+    E_to_load_BESS = E_load - E_deficit_BESS                             #[MWh]  energy feeding the load after BESS
+
+    E_comp = (C_P_cumulative/kWh_factor)/1000                             #[MWh]  electrical en absorbed by compressor
+    E_RES_to_H2 = (EL_P_recieved_cumulative/kWh_factor)/1000              #[MWh]  electrical en converted to hydrogen
+
+    #excess and deficit with H2
+    E_deficit_H2 = (P_deficit_cumulative/kWh_factor)/1000                 #[MWh]  deficit energy after H2 storage
+    E_excess_H2 = (P_excess_cumulative/kWh_factor)/1000                   #[MWh]  excess energy after H2 storage
+    E_to_load_H2 = E_load - E_deficit_H2                                 #[MWh]  energy feeding the load after H2
+
+    #average conversion factors while active
+    if not dynamic:
+        EL_CF_output = EL_CF * 1000
+        FC_CF_output = FC_CF * 1000
+    else:
+        EL_CF_output = EL_CF_active_sum/EL_CF_active_n*1000 if EL_CF_active_n != 0 else EL_CF_0
+        FC_CF_output = FC_CF_active_sum/FC_CF_active_n*1000 if FC_CF_active_n != 0 else FC_CF_0
+
+    'output'
+    output = new_record(YEAR_DTYPE if year_record else COMPLETE_DTYPE)
+    output['BESS[MWh]'] = [BESS_capacity]
+    output['SOH_final'] = [BESS_SOH]
+
+    output['PV_power[kWp]'] = [160 * (1 + PV_upgrade/16)]
+    output['EL_n_cells'] = [EL_cell_number]
+    output['FC_n_cells'] = [FC_cell_number]
+    output['HP_tank[kg]'] = [tank]
+    output['LP_tank[kg]'] = [lp_tank]
+
+    output['EL_CF[kg/MWh]'] = [EL_CF_output]
+    output['FC_CF[kg/MWh]'] = [FC_CF_output]
+
+    if not year_record:
+        output['EL_CF_fin'] = [EL_CF_final]
+        output['FC_CF_fin'] = [FC_CF_final]
+        output['EL_h_work'] = [EL_h_work]
+        output['FC_h_work'] = [FC_h_work]
+
+        #RES-only KPIs
+        output['E_RES[MWh]']= [RES['E_RES']]
+        output['E_deficit_RES[MWh]']= [RES['E_deficit_RES']]
+        output['E_excess_RES[MWh]']= [RES['E_excess_RES']]
+        output['RES_SC[%]'] = [(E_load - RES['E_deficit_RES'])/E_load * 100]
+
+    output['H2_prod_EL[kg]'] = [EL_H2_prod_cumulative]
+    output['H2_Comp [kg]']  = [C_H2_prod_cumulative]
+
+    output['E_BESS_deficit[MWh]']= [E_deficit_BESS]
+    output['E_BESS_excess[MWh]'] = [E_excess_BESS]
+    output['BESS_SC[%]'] = [E_to_load_BESS/E_load * 100]
+
+    output['E_to_H2[MWh]'] = [E_RES_to_H2]
+    output['E_comp[MWh]'] = [E_comp]
+
+    output['E_H2_deficit[MWh]']= [E_deficit_H2]
+    output['E_H2_excess[MWh]'] = [E_excess_H2]
+    output['H2_SC[%]'] = [E_to_load_H2/E_load * 100]
+
+    if prof:
+        profiler.lap('post_processing', t0)
+        return output, profiler.report()
+
+    return output
@@ -0,0 +1,106 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from LCORE_calculator import LCORE_function
+
+
+'''
+Early termination of the evaluation of designs that can not beat the best design found so far (incumbent)
+
+- the CAPEX and O&M terms of the LCORE are known before any simulation
+- the deficit term grows monotonically while the years are simulated
+- as soon as the LCORE computed with the deficit accumulated so far (and no deficit in the following years)
+  exceeds the incumbent, the simulation is stopped and this lower bound is returned, flagged as LCOREBound
+
+'''
+
+class DeficitBoundExceeded(Exception):
+    'raised by the simulations when the deficit energy exceeds E_deficit_max'
+
+    def __init__(self, E_deficit, step):
+        super().__init__('deficit energy ' + str(E_deficit) + ' MWh exceeded at step ' + str(step))
+        self.E_deficit = E_deficit      # [MWh] deficit accumulated until the stop
+        self.step = step                # time step of the stop
+
+
+class LCOREBound(float):
+    'lower bound of the LCORE of a design whose evaluation was stopped early (flagged value for the optimizer)'
+    bounded = True
+
+
+class LCORE_budget:
+    '''
+    Lower bound of the LCORE of a design as a function of the deficit of the first simulated years
+
+    sizes, components, electricity, lifetime, hydrogen, r : same inputs of LCORE_function
+    '''
+
+    def __init__(self, sizes, components, electricity, lifetime, hydrogen, r):
+        self.r = r
+        self.lifetime = lifetime
+
+        #LCORE without deficit and its increase for 1 MWh of deficit in the first year (LCORE is linear in the deficit)
+        self.base = LCORE_function(sizes, [0] * lifetime, components, electricity, lifetime, hydrogen, r)
+        E_def_1 = [1] + [0] * (lifetime - 1)
+        self.slope_1 = LCORE_function(sizes, E_def_1, components, electricity, lifetime, hydrogen, r) - self.base
+
+    def slope(self, n):
+        'LCORE increase for 1 MWh of deficit in year n (discounted)'
+        return self.slope_1 * (1 + self.r) / (1 + self.r) ** n
+
+    def lower_bound(self, E_def_years):
+        'LCORE with the deficits of the first years and no deficit in the following ones'
+        return self.base + sum(self.slope(n) * E for n, E in enumerate(E_def_years, start = 1))
+
+    def max_deficit(self, incumbent, E_def_years):
+        'deficit [MWh] of the next year that brings the lower bound to the incumbent'
+        n = len(E_def_years) + 1
+        if self.slope(n) <= 0:
+            return np.inf
+        return (incumbent - self.lower_bound(E_def_years)) / self.slope(n)
+
+
+class SharedIncumbent:
+    '''
+    Best LCORE found so far, shared by all the worker processes through a small file
+
+    - get() reads the current value (inf if none)
+    - update(value) writes the value if it improves the incumbent (atomic replace of the file)
+    Concurrent updates can leave a slightly worse value in the file: it is still the LCORE of an evaluated design,
+    so the early termination stays valid, only less aggressive.
+    '''
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+
+    def reset(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def get(self):
+        try:
+            with open(self.path) as f:
+                return float(f.read())
+        except (OSError, ValueError):
+            return np.inf
+
+    def update(self, value):
+        if getattr(value, 'bounded', False) or not np.isfinite(value) or value >= self.get():
+            return False
+        fd, tmp = tempfile.mkstemp(dir = os.path.dirname(self.path))
+        with os.fdopen(fd, 'w') as f:
+            f.write(repr(float(value)))
+        os.replace(tmp, self.path)
+        return True
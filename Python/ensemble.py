@@ -0,0 +1,462 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import argparse
+import os
+import pickle
+import time
+import warnings
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from LCORE_evaluation import scenario_setup, LCORE_evaluation
+from representative_days import compress_year, day_steps
+from synthetic_data import synthetic_year
+
+
+'''
+Evaluation of a design over an ensemble of weather and load years
+
+- YearEnsemble : the years of the ensemble, recorded (dataframes or pickle files), resampled from one recorded
+  year (seasonal block bootstrap: blocks of block_days consecutive days taken from a random start within
+  window_days of their date, wind, PV, load and temperature of the same days together) or synthetic
+  (synthetic_data.py); year i is generated on demand from (seed, i), optionally compressed to rep_days
+  representative days (compress_year) to speed up the simulations
+- EnsembleEvaluator : the years of a design are simulated in parallel (LCORE_evaluation), the LCORE and the KPIs
+  of each year are aggregated as they arrive in StreamingStats (mean and variance of Welford, extremes and P2
+  quantile estimators of Jain and Chlamtac, exact up to 64 values): the memory does not grow with the number
+  of years
+- EnsembleObjective : expected or quantile LCORE of a design over the ensemble, picklable objective of the
+  optimizers (same years for every design)
+
+python ensemble.py --design 2 2 4 1 2 --years 30 --method resample --rep-days 12 --workers -1 --output ensemble.csv
+
+'''
+
+#KPIs of each year of the ensemble: averages over the lifetime (first year only for the degradation and production)
+KPIS = ['H2_SC[%]', 'RES_SC[%]', 'E_H2_deficit[MWh]', 'E_H2_excess[MWh]', 'H2_prod_EL[kg]', 'SOH_final']
+FIRST_YEAR = ['H2_prod_EL[kg]', 'SOH_final']
+
+
+def resample_year(df_data, seed = 0, block_days = 5, window_days = 15):
+    '''
+    df_data : input dataframe of whole days (wind_power, PV_power, load, temperature, date)
+    seed : seed (or list of seeds) of the random generator
+    block_days : days of each resampled block
+    window_days : largest shift of the blocks from their date [days] (seasonality preserved)
+
+    returns a dataframe of the same length and dates with the days of the blocks resampled
+    '''
+    n_days = len(df_data) // day_steps
+    if n_days * day_steps != len(df_data):
+        raise ValueError('the input data must contain whole days of ' + str(day_steps) + ' time steps')
+
+    rng = np.random.default_rng(seed)
+    days = []
+    for start in range(0, n_days, block_days):
+        length = min(block_days, n_days - start)
+        source = start + int(rng.integers(-window_days, window_days + 1))
+        days.append((source + np.arange(length)) % n_days)
+    days = np.concatenate(days)
+
+    rows = (days[:, None] * day_steps + np.arange(day_steps)[None, :]).ravel()
+    df_year = df_data.iloc[rows].reset_index(drop = True)
+    if 'date' in df_data.columns:
+        df_year['date'] = df_data['date'].to_numpy()
+    return df_year
+
+
+class YearEnsemble:
+    '''
+    base : input dataframe (resampled years) or list of recorded years (dataframes or pickle files)
+    n_years : number of years of the ensemble (default the number of recorded years)
+    method : 'recorded', 'resample' (seasonal block bootstrap of base) or 'synthetic' (synthetic_year)
+    seed : seed of the ensemble, year i uses the seeds (seed, i)
+    block_days, window_days : blocks of the resampled years (resample_year)
+    rep_days : optional number of representative days of each year (compress_year), None for whole years
+
+    year(i) returns the input dataframe of year i of the ensemble
+    '''
+
+    def __init__(self, base = None, n_years = None, method = 'resample', seed = 0, block_days = 5, window_days = 15,
+                 rep_days = None):
+        if method not in ('recorded', 'resample', 'synthetic'):
+            raise ValueError('unknown method ' + str(method))
+        if method == 'recorded':
+            base = list(base)
+            n_years = len(base) if n_years is None else n_years
+            if n_years > len(base):
+                raise ValueError(str(n_years) + ' years requested, ' + str(len(base)) + ' recorded')
+        elif method == 'resample' and not isinstance(base, pd.DataFrame):
+            raise ValueError('the resampled years need the input dataframe as base')
+
+        self.base = base
+        self.n_years = 30 if n_years is None else n_years
+        self.method = method
+        self.seed = seed
+        self.block_days = block_days
+        self.window_days = window_days
+        self.rep_days = rep_days
+        self._compressed = {}
+
+    def __len__(self):
+        return self.n_years
+
+    def __getstate__(self):
+        #compressed years are rebuilt by each process
+        state = dict(self.__dict__)
+        state['_compressed'] = {}
+        return state
+
+    def _full_year(self, i):
+        if self.method == 'recorded':
+            year = self.base[i]
+            if isinstance(year, pd.DataFrame):
+                return year
+            with open(year, 'rb') as f:
+                return pickle.load(f)
+        if self.method == 'resample':
+            return resample_year(self.base, [self.seed, i], self.block_days, self.window_days)
+        return synthetic_year(seed = self.seed * 100003 + i)
+
+    def year(self, i):
+        if not 0 <= i < self.n_years:
+            raise IndexError('year ' + str(i) + ' out of the ensemble')
+        if self.rep_days is None:
+            return self._full_year(i)
+        #compressed years are small: kept for the following designs
+        if i not in self._compressed:
+            self._compressed[i] = compress_year(self._full_year(i), k = self.rep_days)[0]
+        return self._compressed[i]
+
+
+#%%
+'streaming statistics'
+
+class P2Quantile:
+    '''
+    p : probability of the quantile
+    exact : number of values stored before the estimator is started (exact quantile up to exact values)
+
+    P2 estimator (Jain and Chlamtac, 1985): five markers whose heights follow the minimum, p/2, p, (1+p)/2
+    quantiles and the maximum, adjusted with a parabolic prediction at each observation, started from the
+    stored values
+    '''
+
+    def __init__(self, p, exact = 64):
+        if not 0 < p < 1:
+            raise ValueError('the probability of the quantile must be in (0, 1)')
+        self.p = p
+        self.exact = max(exact, 5)
+        self.values = []
+        self.q = None
+        self.dn = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def _start(self):
+        'markers at the quantiles of the stored values'
+        x = np.sort(self.values)
+        m = len(x) - 1
+        self.n_des = [m * f for f in self.dn]
+        n = [int(round(v)) for v in self.n_des]
+        for i in range(1, 5):
+            n[i] = max(n[i], n[i - 1] + 1)
+        for i in range(3, 0, -1):
+            n[i] = min(n[i], n[i + 1] - 1)
+        self.n = n
+        self.q = [float(x[i]) for i in n]
+        self.values = None
+
+    def update(self, x):
+        if self.q is None:
+            self.values.append(x)
+            if len(self.values) > self.exact:
+                self._start()
+            return
+        q, n = self.q, self.n
+
+        'cell of the observation, extreme markers updated'
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k = k + 1
+        for i in range(k + 1, 5):
+            n[i] = n[i] + 1
+        for i in range(5):
+            self.n_des[i] = self.n_des[i] + self.dn[i]
+
+        'middle markers moved towards their desired positions'
+        for i in range(1, 4):
+            d = self.n_des[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * ((n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                                                        + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] = n[i] + d
+
+    def value(self):
+        if self.q is None:
+            return float(np.quantile(self.values, self.p)) if len(self.values) > 0 else np.nan
+        return self.q[2]
+
+
+class StreamingStats:
+    '''
+    quantiles : probabilities of the estimated quantiles
+
+    update(x) with each value (nan for a failed evaluation), summary() gives count, mean, standard deviation,
+    standard error of the mean, extremes and quantiles in constant memory
+    '''
+
+    def __init__(self, quantiles = (0.05, 0.5, 0.95)):
+        self.n = 0
+        self.n_failed = 0
+        self.mean = 0.0
+        self.M2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.quantiles = dict((p, P2Quantile(p)) for p in quantiles)
+
+    def update(self, x):
+        x = float(x)
+        if not np.isfinite(x):
+            self.n_failed = self.n_failed + 1
+            return
+        self.n = self.n + 1
+        d = x - self.mean
+        self.mean = self.mean + d / self.n
+        self.M2 = self.M2 + d * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        for estimator in self.quantiles.values():
+            estimator.update(x)
+
+    @property
+    def std(self):
+        return np.sqrt(self.M2 / (self.n - 1)) if self.n > 1 else np.nan
+
+    def quantile(self, p):
+        return self.quantiles[p].value()
+
+    def summary(self):
+        summary = {'n': self.n, 'failed': self.n_failed, 'mean': self.mean if self.n > 0 else np.nan, 'std': self.std,
+                   'sem': self.std / np.sqrt(self.n) if self.n > 1 else np.nan,
+                   'min': self.min if self.n > 0 else np.nan, 'max': self.max if self.n > 0 else np.nan}
+        for p in self.quantiles:
+            summary['q' + str(round(p * 100, 1)).rstrip('0').rstrip('.')] = self.quantile(p)
+        return summary
+
+
+#%%
+'evaluation of the years in the worker processes'
+
+_worker = {}
+
+
+def _init_worker(ensemble, scenario):
+    'ensemble and scenario sent once to each worker process'
+    _worker['ensemble'] = ensemble
+    _worker['scenario'] = scenario
+
+
+def evaluate_year(design, ensemble, scenario, i):
+    '''
+    design : design in grid units [EL, FC, BESS, Tank, PV]
+    i : year of the ensemble
+
+    returns the LCORE and the KPIs of the design with the inputs of year i (nan if the evaluation failed)
+    '''
+    try:
+        LCORE, df_output_years = LCORE_evaluation(list(design), ensemble.year(i), scenario, full_output = True)
+        kpis = {'LCORE': float(LCORE)}
+        for name in KPIS:
+            kpis[name] = float(df_output_years[name][0] if name in FIRST_YEAR else df_output_years[name].mean())
+    except Exception as e:
+        kpis = dict((name, np.nan) for name in ['LCORE'] + KPIS)
+        kpis['error'] = type(e).__name__ + ': ' + str(e)
+    return kpis
+
+
+def _evaluate_year(task):
+    design, i = task
+    return i, evaluate_year(design, _worker['ensemble'], _worker['scenario'], i)
+
+
+class EnsembleEvaluator:
+    '''
+    ensemble : YearEnsemble
+    scenario : cost scenario (scenario_setup)
+    quantiles : probabilities of the estimated quantiles
+    workers : number of processes (-1 all the cores, 1 evaluations in this process)
+    '''
+
+    def __init__(self, ensemble, scenario, quantiles = (0.05, 0.5, 0.95), workers = -1):
+        self.ensemble = ensemble
+        self.scenario = scenario
+        self.quantiles = tuple(quantiles)
+        self.errors = {}
+
+        _init_worker(ensemble, scenario)
+        self.processes = min(os.cpu_count() if workers == -1 else workers, len(ensemble))
+        self.pool = Pool(self.processes, _init_worker, (ensemble, scenario)) if self.processes > 1 else None
+
+    def evaluate(self, design, callback = None):
+        '''
+        design : design in grid units [EL, FC, BESS, Tank, PV]
+        callback : optional function (i, kpis, stats) called after each year
+
+        returns the dictionary LCORE / KPI -> StreamingStats over the years of the ensemble
+        '''
+        design = tuple(int(v) for v in design)
+        stats = dict((name, StreamingStats(self.quantiles)) for name in ['LCORE'] + KPIS)
+        tasks = ((design, i) for i in range(len(self.ensemble)))
+
+        results = self.pool.imap_unordered(_evaluate_year, tasks) if self.pool is not None else \
+                  map(_evaluate_year, tasks)
+        for i, kpis in results:
+            for name, s in stats.items():
+                s.update(kpis[name])
+            if 'error' in kpis:
+                self.errors[(design, i)] = kpis['error']
+            if callback is not None:
+                callback(i, kpis, stats)
+        return stats
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+
+def ensemble_frame(stats, design = None):
+    'one DataFrame of the statistics of the LCORE and of the KPIs (rows) of a design'
+    df = pd.DataFrame([dict(quantity = name, **s.summary()) for name, s in stats.items()])
+    if design is not None:
+        df.insert(0, 'design', str(list(design)))
+    return df
+
+
+class EnsembleObjective:
+    '''
+    ensemble : YearEnsemble
+    scenario : cost scenario (scenario_setup)
+    statistic : 'mean' (expected LCORE) or the probability of an LCORE quantile (for example 0.9)
+    workers : processes of the years of each design (1 when the optimizer evaluates the designs in parallel)
+
+    objective(s) returns the statistic of the LCORE of the design s over the years of the ensemble (inf if a year
+    failed), the years are the same for every design (common random numbers)
+
+    with workers != 1 one EnsembleEvaluator (pool of processes holding the ensemble) is created at the first
+    design and kept for the following ones: close() terminates it, it is not pickled with the objective
+    '''
+
+    def __init__(self, ensemble, scenario, statistic = 'mean', workers = 1):
+        if statistic != 'mean' and not 0 < statistic < 1:
+            raise ValueError("statistic must be 'mean' or a probability in (0, 1)")
+        self.ensemble = ensemble
+        self.scenario = scenario
+        self.statistic = statistic
+        self.workers = workers
+        self._evaluator = None
+
+    def __getstate__(self):
+        #the pool of the evaluator stays in the process that created it
+        state = dict(self.__dict__)
+        state['_evaluator'] = None
+        return state
+
+    def stats(self, s):
+        'StreamingStats of the LCORE of the design s (grid units) over the ensemble'
+        quantiles = () if self.statistic == 'mean' else (self.statistic,)
+        if self.workers == 1:
+            LCORE = StreamingStats(quantiles)
+            for i in range(len(self.ensemble)):
+                LCORE.update(evaluate_year(s, self.ensemble, self.scenario, i)['LCORE'])
+            return LCORE
+
+        if self._evaluator is None:
+            self._evaluator = EnsembleEvaluator(self.ensemble, self.scenario, quantiles, self.workers)
+        return self._evaluator.evaluate(s)['LCORE']
+
+    def close(self):
+        if self._evaluator is not None:
+            self._evaluator.close()
+            self._evaluator = None
+
+    def __call__(self, s):
+        LCORE = self.stats([int(v) for v in s])
+        if LCORE.n_failed > 0 or LCORE.n == 0:
+            return np.inf
+        return LCORE.mean if self.statistic == 'mean' else LCORE.quantile(self.statistic)
+
+
+#%%
+if __name__ == "__main__":
+
+    warnings.filterwarnings('ignore')
+
+    parser = argparse.ArgumentParser(description = 'LCORE and KPI distributions of designs over an ensemble of weather and load years')
+    parser.add_argument('--design', type = int, nargs = 5, action = 'append', required = True, help = 'EL FC BESS Tank PV in grid units (repeatable)')
+    parser.add_argument('--data', default = 'df_load_and_power.pkl', help = 'input year of the resampled ensemble')
+    parser.add_argument('--recorded', nargs = '+', default = None, help = 'pickle files of recorded years (method recorded)')
+    parser.add_argument('--prices', default = 'prices_excel.xlsx')
+    parser.add_argument('--year', type = int, default = 2020, help = 'price scenario (2020, 2030, 2050)')
+    parser.add_argument('--method', default = 'resample', choices = ['recorded', 'resample', 'synthetic'])
+    parser.add_argument('--years', type = int, default = None, help = 'number of years (default 30, all the recorded years)')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--block-days', type = int, default = 5)
+    parser.add_argument('--window-days', type = int, default = 15)
+    parser.add_argument('--rep-days', type = int, default = None, help = 'representative days of each year (default whole years)')
+    parser.add_argument('--quantiles', type = float, nargs = '+', default = [0.05, 0.5, 0.95])
+    parser.add_argument('--workers', type = int, default = -1)
+    parser.add_argument('--output', default = 'ensemble.csv', help = 'csv file of the statistics, rewritten after each design')
+    args = parser.parse_args()
+
+    if args.method == 'recorded':
+        base = args.recorded
+    elif args.method == 'resample':
+        with open(args.data, 'rb') as f:
+            base = pickle.load(f)
+    else:
+        base = None
+
+    ensemble = YearEnsemble(base, args.years, args.method, args.seed, args.block_days, args.window_days, args.rep_days)
+    evaluator = EnsembleEvaluator(ensemble, scenario_setup(args.year, args.prices), args.quantiles, args.workers)
+    t_start = time.perf_counter()
+
+    def progress(i, kpis, stats):
+        LCORE = stats['LCORE']
+        print('year ' + str(i) + ': LCORE ' + str(round(kpis['LCORE'], 4)) + ' (mean ' + str(round(LCORE.mean, 4)) +
+              ', ' + str(LCORE.n + LCORE.n_failed) + '/' + str(len(ensemble)) + ' years, ' +
+              str(round(time.perf_counter() - t_start)) + ' s)', flush = True)
+
+    frames = []
+    try:
+        for design in args.design:
+            frames.append(ensemble_frame(evaluator.evaluate(design, callback = progress), design))
+            pd.concat(frames, axis = 0).to_csv(args.output, sep = ';', index = False)
+    finally:
+        evaluator.close()
+
+    for (design, i), error in evaluator.errors.items():
+        print('design ' + str(list(design)) + ', year ' + str(i) + ': ' + error)
+
+    pd.set_option('display.width', 200)
+    print(pd.concat(frames, axis = 0).to_string(index = False))
@@ -0,0 +1,285 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import argparse
+import inspect
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import synthetic_year
+from complete_simulation import complete_sim
+from extra_simplified_simulation import extra_simplified_sim
+from LCORE_evaluation import scenario_setup, LCORE_evaluation
+from parallel_in_time import pit_extra_simplified_sim
+from multi_stack import MultiStack
+from tank_reuse import TankCheckpoints
+from trace_export import TraceWriter, TraceReader
+from res_cache import cache_clear
+from sim_record import to_frame
+
+
+'''
+Reference-equivalence harness of the simulation engines
+
+- the reference implementation and an alternative engine are run on the same corpus of cases
+  (design and input year), each run starts with empty RES caches
+- every numeric column of the outputs (all the rows: yearly outputs of the LCORE evaluation) and optionally every
+  column of the minute traces (when both engines accept trace = TraceWriter, otherwise the traces are skipped)
+  is compared with per-column tolerances:
+  |candidate - reference| <= atol + rtol * |reference|
+- the report gives, for each case, the speed-up next to the maximum deviation and the worst column
+
+fixture_corpus builds small cases (2 synthetic days, edge-case designs) that run in seconds, tests/test_equivalence.py
+runs every registered candidate on them.
+
+python equivalence.py --engine complete_sim --candidate multi_stack_1 --days 2 --traces
+
+'''
+
+DESIGNS = {'base':       [20, 20, 500, 300, 10],          # [EL cells, FC cells, BESS kWh, HP tank kg, PV upgrade]
+           'no_EL':      [0, 20, 500, 300, 10],
+           'no_FC':      [20, 0, 500, 300, 10],
+           'no_tank':    [20, 20, 500, 0, 10],
+           'small_BESS': [20, 20, 50, 300, 0],
+           'large':      [70, 90, 5000, 2000, 100]}
+
+GRID_DESIGNS = {'base': [2, 2, 4, 1, 2],                  # grid units of LCORE_evaluation
+                'no_H2': [0, 0, 4, 0, 2],
+                'large': [10, 12, 100, 20, 10],
+                'large_tank': [10, 12, 100, 21, 10]}      # large with another HP tank (tank_reuse candidate)
+
+
+def fixture_corpus(engine = 'complete_sim', n_days = 2, seeds = (0,), designs = None, scenario = None):
+    '''
+    engine : 'complete_sim', 'extra_simplified_sim' or 'LCORE'
+    n_days : length of the synthetic years
+    seeds : seeds of the synthetic years
+    designs : dictionary name -> design (default DESIGNS, GRID_DESIGNS for 'LCORE')
+    scenario : cost scenario of the 'LCORE' cases (default scenario_setup(2020))
+
+    returns a list of cases {'name', 'args'}
+    '''
+    if designs is None:
+        designs = GRID_DESIGNS if engine == 'LCORE' else DESIGNS
+    if engine == 'LCORE' and scenario is None:
+        scenario = scenario_setup(2020)
+
+    cases = []
+    for seed in seeds:
+        df_data = synthetic_year(n_days, seed = seed)
+        for name, s in designs.items():
+            if engine == 'complete_sim':
+                args = (df_data, list(s))
+            elif engine == 'extra_simplified_sim':
+                #degraded battery and conversion factors of a later year
+                args = (df_data, list(s), 0.9 * s[2], 18.5 / 1000, 61 / 1000)
+            else:
+                args = (list(s), df_data, scenario)
+            cases.append({'name': name + '_seed' + str(seed), 'args': args})
+
+    return cases
+
+
+def _LCORE_reference(s, df_data, scenario):
+    'LCORE evaluation as a table: yearly outputs with the LCORE'
+    LCORE, df_output_years = LCORE_evaluation(s, df_data, scenario, full_output = True)
+    return df_output_years.assign(LCORE = LCORE)
+
+
+class _LCORETankReuse:
+    'LCORE evaluation with the first year resumed from the stored trajectories of the previous cases (tank_reuse.py)'
+
+    def __init__(self):
+        self.checkpoints = TankCheckpoints(interval_days = 1)
+
+    def __call__(self, s, df_data, scenario):
+        LCORE, df_output_years = LCORE_evaluation(s, df_data, scenario, full_output = True, checkpoints = self.checkpoints)
+        return df_output_years.assign(LCORE = LCORE)
+
+
+'engines available from the command line: reference and alternative engines with the same arguments'
+ENGINES = {'complete_sim': {'reference': complete_sim,
+                            'candidates': {'multi_stack_1': lambda df_data, s, trace = None:
+                                               complete_sim(df_data, s, trace = trace, stacks = MultiStack(1, 1, 'equal'))}},
+           'extra_simplified_sim': {'reference': extra_simplified_sim,
+                                    'candidates': {'pit': lambda df_data, s, BESS_size, EL_CF, FC_CF:
+                                                       pit_extra_simplified_sim(df_data, s, BESS_size, EL_CF, FC_CF,
+                                                                                n_blocks = 4, workers = 1)}},
+           'LCORE': {'reference': _LCORE_reference,
+                     'candidates': {'tank_reuse': _LCORETankReuse()}}}
+
+
+#%%
+def _as_frame(output):
+    'numeric table of an engine output: result record, DataFrame, (value, DataFrame) or scalar'
+    if isinstance(output, tuple):
+        value, df = output
+        output = df.assign(LCORE = value)
+    if isinstance(output, np.ndarray):
+        output = to_frame(output)
+    if not isinstance(output, pd.DataFrame):
+        output = pd.DataFrame({'value': [output]})
+    return output.select_dtypes(include = [np.number]).reset_index(drop = True)
+
+
+def _run(engine, case, trace_path, repeat):
+    'best time of repeat runs, output and trace (if trace_path) of the last one'
+    best = np.inf
+    for _ in range(repeat):
+        cache_clear()
+        #designs are scaled in place by the LCORE evaluation: fresh copies of the list arguments
+        args = [list(a) if isinstance(a, list) else a for a in case['args']]
+        kwargs = {}
+        if trace_path is not None:
+            if os.path.exists(trace_path):
+                shutil.rmtree(trace_path)
+            kwargs['trace'] = TraceWriter(trace_path)
+
+        t0 = time.perf_counter()
+        output = engine(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+
+    trace = None
+    if trace_path is not None:
+        kwargs['trace'].close()
+        trace = TraceReader(trace_path).read()
+
+    return _as_frame(output), trace, best
+
+
+def writes_traces(engine):
+    'True if the engine accepts trace = TraceWriter'
+    try:
+        parameters = inspect.signature(engine).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(p.name == 'trace' or p.kind == p.VAR_KEYWORD for p in parameters)
+
+
+def _tolerance(col, tolerances, rtol, atol):
+    tol = tolerances.get(col, (rtol, atol))
+    return (tol, atol) if np.isscalar(tol) else tol
+
+
+def _deviation(ref, cand, rtol, atol):
+    'maximum absolute and relative deviation, True if within the tolerances (equal NaNs match)'
+    ref = np.asarray(ref, dtype = float)
+    cand = np.asarray(cand, dtype = float)
+    if ref.shape != cand.shape:
+        return np.inf, np.inf, False
+    both_nan = np.isnan(ref) & np.isnan(cand)
+    diff = np.where(both_nan, 0, np.abs(cand - ref))
+    diff = np.where(np.isnan(diff), np.inf, diff)
+    rel = diff / np.maximum(np.abs(np.nan_to_num(ref)), 1e-300)
+    passed = bool(np.all(diff <= atol + rtol * np.abs(np.nan_to_num(ref))))
+    return (float(diff.max()) if diff.size else 0.0), (float(rel.max()) if rel.size else 0.0), passed
+
+
+def equivalence_report(reference, candidate, cases, tolerances = None, rtol = 1e-9, atol = 1e-9, traces = False, repeat = 1):
+    '''
+    reference, candidate : engines with the same arguments, returning the output DataFrame (or scalar or
+                           (value, DataFrame)), with traces = True the traces are compared if both accept
+                           trace = TraceWriter (skipped otherwise, 'traces' column of the report)
+    cases : list of {'name', 'args'} (fixture_corpus)
+    tolerances : dictionary column -> rtol or (rtol, atol), for output and trace columns
+    rtol, atol : default tolerances
+    repeat : runs of each engine, the best time is reported
+
+    returns a DataFrame of the cases (times, speed-up, maximum deviation, worst column, passed)
+    and a DataFrame of the columns of each case
+    '''
+    if tolerances is None:
+        tolerances = {}
+    traces = traces and writes_traces(reference) and writes_traces(candidate)
+
+    tmp = tempfile.mkdtemp() if traces else None
+    case_rows = []
+    col_rows = []
+
+    try:
+        for case in cases:
+            paths = [os.path.join(tmp, name) for name in ['reference', 'candidate']] if traces else [None, None]
+            ref, ref_trace, t_ref = _run(reference, case, paths[0], repeat)
+            cand, cand_trace, t_cand = _run(candidate, case, paths[1], repeat)
+
+            compared = [(col, ref[col], cand[col] if col in cand.columns else np.full(len(ref), np.nan))
+                        for col in ref.columns]
+            if traces:
+                compared += [('trace:' + col, ref_trace[col], cand_trace.get(col, np.zeros(0))) for col in ref_trace]
+
+            for col, r, c in compared:
+                col_rtol, col_atol = _tolerance(col.replace('trace:', ''), tolerances, rtol, atol)
+                abs_dev, rel_dev, passed = _deviation(r, c, col_rtol, col_atol)
+                col_rows.append({'case': case['name'], 'column': col, 'max_abs_dev': abs_dev, 'max_rel_dev': rel_dev,
+                                 'rtol': col_rtol, 'atol': col_atol, 'passed': passed})
+
+            df_case = pd.DataFrame(col_rows[len(col_rows) - len(compared):])
+            worst = df_case.loc[df_case['max_rel_dev'].idxmax()] if len(df_case) > 0 else None
+            case_rows.append({'case': case['name'],
+                              't_reference[s]': t_ref, 't_candidate[s]': t_cand,
+                              'speedup': t_ref / t_cand if t_cand > 0 else np.inf,
+                              'max_abs_dev': df_case['max_abs_dev'].max() if len(df_case) > 0 else 0.0,
+                              'max_rel_dev': worst['max_rel_dev'] if worst is not None else 0.0,
+                              'worst_column': worst['column'] if worst is not None else None,
+                              'n_failed': int((~df_case['passed']).sum()) if len(df_case) > 0 else 0,
+                              'passed': bool(df_case['passed'].all()) if len(df_case) > 0 else True,
+                              'traces': traces})
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors = True)
+
+    return pd.DataFrame(case_rows), pd.DataFrame(col_rows)
+
+
+#%%
+if __name__ == "__main__":
+
+    warnings.filterwarnings('ignore')
+
+    parser = argparse.ArgumentParser(description = 'equivalence of an alternative engine with the reference implementation')
+    parser.add_argument('--engine', default = 'complete_sim', choices = list(ENGINES))
+    parser.add_argument('--candidate', default = None, help = 'alternative engine (default: all the registered ones)')
+    parser.add_argument('--days', type = int, default = 2, help = 'length of the synthetic years [days]')
+    parser.add_argument('--seeds', type = int, nargs = '+', default = [0])
+    parser.add_argument('--rtol', type = float, default = 1e-9)
+    parser.add_argument('--atol', type = float, default = 1e-9)
+    parser.add_argument('--traces', action = 'store_true', help = 'compare also the minute traces')
+    parser.add_argument('--repeat', type = int, default = 1)
+    parser.add_argument('--output', default = None, help = 'csv file of the column deviations')
+    args = parser.parse_args()
+
+    spec = ENGINES[args.engine]
+    candidates = spec['candidates'] if args.candidate is None else {args.candidate: spec['candidates'][args.candidate]}
+    cases = fixture_corpus(args.engine, args.days, args.seeds)
+
+    all_passed = True
+    for name, candidate in candidates.items():
+        df_cases, df_columns = equivalence_report(spec['reference'], candidate, cases, rtol = args.rtol, atol = args.atol,
+                                                  traces = args.traces, repeat = args.repeat)
+        print(args.engine + ' / ' + name)
+        if args.traces and not (writes_traces(spec['reference']) and writes_traces(candidate)):
+            print('traces not compared: the engines do not both accept trace = TraceWriter')
+        print(df_cases.to_string(index = False))
+        failed = df_columns[~df_columns['passed']]
+        if len(failed) > 0:
+            print(failed.to_string(index = False))
+        all_passed = all_passed and bool(df_cases['passed'].all())
+        if args.output is not None:
+            df_columns.assign(candidate = name).to_csv(args.output, sep = ';', index = False,
+                                                       mode = 'a', header = not os.path.exists(args.output))
+
+    sys.exit(0 if all_passed else 1)
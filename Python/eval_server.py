@@ -0,0 +1,395 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import argparse
+import http.client
+import json
+import os
+import pickle
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Pool
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+import numpy as np
+from scipy.optimize import differential_evolution
+
+from LCORE_evaluation import scenario_setup, LCORE_evaluation
+from warm_start import EvaluationJournal
+
+
+'''
+Long-lived local evaluation server
+
+- the input data, the cost scenarios and a pool of warm worker processes (with their RES caches) are loaded once
+- the results of the evaluated designs are kept in memory: repeated designs are answered without simulation
+- HTTP API on localhost or on a Unix socket, results streamed back as JSON lines (one line per design
+  or per DE generation, as soon as they are available):
+
+    GET  /status                                            data, years, workers, cache size, uptime
+    POST /evaluate  {"designs": [[EL, FC, BESS, Tank, PV], ...], "year": 2020}
+    POST /optimize  {"year": 2020, "maxiter": 100, "popsize": 15, "seed": 0, "init": [[...], ...]}
+
+- EvaluationClient is the client of the notebooks (same address: 'http://host:port' or the socket path)
+
+python eval_server.py --data df_load_and_power.pkl --years 2020 2030 --port 8765
+python eval_server.py --data df_load_and_power.pkl --socket /tmp/h2_eval.sock
+
+'''
+
+#%%
+'evaluation of a design in the worker processes'
+
+_worker = {}
+
+
+def init_worker(df_data, scenarios):
+    'input data and scenarios sent once to each worker process'
+    _worker['df_data'] = df_data
+    _worker['scenarios'] = scenarios
+
+
+def evaluate_design(args):
+    '(design in grid units, year) -> LCORE, lifetime KPIs, sizes and yearly deficits (or the error) of the design'
+    config, year = args
+    t_start = time.perf_counter()
+
+    try:
+        LCORE, df_output_years = LCORE_evaluation(list(config), _worker['df_data'], _worker['scenarios'][year],
+                                                  full_output = True)
+    except Exception as e:
+        return {'config': list(config), 'year': year, 'error': type(e).__name__ + ': ' + str(e)}
+
+    return {'config': list(config), 'year': year, 'LCORE': float(LCORE),
+            'kpis': {'H2_SC[%]': df_output_years['H2_SC[%]'].mean(),
+                     'E_H2_excess[MWh]': df_output_years['E_H2_excess[MWh]'].mean(),
+                     'E_H2_deficit[MWh]': df_output_years['E_H2_deficit[MWh]'].mean(),
+                     'H2_prod_EL[kg]': df_output_years['H2_prod_EL[kg]'][0],
+                     'SOH_final': df_output_years['SOH_final'][0]},
+            'sizes': df_output_years.attrs['sizes'],
+            'E_def': list(df_output_years['E_H2_deficit[MWh]']),
+            'time': time.perf_counter() - t_start}
+
+
+def lattice_bounds(comp_dict):
+    'bounds of the decision variables of main.py (grid units)'
+    return [(0, comp_dict['EL']['max_s']   / comp_dict['EL']['res']),
+            (0, comp_dict['FC']['max_s']   / comp_dict['FC']['res']),
+            (1, comp_dict['BESS']['max_s'] / comp_dict['BESS']['res']),
+            (0, comp_dict['Tank']['max_s'] / comp_dict['Tank']['res']),
+            (0, comp_dict['PV']['max_s']   / comp_dict['PV']['res'])]
+
+
+#%%
+class EvaluationServer:
+    '''
+    Resident evaluation state, usable also directly in a Python session
+
+    df_data : input dataframe (wind_power, PV_power, load, temperature)
+    years : reference years of the cost scenarios held in memory
+    prices_file : Excel file with the component prices
+    workers : number of worker processes (-1 all the cores, 1 evaluations in the calling thread)
+    journal : optional EvaluationJournal path, each new evaluation is appended to it (warm starts)
+    '''
+
+    def __init__(self, df_data, years = (2020,), prices_file = 'prices_excel.xlsx', workers = -1, journal = None):
+        self.df_data = df_data
+        self.scenarios = dict((year, scenario_setup(year, prices_file)) for year in years)
+        self.journal = EvaluationJournal(journal, df_data) if journal is not None else None
+        self.results = {}                # (year, design) -> result of the evaluation
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.t_start = time.time()
+
+        init_worker(df_data, self.scenarios)
+        self.processes = os.cpu_count() if workers == -1 else workers
+        self.pool = Pool(self.processes, init_worker, (df_data, self.scenarios)) if self.processes > 1 else None
+
+    def status(self):
+        return {'n_steps': len(self.df_data), 'years': list(self.scenarios), 'workers': self.processes,
+                'cached': len(self.results), 'hits': self.hits, 'misses': self.misses,
+                'uptime[s]': time.time() - self.t_start}
+
+    def evaluate(self, designs, year = None):
+        '''
+        designs : designs in grid units
+        year : cost scenario (default: the first one)
+
+        yields the result of each design (cached designs first, the others as soon as they are evaluated)
+        '''
+        year = list(self.scenarios)[0] if year is None else int(year)
+        if year not in self.scenarios:
+            raise ValueError('scenario ' + str(year) + ' not loaded, available: ' + str(list(self.scenarios)))
+
+        new = {}                         # design -> number of times it was requested
+        for design in designs:
+            key = (year, tuple(int(round(v)) for v in design))
+            with self.lock:
+                result = self.results.get(key)
+                if result is not None:
+                    self.hits += 1
+            if result is not None:
+                yield dict(result, cached = True)
+            else:
+                new[key[1]] = new.get(key[1], 0) + 1
+
+        with self.lock:
+            self.misses += len(new)
+        tasks = [(config, year) for config in new]
+        outputs = self.pool.imap_unordered(evaluate_design, tasks) if self.pool is not None else map(evaluate_design, tasks)
+
+        for result in outputs:
+            if 'error' not in result:
+                with self.lock:
+                    self.results[(year, tuple(result['config']))] = result
+                if self.journal is not None:
+                    self.journal.write(result['config'], result['LCORE'], result['sizes'], result['E_def'])
+            for _ in range(new[tuple(result['config'])]):
+                yield dict(result, cached = False)
+
+    def optimize(self, year = None, bounds = None, maxiter = 100, popsize = 15, seed = None, init = 'latinhypercube'):
+        '''
+        differential evolution of main.py on the server, each generation is evaluated as a batch (cached designs
+        are not simulated again)
+
+        yields one record per generation (best design and LCORE) and a final record with the result
+        '''
+        year = list(self.scenarios)[0] if year is None else int(year)
+        if bounds is None:
+            bounds = lattice_bounds(self.scenarios[year]['comp_dict'])
+
+        def batch_map(func, population):
+            'map-like workers of differential_evolution: the objective is the cached LCORE of the server'
+            LCOREs = dict((tuple(r['config']), r.get('LCORE', np.inf)) for r in self.evaluate(list(population), year))
+            return [LCOREs[tuple(int(round(v)) for v in x)] for x in population]
+
+        generations = []
+
+        def callback(intermediate_result):
+            generations.append({'generation': len(generations) + 1,
+                                'x': [int(round(v)) for v in intermediate_result.x],
+                                'LCORE': float(intermediate_result.fun),
+                                'nfev': int(intermediate_result.nfev)})
+
+        'the optimization runs in a thread, the generations are yielded while it runs'
+        output = {}
+
+        def run():
+            try:
+                output['result'] = differential_evolution(lambda x: np.inf, bounds,
+                                                          integrality = [True] * len(bounds),
+                                                          updating = 'deferred', workers = batch_map,
+                                                          maxiter = maxiter, popsize = popsize, seed = seed,
+                                                          init = init if isinstance(init, str) else np.asarray(init, dtype = float),
+                                                          callback = callback, polish = False)
+            except Exception as e:
+                output['error'] = type(e).__name__ + ': ' + str(e)
+
+        thread = threading.Thread(target = run)
+        thread.start()
+        sent = 0
+        while thread.is_alive() or sent < len(generations):
+            thread.join(0.1)
+            while sent < len(generations):
+                yield generations[sent]
+                sent = sent + 1
+
+        if 'error' in output:
+            yield {'error': output['error']}
+        else:
+            result = output['result']
+            yield {'x': [int(round(v)) for v in result.x], 'LCORE': float(result.fun), 'nit': int(result.nit),
+                   'nfev': int(result.nfev), 'message': str(result.message)}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+
+#%%
+'HTTP API'
+
+class _Handler(BaseHTTPRequestHandler):
+
+    server_version = 'H2EvalServer'
+
+    def address_string(self):
+        #Unix sockets have no client address
+        return self.client_address[0] if isinstance(self.client_address, tuple) and self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _stream(self, records):
+        'JSON lines written and flushed one by one (HTTP/1.0: the end of the response closes the connection)'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        for record in records:
+            self.wfile.write((json.dumps(record, default = float) + '\n').encode())
+            self.wfile.flush()
+
+    def _error(self, code, message):
+        body = json.dumps({'error': message}).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/status':
+            self._stream([self.server.evaluator.status()])
+        else:
+            self._error(404, 'unknown path ' + self.path)
+
+    def do_POST(self):
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError as e:
+            return self._error(400, 'invalid JSON: ' + str(e))
+
+        evaluator = self.server.evaluator
+        try:
+            if self.path == '/evaluate':
+                records = evaluator.evaluate(request['designs'], request.get('year'))
+            elif self.path == '/optimize':
+                records = evaluator.optimize(**request)
+            else:
+                return self._error(404, 'unknown path ' + self.path)
+            first = next(records, None)
+        except (KeyError, TypeError, ValueError) as e:
+            return self._error(400, type(e).__name__ + ': ' + str(e))
+
+        self._stream(_chain(first, records))
+
+
+def _chain(first, records):
+    if first is not None:
+        yield first
+    yield from records
+
+
+class _UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(evaluator, port = 8765, host = '127.0.0.1', socket_path = None, verbose = False):
+    '''
+    evaluator : EvaluationServer
+    port, host : HTTP address (localhost only by default)
+    socket_path : Unix socket used instead of the TCP port
+    '''
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        httpd = _UnixHTTPServer(socket_path, _Handler)
+    else:
+        httpd = ThreadingHTTPServer((host, port), _Handler)
+        httpd.daemon_threads = True
+    httpd.evaluator = evaluator
+    httpd.verbose = verbose
+
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+    return httpd
+
+
+#%%
+'client'
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path, timeout = None):
+        super().__init__('localhost', timeout = timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+class EvaluationClient:
+    '''
+    address : 'http://host:port' of the server or path of its Unix socket
+    '''
+
+    def __init__(self, address = 'http://127.0.0.1:8765', timeout = None):
+        self.address = address
+        self.timeout = timeout
+
+    def _connection(self):
+        if self.address.startswith('http://'):
+            host, port = self.address[len('http://'):].rstrip('/').split(':')
+            return http.client.HTTPConnection(host, int(port), timeout = self.timeout)
+        return _UnixHTTPConnection(self.address, timeout = self.timeout)
+
+    def _request(self, method, path, body = None):
+        conn = self._connection()
+        try:
+            conn.request(method, path, body = json.dumps(body) if body is not None else None,
+                         headers = {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            if response.status != 200:
+                raise RuntimeError('server error ' + str(response.status) + ': ' + response.read().decode())
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            conn.close()
+
+    def status(self):
+        return next(self._request('GET', '/status'))
+
+    def evaluate(self, designs, year = None):
+        'yields the result of each design (grid units) as soon as it is available'
+        return self._request('POST', '/evaluate', {'designs': [[int(v) for v in d] for d in designs], 'year': year})
+
+    def optimize(self, **job):
+        'yields one record per DE generation and the final result (year, bounds, maxiter, popsize, seed, init)'
+        return self._request('POST', '/optimize', job)
+
+
+#%%
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description = 'resident LCORE evaluation server')
+    parser.add_argument('--data', default = 'df_load_and_power.pkl', help = 'pickle of the input dataframe')
+    parser.add_argument('--prices', default = 'prices_excel.xlsx', help = 'Excel file with the component prices')
+    parser.add_argument('--years', type = int, nargs = '+', default = [2020], help = 'cost scenarios held in memory')
+    parser.add_argument('--workers', type = int, default = -1, help = 'worker processes (-1 all the cores)')
+    parser.add_argument('--port', type = int, default = 8765)
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--socket', default = None, help = 'Unix socket used instead of the TCP port')
+    parser.add_argument('--journal', default = None, help = 'JSONL journal of the new evaluations')
+    parser.add_argument('--verbose', action = 'store_true', help = 'log the requests')
+    args = parser.parse_args()
+
+    with open(args.data, 'rb') as f:
+        df_data = pickle.load(f)
+
+    evaluator = EvaluationServer(df_data, args.years, args.prices, args.workers, args.journal)
+    print('serving on ' + (args.socket if args.socket is not None else 'http://' + args.host + ':' + str(args.port)), flush = True)
+    try:
+        serve(evaluator, args.port, args.host, args.socket, args.verbose)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        evaluator.close()
@@ -0,0 +1,244 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import argparse
+import os
+import pickle
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from LCORE_calculator import LCORE_function
+from LCORE_evaluation import scenario_setup, LCORE_evaluation, design_sizes
+from complete_simulation import complete_sim
+from multi_stack import MultiStack
+from sim_record import to_frame
+
+
+'''
+Full-fidelity lifetime simulation
+
+The LCORE evaluation simulates the first year in detail and projects the degradation of the following years with
+fitted curves. Here every year of the lifetime is simulated with complete_sim at minute resolution, carrying the
+state from one year to the next: SOC, battery damage (Degr, SOH), EL/FC working hours and temperatures,
+low and high pressure tank levels and compressor counter (and the stacks of a MultiStack).
+
+- end of life replacements are checked at the end of each year (per stack with a MultiStack), a replaced
+  component restarts as new:
+    eol = 'projection' : the rule of the projection of LCORE_evaluation (degradation_projection.py), so that
+                         compare_extrapolation measures only the extrapolation error: battery SOH <= 0.7, EL
+                         conversion factor at 71 °C below the limit of the maximum cell voltage, every component
+                         replaced at the latest after 10 years (the years of the projection). The FC is not replaced
+                         on its conversion factor: the projection compares the factor in kg/MWh with a limit in
+                         kg/kWh, which is never reached
+    eol = 'physical'   : battery and EL as above, FC conversion factor at 60 °C above the limit of the minimum
+                         stack voltage (consistent units), no replacement at a fixed age
+  the FC_past_limit column reports the years ending with the FC beyond its limit in both cases
+- the years are produced one at a time (iter_lifetime): the memory is the one of a single year
+- compare_extrapolation runs both evaluations of a design and reports the yearly deficits and the LCOREs
+
+python lifetime_simulation.py --design 2 2 4 1 2 --year 2020 [--stacks 10] [--eol physical] [--output years.csv]
+
+'''
+
+BESS_SOH_EOL = 0.7
+EL_CF_LIM = 18 / 106 / (2.3 * 5000 / 1000000) / 1000     # kg/kWh  (EL_H2_nom, EL_V_max, EL_I_id of LCORE_evaluation)
+FC_CF_LIM = 59 / 74 / (46.2 * 230 / 1000)                # kg/kWh  (FC_H2_nom, FC_V_min, FC_I_id of LCORE_evaluation)
+EOL_YEARS = 10                                           # years of the projection of LCORE_evaluation
+
+
+def _replace(output, state, stacks, age, eol = 'projection'):
+    '''
+    end of life replacements at the end of a year: the state of the replaced components is reset
+
+    age : years in service of BESS, EL and FC (arrays of the stacks with a MultiStack), updated
+    eol : 'projection' or 'physical' (see the module description)
+    '''
+    projection = eol == 'projection'
+    for key in age:
+        age[key] = age[key] + 1
+
+    replaced = {'BESS_replaced': 0, 'EL_replaced': 0, 'FC_replaced': 0, 'FC_past_limit': 0}
+
+    if output['BESS[MWh]'][0] > 0 and (output['SOH_final'][0] <= BESS_SOH_EOL or (projection and age['BESS'] >= EOL_YEARS)):
+        state['Degr'] = 0
+        age['BESS'] = 0
+        replaced['BESS_replaced'] = 1
+
+    if 'EL_stacks' in state:
+        #stacks replaced one by one
+        EL_eol = (stacks.EL.CF_op() <= EL_CF_LIM) | (projection & (age['EL'] >= EOL_YEARS))
+        FC_past = stacks.FC.CF_op() >= FC_CF_LIM
+        FC_eol = (age['FC'] >= EOL_YEARS) if projection else FC_past
+        state['EL_stacks']['h_work'][EL_eol] = 0
+        state['FC_stacks']['h_work'][FC_eol] = 0
+        age['EL'][EL_eol] = 0
+        age['FC'][FC_eol] = 0
+        replaced['EL_replaced'] = int(EL_eol.sum())
+        replaced['FC_replaced'] = int(FC_eol.sum())
+        replaced['FC_past_limit'] = int(FC_past.sum())
+
+    else:
+        #EL and FC checked independently (conversion factor 0: component not simulated)
+        EL_eol = output['EL_CF_fin'][0] != 0 and output['EL_CF_fin'][0] <= EL_CF_LIM
+        FC_past = output['FC_CF_fin'][0] != 0 and output['FC_CF_fin'][0] >= FC_CF_LIM
+        FC_eol = age['FC'] >= EOL_YEARS if projection else FC_past
+        if output['EL_n_cells'][0] > 0 and (EL_eol or (projection and age['EL'] >= EOL_YEARS)):
+            state['EL_h_work'] = 0
+            age['EL'] = 0
+            replaced['EL_replaced'] = 1
+        if output['FC_n_cells'][0] > 0 and FC_eol:
+            state['FC_h_work'] = 0
+            age['FC'] = 0
+            replaced['FC_replaced'] = 1
+        replaced['FC_past_limit'] = int(FC_past)
+
+    return replaced
+
+
+def iter_lifetime(df_data, s, n_years = 20, stacks = None, trace = None, eol = 'projection'):
+    '''
+    df_data : input dataframe of one year (repeated every year) or list of the input dataframes of the years
+    s : design vector [EL cells, FC cells, BESS kWh, HP tank kg, PV upgrade]
+    n_years : number of years (ignored with a list of input dataframes)
+    stacks : optional MultiStack (multi_stack.py)
+    trace : optional TraceWriter (trace_export.py), the minute series of all the years are appended
+    eol : end of life rule, 'projection' (the one of LCORE_evaluation) or 'physical'
+
+    yields the output of complete_sim of each year as a one-row DataFrame (SOH, conversion factors and working hours at the end of the year),
+    with the year and the replacements done at its end
+    '''
+    if eol not in ('projection', 'physical'):
+        raise ValueError('eol must be projection or physical')
+
+    years = df_data if isinstance(df_data, list) else [df_data] * n_years
+    state = {}
+    age = None
+
+    for year, df_year in enumerate(years):
+        output = complete_sim(df_year, s, trace = trace, state = state, stacks = stacks)
+
+        if age is None:
+            age = {'BESS': 0, 'EL': 0, 'FC': 0}
+            if 'EL_stacks' in state:
+                age['EL'] = np.zeros(len(stacks.EL.n), dtype = int)
+                age['FC'] = np.zeros(len(stacks.FC.n), dtype = int)
+
+        output = to_frame(output)
+        output.insert(0, 'year', year + 1)
+        for col, value in _replace(output, state, stacks, age, eol).items():
+            output[col] = [value]
+
+        yield output
+
+
+def lifetime_sim(df_data, s, n_years = 20, stacks = None, trace = None, eol = 'projection', output_file = None):
+    '''
+    full-fidelity simulation of the lifetime (see iter_lifetime for the inputs)
+
+    output_file : optional csv file (';' separated) where each year is appended as soon as it is simulated
+
+    returns the DataFrame of the yearly outputs
+    '''
+    years = []
+    for output in iter_lifetime(df_data, s, n_years, stacks, trace, eol):
+        if output_file is not None:
+            output.to_csv(output_file, sep = ';', mode = 'a', header = len(years) == 0 and not os.path.exists(output_file))
+        years.append(output)
+
+    return pd.concat(years, axis = 0).reset_index(drop = True)
+
+
+def lifetime_LCORE(s, df_data, scenario, full_output = False, **kwargs):
+    '''
+    LCORE of a design from the full-fidelity lifetime simulation, same inputs and outputs of LCORE_evaluation
+
+    s : design vector in grid units [EL, FC, BESS, Tank, PV] (scaled in place by the resolutions of comp_dict)
+    kwargs : options of iter_lifetime (stacks, trace, eol) and output_file
+    '''
+    comp_dict = scenario['comp_dict']
+    for k, name in enumerate(['EL', 'FC', 'BESS', 'Tank', 'PV']):
+        s[k] = s[k] * comp_dict[name]['res']
+
+    df_output_years = lifetime_sim(df_data, s, scenario['lifetime'], **kwargs)
+    sizes = design_sizes(df_output_years)
+
+    LCORE = LCORE_function(sizes, df_output_years['E_H2_deficit[MWh]'], scenario['components'], scenario['electricity'],
+                           scenario['lifetime'], scenario['hydrogen'], scenario['r'])
+
+    if full_output:
+        df_output_years.attrs['sizes'] = sizes
+        return LCORE, df_output_years
+    return LCORE
+
+
+def compare_extrapolation(s, df_data, scenario, **kwargs):
+    '''
+    s : design vector in grid units (not modified)
+    kwargs : options of lifetime_LCORE
+
+    returns a DataFrame of the yearly deficits and self-sufficiency of the projected (LCORE_evaluation) and
+    full-fidelity lifetimes, the two LCOREs in attrs. With the default eol = 'projection' both lifetimes replace
+    the components with the same rule, FC_past_limit shows the years where the FC limit in consistent units
+    would have replaced the FC
+    '''
+    t0 = time.perf_counter()
+    LCORE_proj, df_proj = LCORE_evaluation(list(s), df_data, scenario, full_output = True)
+    t1 = time.perf_counter()
+    LCORE_full, df_full = lifetime_LCORE(list(s), df_data, scenario, full_output = True, **kwargs)
+    t2 = time.perf_counter()
+
+    df = pd.DataFrame({'year': df_full['year'],
+                       'E_H2_deficit_proj[MWh]': df_proj['E_H2_deficit[MWh]'],
+                       'E_H2_deficit_full[MWh]': df_full['E_H2_deficit[MWh]'],
+                       'H2_SC_proj[%]': df_proj['H2_SC[%]'],
+                       'H2_SC_full[%]': df_full['H2_SC[%]'],
+                       'SOH_full': df_full['SOH_final'],
+                       'EL_CF_fin_full[kg/MWh]': df_full['EL_CF_fin'] * 1000,
+                       'FC_CF_fin_full[kg/MWh]': df_full['FC_CF_fin'] * 1000,
+                       'BESS_replaced': df_full['BESS_replaced'],
+                       'EL_replaced': df_full['EL_replaced'],
+                       'FC_replaced': df_full['FC_replaced'],
+                       'FC_past_limit': df_full['FC_past_limit']})
+    df['deficit_error[%]'] = (df['E_H2_deficit_proj[MWh]'] / df['E_H2_deficit_full[MWh]'] - 1) * 100
+
+    df.attrs = {'LCORE_proj': LCORE_proj, 'LCORE_full': LCORE_full, 'time_proj[s]': t1 - t0, 'time_full[s]': t2 - t1}
+    return df
+
+
+#%%
+if __name__ == "__main__":
+
+    warnings.filterwarnings('ignore')
+
+    parser = argparse.ArgumentParser(description = 'full-fidelity lifetime simulation of a design vs the projected lifetime')
+    parser.add_argument('--design', type = int, nargs = 5, required = True, help = 'EL FC BESS Tank PV in grid units')
+    parser.add_argument('--data', default = 'df_load_and_power.pkl')
+    parser.add_argument('--prices', default = 'prices_excel.xlsx')
+    parser.add_argument('--year', type = int, default = 2020, help = 'price scenario (2020, 2030, 2050)')
+    parser.add_argument('--stacks', type = int, default = None, help = 'number of EL and FC stacks (MultiStack, rotation)')
+    parser.add_argument('--eol', default = 'projection', choices = ['projection', 'physical'], help = 'end of life rule')
+    parser.add_argument('--output', default = None, help = 'csv file of the simulated years')
+    args = parser.parse_args()
+
+    with open(args.data, 'rb') as f:
+        df_data = pickle.load(f)
+
+    scenario = scenario_setup(args.year, args.prices)
+    stacks = MultiStack(args.stacks, args.stacks) if args.stacks is not None else None
+
+    df = compare_extrapolation(args.design, df_data, scenario, stacks = stacks, eol = args.eol, output_file = args.output)
+
+    pd.set_option('display.width', 200)
+    print(df.to_string(index = False))
+    print('LCORE projected: ' + str(df.attrs['LCORE_proj']) + '  (' + str(round(df.attrs['time_proj[s]'], 1)) + ' s)')
+    print('LCORE full:      ' + str(df.attrs['LCORE_full']) + '  (' + str(round(df.attrs['time_full[s]'], 1)) + ' s)')
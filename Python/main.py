@@ -14,323 +14,217 @@ import numpy as np
 import pickle
 
 import time
+import os
 
 from LCORE_calculator import LCORE_function
-from complete_simulation import complete_sim
+from LCORE_evaluation import scenario_setup, LCORE_evaluation
 from extra_simplified_simulation import extra_simplified_sim
-from scipy.optimize import curve_fit
+from branch_and_bound import branch_and_bound
+from nsga2_optimizer import nsga2
+from async_optimizer import async_de
+from sim_profiler import SimProfiler, aggregate_profiles
+from telemetry import Telemetry, TelemetryMap, summarize_telemetry
+from early_termination import SharedIncumbent
+from warm_start import EvaluationJournal, warm_start_population
+from tank_reuse import TankCheckpoints
+import res_cache
+from ensemble import YearEnsemble, EnsembleObjective
+from broker import Broker
+import functools
 
 start_time = time.time()
 
 year = 2020
 
-"""
-USER INPUT REQUIRED: dataframe containing power production and load
-
-"""
-
-
-with open('df_load_and_power.pkl','rb') as f:
-    df_data = pickle.load(f) 
-    kWh_factor = 60   #minute data
-
-#%%
-'definition of maximum sizes and simulation resolution for each component'
-comp_dict = {}
-
-comp_dict['EL']   = {'max_s': 70,    # EL   (max n cells (9.45 kW) = - kW)
-                     'res': 5      } # EL   (5 cells)
-                                        
-comp_dict['FC']   = {'max_s': 90,    # FC   (max n cells (13 kW) = - kW)
-                     'res': 5      } # FC   (5 cells)
-
-comp_dict['Tank']  = {'max_s': 10000,      # Tank (max 10 000 h2 kg)
-                      'res': 100        }  # Tank (100 h2 kg)
-
-comp_dict['BESS']  = {'max_s': 25000,     # BESS (max 25 000 kWh)
-                      'res': 50        }  # BESS (50 kWh modules)
-
-comp_dict['PV']   = {'max_s': 200,      # PV   (max + 200 x 10 kWp arrays = 2160 kWp)
-                     'res': 5        }  # PV (extra 10 kWp arrays)
+search_mode = 'DE'      # 'DE' differential evolution, 'BnB' deterministic branch-and-bound on the sizing lattice (monotonic deficit bound),
+                        # 'Pareto' multi-objective NSGA-II (LCORE, self-sufficiency, curtailment),
+                        # 'AsyncDE' asynchronous steady-state DE (a new trial as soon as a worker is free)
 
-#%%
-'definition of economic parameters'
-
-prices = pd.read_excel('prices_excel.xlsx', sheet_name = ['Li-BESS', 'ALK EL', 'PEM FC', 'H2 Tank', 'PV', 'Onshore WT'],
-                       usecols = 'V:Y', skiprows= [0,1], nrows = 3 )
+profiling = False       # stage timings and event counters of each evaluation saved in profile<year>.jsonl
+profile_file = 'profile' + str(year) + '.jsonl'
 
+telemetry = False       # throughput, latency, worker utilization, cache hits and errors saved in telemetry<year>.jsonl
+telemetry_log = Telemetry('telemetry' + str(year) + '.jsonl')
+cache_report_every = 10 # evaluations of a worker between two records of its cache hit rates
 
-if year == 2020:
-    k = 0
-elif year == 2030:
-    k = 1
-elif year == 2050:
-    k = 2
+early_stop = False      # stop the simulations of a design as soon as its LCORE lower bound exceeds the best LCORE found so far
+incumbent = SharedIncumbent('incumbent' + str(year) + '.txt')     # best LCORE shared by the DE workers
+if early_stop and search_mode == 'Pareto':
+    #an LCORE-only bound would drop from the front the designs dominated on LCORE but good on H2_SC or curtailment
+    print('early_stop is not used in Pareto mode', flush = True)
+    early_stop = False
 
-EL_cost      = prices['ALK EL']['avg'][k]           # €/kW
-FC_cost      = prices['PEM FC']['avg'][k]           # €/kW     
-HP_tank_cost = prices['H2 Tank']['avg'][k]           # €/kg_h2
-LP_tank_cost = prices['H2 Tank']['avg'][k]           # €/kg_h2
-bess_cost    = prices['Li-BESS']['avg'][k]           # €/MWh
-WT_cost      = prices['Onshore WT']['avg'][k]          # €/kW
-PV_cost      = prices['PV']['avg'][k]           # €/kWp
+journal = False         # sizes and yearly deficits of each evaluated design appended to journal<year>.jsonl (re-priced by warm starts)
+journal_file = 'journal' + str(year) + '.jsonl'
 
-comp_cost = 60000    #€/unit
+warm_start = []         # previous runs seeding the initial DE population: journals, telemetry/profile logs, output/pareto csv files
+                        # (for example ['journal2020.jsonl'] when re-optimizing with the prices of another year)
 
-components = {}
+tank_reuse = False      # first year of designs differing only in the HP tank resumed from checkpoints of a stored trajectory
+tank_checkpoints = TankCheckpoints(interval_days = 1) if tank_reuse else None     # one store per worker process
 
-EN_cost      = 165000 #  #€/MWh    cost of electricity
+ensemble_years = 0      # >0: objective over ensemble_years weather and load years resampled from df_data (ensemble.py)
+ensemble_statistic = 'mean'     # 'mean' expected LCORE over the ensemble, or the probability of an LCORE quantile (for example 0.9)
+ensemble_rep_days = 12  # representative days of each year of the ensemble (None: whole years)
 
-components['EL'] = {'total installation costs': EL_cost,        # €/
-                    'OeM': 0.0275*EL_cost,                      # €/kW/y
-                    'lifetime': 10, 'relpacement': 0.4}
+bnb_max_eval = np.inf   # exact evaluations of the BnB search, when reached the search stops with the optimality gap
 
-components['FC'] = {'total installation costs': FC_cost,           # €/kW - ref. file 'Costi.xls' 460 €/kg
-                    'OeM': 0.0275*FC_cost,                          # €/kW/h
-                    'lifetime': 10, 'relpacement': 0.4}
+broker_address = None   # ('127.0.0.1', 6000): designs evaluated by the workers connected to the broker (broker.py),
+                        # ('0.0.0.0', 6000) or the address of the node to accept the workers of other nodes
+broker_authkey = None   # key shared with the workers (broker.py --authkey), required with broker_address
+broker_min_workers = 1  # connected workers waited for before the optimization starts
 
-components['BESS'] = {'total installation costs': bess_cost,       # €/MWh
-                      'OeM': 0.025*bess_cost,                      # €/MWh/y
-                      'lifetime': 10, 'relpacement': 0.8}
+"""
+USER INPUT REQUIRED: dataframe containing power production and load
 
-components['HP_tank'] = {'total installation costs': HP_tank_cost,      # €/kg
-                        'OeM': 0.01*HP_tank_cost,                       # €/kg/y
-                        'lifetime': 25, 'relpacement': 0}
+"""
 
-components['LP_tank'] = {'total installation costs': LP_tank_cost,      # €/kg
-                        'OeM': 0.01*LP_tank_cost,                       # €/kg/y
-                        'lifetime': 25, 'relpacement': 0}
 
-components['WT'] = {'total installation costs': WT_cost,           # €/kW - ref. file 'Costi.xls' 460 €/kg
-                     'OeM': 0.025*WT_cost,                                    # €/kW/h
-                     'lifetime': 25, 'relpacement': 0}
+with open('df_load_and_power.pkl','rb') as f:
+    df_data = pickle.load(f) 
+    kWh_factor = 60   #minute data
 
-components['PV'] = {'total installation costs': PV_cost,           # €/kW - ref. file 'Costi.xls' 460 €/kg
-                    'OeM': 0.025*PV_cost,                          # €/kW/h
-                    'lifetime': 25, 'relpacement': 0}
+#%%
+'definition of the sizing lattice (comp_dict) and of the economic parameters: see scenario_setup in LCORE_evaluation.py'
 
-components['compressor'] = {'total installation costs': comp_cost,           # €/kW - ref. file 'Costi.xls' 460 €/kg
-                            'OeM': 0.025*comp_cost,                                    # €/kW/h
-                            'lifetime': 25, 'relpacement': 0, 'size' : 1}
+scenario = scenario_setup(year, 'prices_excel.xlsx')
 
-lifetime = 20       #time horizon of the economic analysis (1 stack substitution, 1 bess substitution, no substitution of RES)
-r = 0.05     #interest rate
+comp_dict   = scenario['comp_dict']
+components  = scenario['components']
+electricity = scenario['electricity']
+hydrogen    = scenario['hydrogen']
+lifetime    = scenario['lifetime']
+r           = scenario['r']
 
-'energy vectors dictionaries'
-electricity = {'purchase price from grid': EN_cost, 'sale price to grid': 0}   # electricity dictionary
-hydrogen = {'sale price': 0}     # hydrogen dictionary
+journal_log = EvaluationJournal(journal_file, df_data)
 
+#same years for every design (common random numbers)
+ensemble_objective = EnsembleObjective(YearEnsemble(df_data, ensemble_years, 'resample', rep_days = ensemble_rep_days), 
+                                       scenario, ensemble_statistic) if ensemble_years > 0 else None
 
 #%%
 
-def LCORE_minimizer(s):
+def LCORE_minimizer(s, full_output = False, profiler = None):
     
 # s_list = [[30, 60, 1000, 2788, 40]]
 # for s in s_list:
     
     # print('config: ' + str(s), flush = True)
-
-    s[0] = s[0] * comp_dict['EL']['res']
-    s[1] = s[1] * comp_dict['FC']['res']
-    s[2] = s[2] * comp_dict['BESS']['res']
-    s[3] = s[3] * comp_dict['Tank']['res']
-    s[4] = s[4] * comp_dict['PV']['res']
-            
-    'complete sumulation of the first year to assess the degradation of components and actual performance indexes'
-    complete_output = complete_sim(df_data, s)
-    
-    'components size definition'
-    sizes = {}
-    sizes['EL']      =   complete_output['EL_n_cells'][0] * 9.45         # kW
-    sizes['FC']      =   complete_output['FC_n_cells'][0] * 13.57        # kW
-    sizes['BESS']    =   complete_output['BESS[MWh]'][0]         # MWh 
-    sizes['HP_tank'] =   complete_output['HP_tank[kg]'][0]                # kg
-    sizes['LP_tank'] =   complete_output['LP_tank[kg]'][0]                # kg
-    sizes['PV']      =   complete_output['PV_power[kWp]'][0]                # kWp
-    sizes['WT']      =   800                           # kW
-    
-    # if sizes['EL'] == 0 or sizes['FC'] == 0:
-    if complete_output['EL_h_work'][0] == 0 or complete_output['FC_h_work'][0] == 0:
-        sizes['compressor'] = 0
-        
-    else:
-        sizes['compressor'] = 1
-    
-    'components lifetime calculation'
-    lifetimes = {}
     
-
-    'future degradated parameters' 
-    ##############################################################
-    'BESS Exp capcity fade'
-    SOHy = complete_output['SOH_final'][0]
-    
-    m = -5.43e-07
-    q =  0.00763
-
-    corr = m * complete_output['BESS[MWh]'][0] + q
-    if corr < 0:
-        corr = 0
-    
-    y_data = [1, (1+SOHy)/2 + corr, SOHy]
-    x_data = [0,0.5,1]
-    
-    def fit_func(x, a):
-          return a * x**(1.06) + 1
-    
-    params = curve_fit(fit_func, x_data, y_data)
-    [a] = params[0]
-    
-    x_fit = np.arange(0,10)
-    y_fit = [a * (x) ** 1.06 + 1 for x in x_fit ]
-    
-    SOH_list = []
-    for y in y_fit:
-        if y > 0.7:
-            SOH_list.append(y)
-            
-    x_fit2 = np.arange(0,11)
-    y_fit2 = [a * (x) ** 1.06 + 1 for x in x_fit2 ]
-            
-    SOH_list_avg = []
-    for i in range(len(y_fit2)-1):
-        if y_fit2[i] > 0.7:
-            SOH_list_avg.append((y_fit2[i]+y_fit2[i+1])/2)
-            
-    lifetimes['BESS'] = len(SOH_list)
-    
-    SOH_list20 = SOH_list * int(np.ceil(( 20 / lifetimes['BESS'] )))
-    SOH_list20 = SOH_list20[:21]
-    
-    SOH_list20_avg = SOH_list_avg * int(np.ceil(( 20 / lifetimes['BESS'] )))
-    SOH_list20_avg = SOH_list20_avg[:21]
-    
-    Capacity_list = [item * sizes['BESS'] for item in SOH_list20_avg]
-
-    
-    ##############################################################
-    'EL capacity factor fade'
-    if complete_output['EL_h_work'][0] == 0 or complete_output['FC_h_work'][0] == 0:
-        lifetimes['EL'] = 10
-        EL_CF_list = [18 / 1000] * 20
-        lifetimes['FC'] = 10
-        FC_CF_list = [59 / 1000] * 20
-        
-    else: 
-        EL_V_max = 2.3  #V
-        EL_I_id = 5000  #A
-        EL_H2_nom = 18 / 106  #kg/h - 106 cells in the 1MW stack/module
-        EL_CF_lim = EL_H2_nom / (EL_V_max * EL_I_id / 1000000)  # kg/MWh
-        
-        #final EL CF trend
-        def fit_line(x, m, q):
-            return m * x + q
-        
-        x_el = [-1,0]
-        y_el = [18,complete_output['EL_CF_fin'][0] * 1000]
-        
-        line_params = curve_fit(fit_line, x_el, y_el)
-        [m,q] = line_params[0]
-        
-        x_fit = np.arange(0,10)
-        y_fit_el = [m * x + q for x in x_fit]
-        
-        EL_CF_fin_list = []
-        for y in y_fit_el:
-            if y > EL_CF_lim:
-                EL_CF_fin_list.append(y)
-            
-    
-        lifetimes['EL'] = len(EL_CF_fin_list)
-        EL_CF_fin_list20 = EL_CF_fin_list * int(np.ceil(( 20 / lifetimes['EL'] )))
-        EL_CF_fin_list20 = EL_CF_fin_list20[:21]
-    
-        #Delta CF function of BESS SOH trend
-        m0 = 1.1
-        x_p = complete_output['SOH_final'][0]
-        y_p = complete_output['EL_CF_fin'][0] * 1000 - complete_output['EL_CF[kg/MWh]'][0]
-        
-        DFC_EL_list = [m0 * (x - x_p) + y_p for x in SOH_list20]
-        
-        #Average CF trend
-        EL_CF_list = []
-        for i in range(len(EL_CF_fin_list20)):
-            EL_CF_list.append(EL_CF_fin_list20[i] - DFC_EL_list[i])
-    
-        ##############################################################
-    
-        FC_V_min = 46.2  #V
-        FC_I_id = 230  #A
-        FC_H2_nom = 59 / 74  #kg/h - 74 stacks in the 1MW module
-        FC_CF_lim = FC_H2_nom / (FC_V_min * FC_I_id / 1000)
-        
-        bess_size = complete_output['BESS[MWh]'][0]
-        
-        c = complete_output['FC_CF[kg/MWh]'][0] 
-        b = 1.25
-        
-        k1 = 700.23
-        k2 = -0.386
-        
-        a = k1 * np.exp(bess_size /1000 * k2) / 1000
-        
-        x_fit = np.arange(0,10)
-        y_fit_fc = [ a * (x) ** b + c for x in x_fit ]
-        
-        FC_CF_list1 = []
-        for y in y_fit_fc:
-            if y > FC_CF_lim:
-                FC_CF_list1.append(y)
-        
-        if complete_output['FC_h_work'][0] != 0:
-            lifetimes['FC'] = len(FC_CF_list1)
-        else: 
-            lifetimes['FC'] = 10
-        
-        FC_CF_list = FC_CF_list1 * int(np.ceil(( 20 / lifetimes['FC'] )))
-        FC_CF_list = FC_CF_list[:21]
+    s_grid = [int(item) for item in s]
     
+    if ensemble_objective is not None and not full_output:
+        #years of the ensemble simulated one after the other in the worker of the design
+        return ensemble_objective(s_grid)
     
-    ##############################################################
+    #the journal needs the yearly outputs
+    full = full_output or journal
     
+    if profiling:
+        if profiler is None:
+            profiler = SimProfiler()
+        results = LCORE_evaluation(s, df_data, scenario, full, profiler = profiler, 
+                                   incumbent = incumbent.get() if early_stop else None, checkpoints = tank_checkpoints)
+        profiler.dump(profile_file, config = s_grid, LCORE = results[0] if full else results)
     
-    'simplified simulation of fugure years with degradated components'
+    else:
+        results = LCORE_evaluation(s, df_data, scenario, full, profiler = profiler, 
+                                   incumbent = incumbent.get() if early_stop else None, checkpoints = tank_checkpoints)
     
-    df_output_years = complete_output.copy()
+    LCORE = results[0] if full else results
     
-    df_output_years = df_output_years.drop(['EL_CF_fin','FC_CF_fin','EL_h_work','FC_h_work'], axis = 1)
+    if early_stop:
+        #only complete evaluations (not bounded ones) update the incumbent
+        incumbent.update(LCORE)
     
-    for i in range(1,20):
-        simp_output_i = extra_simplified_sim(df_data, s, Capacity_list[i], EL_CF_list[i]/1000, FC_CF_list[i]/1000)
-        
-        df_output_years = pd.concat([df_output_years, simp_output_i], axis = 0).reset_index(drop=True)        
-            
+    if journal and results[1] is not None:
+        journal_log.record(s_grid, LCORE, results[1])
     
-    'LCORE'    
-    LCORE = LCORE_function(sizes, df_output_years['E_H2_deficit[MWh]'], components, electricity , lifetime, hydrogen, r)
-
-    # print('config: ' + str(s) + '\nLCORE: ' +  str(LCORE), flush = True)
-
-    return LCORE #, output
+    return results if full_output else LCORE
 
     
 
 #%%
 from scipy.optimize import differential_evolution
 
+n_process_evaluations = 0      # evaluations of this process (worker)
+
+def report_caches(every = 1):
+    'cumulative hits of the caches of this process written to the telemetry, every few evaluations'
+    global n_process_evaluations
+    n_process_evaluations = n_process_evaluations + 1
+    if n_process_evaluations % every != 0:
+        return
+    
+    info = res_cache.cache_info()
+    telemetry_log.cache('res_cache', info['hits'], info['misses'])
+    if search_mode == 'BnB':
+        #the bounds of the BnB boxes are computed by the workers
+        info = deficit_lower_bound.cache_info()
+        telemetry_log.cache('deficit_lower_bound', info.hits, info.misses)
+    if tank_checkpoints is not None:
+        info = tank_checkpoints.info()
+        telemetry_log.cache('tank_checkpoints', info['hits'], info['runs'] - info['hits'])
+
 def LCORE_min_wrapper(s):
     
+    s_grid = [int(item) for item in s]
+    #evaluation stages are needed for the latency split of the telemetry
+    profiler = SimProfiler(detail = profiling) if (telemetry or profiling) else None
+    t_start = time.time()
+    
     try:
-        LCORE = LCORE_minimizer(s)
-        print('config: ' + str(s) + '\nLCORE: ' +  str(LCORE), flush = True)
+        LCORE = LCORE_minimizer(s, profiler = profiler)
+        bounded = getattr(LCORE, 'bounded', False)     # evaluation stopped early, LCORE is a lower bound
+        print('config: ' + str(s) + '\nLCORE: ' +  str(LCORE) + (' (lower bound, stopped early)' if bounded else ''), flush = True)
         # print(LCORE, flush = True)
-        return LCORE
+        if telemetry:
+            telemetry_log.evaluation(s_grid, LCORE, t_start, time.time(), profiler, bounded = bounded)
+            report_caches(cache_report_every)
+        return float(LCORE)
         
-    except:
-        print('config: ' + str(s) + 'error in this iteration')
+    except Exception as e:
+        print('config: ' + str(s) + 'error in this iteration: ' + type(e).__name__ + ': ' + str(e))
         # print('error in this iteration')
+        if telemetry:
+            telemetry_log.error(s_grid, e, t_start, time.time())
         return np.inf
 
+#%%
+'multi-objective evaluation: all the objectives come from the same simulation of the design'
+
+def LCORE_objectives(s):
+    
+    s_grid = list(s)
+    profiler = SimProfiler(detail = profiling) if (telemetry or profiling) else None
+    t_start = time.time()
+    
+    try:
+        LCORE, df_output_years = LCORE_minimizer(list(s), full_output = True, profiler = profiler)
+        
+        H2_SC     = df_output_years['H2_SC[%]'].mean()              # average self-sufficiency over the lifetime [%]
+        E_excess  = df_output_years['E_H2_excess[MWh]'].mean()      # average curtailed energy [MWh/y]
+        
+        kpis = {'LCORE': LCORE,
+                'H2_SC[%]': H2_SC,
+                'E_H2_excess[MWh]': E_excess,
+                'E_H2_deficit[MWh]': df_output_years['E_H2_deficit[MWh]'].mean(),
+                'H2_prod_EL[kg]': df_output_years['H2_prod_EL[kg]'][0],
+                'SOH_final': df_output_years['SOH_final'][0]}
+        
+        print('config: ' + str(s_grid) + '\nLCORE: ' +  str(LCORE) + ' H2_SC: ' + str(H2_SC) + ' E_excess: ' + str(E_excess), flush = True)
+        if telemetry:
+            telemetry_log.evaluation(s_grid, LCORE, t_start, time.time(), profiler)
+            report_caches(cache_report_every)
+        
+        return [LCORE, -H2_SC, E_excess], kpis
+    
+    except Exception as e:
+        print('config: ' + str(s_grid) + 'error in this iteration: ' + type(e).__name__ + ': ' + str(e))
+        if telemetry:
+            telemetry_log.error(s_grid, e, t_start, time.time())
+        return [np.inf, np.inf, np.inf], None
+
 bounds = [(0, comp_dict['EL']['max_s']   / comp_dict['EL']['res']),          
           (0, comp_dict['FC']['max_s']   / comp_dict['FC']['res']),            
           (1, comp_dict['BESS']['max_s'] / comp_dict['BESS']['res']),         
@@ -340,52 +234,175 @@ bounds = [(0, comp_dict['EL']['max_s']   / comp_dict['EL']['res']),
 
 # LCORE, output = LCORE_minimizer([10, 10, 20000, 100, 13])
 
+#%%
+'lower bound of the LCORE on a box of the sizing lattice (used by the branch-and-bound search)'
+
+@functools.lru_cache(maxsize = None)
+def deficit_lower_bound(EL, FC, BESS, Tank, PV):
+    '''
+    Annual deficit energy [MWh] of the design (grid units) with new components, simulated once per design (and per
+    worker process). With the largest sizes of a box and non-degraded components it bounds the deficit of the degraded
+    years (extra_simplified_sim) of every design of the box under the monotonicity premise of the search: the deficit
+    does not increase with BESS, tank and PV sizes nor with better conversion factors (not proven for the rule-based
+    dispatch, the optimum and the gap of the search hold under this premise).
+    '''
+    s = [EL * comp_dict['EL']['res'],
+         FC * comp_dict['FC']['res'],
+         BESS * comp_dict['BESS']['res'],
+         Tank * comp_dict['Tank']['res'],
+         PV * comp_dict['PV']['res']]
+
+    #H2 chain disabled as in the complete simulation
+    if s[0] == 0 or s[1] == 0:
+        s[0] = 0
+
+    simp_output = extra_simplified_sim(df_data, s, s[2], 18 / 1000, 59 / 1000)
+
+    return simp_output['E_H2_deficit[MWh]'][0]
+
+
+def LCORE_lower_bound(lo, hi):
+    '''
+    lo, hi : smallest and largest design of the box (grid units)
+    
+    - CAPEX and O&M increase linearly with the sizes: the smallest design of the box bounds them
+    - deficit energy: largest BESS, tank and PV of the box with new components (deficit_lower_bound),
+      no bound (0) while EL or FC sizes are not fixed, since the deficit is not monotonic in them: until
+      both are fixed (branch_order) the boxes are pruned on their CAPEX and O&M only
+    - first year: simulated by complete_sim, whose efficiency and thermal maps can do better than the fixed
+      factors of extra_simplified_sim, its deficit is not bounded (0)
+    '''
+    sizes = {}
+    sizes['EL']      =   lo[0] * comp_dict['EL']['res'] * 9.45          # kW
+    sizes['FC']      =   lo[1] * comp_dict['FC']['res'] * 13.57         # kW
+    sizes['BESS']    =   lo[2] * comp_dict['BESS']['res']               # MWh 
+    sizes['HP_tank'] =   lo[3] * comp_dict['Tank']['res']               # kg
+    sizes['LP_tank'] =   10                                             # kg
+    sizes['PV']      =   160 * (1 + lo[4] * comp_dict['PV']['res'] / 16) # kWp
+    sizes['WT']      =   800                                            # kW
+    sizes['compressor'] = 0
+    
+    if lo[0] == hi[0] and lo[1] == hi[1]:
+        E_def = deficit_lower_bound(lo[0], lo[1], hi[2], hi[3], hi[4])
+    else:
+        E_def = 0
+    
+    return LCORE_function(sizes, [0] + [E_def] * (lifetime - 1), components, electricity , lifetime, hydrogen, r)
+
 if __name__ == "__main__":
     
-    result = differential_evolution(LCORE_min_wrapper,          #LCORE_minimizer
-                                    bounds, 
-                                    #tol=0.001, 
-                                    integrality = [True, True, True, True, True], 
-                                    updating = 'deferred', 
-                                    workers = -1)
+    if profiling and os.path.exists(profile_file):
+        os.remove(profile_file)
+    
+    if telemetry and os.path.exists(telemetry_log.path):
+        os.remove(telemetry_log.path)
+    
+    if early_stop:
+        incumbent.reset()
+    
+    if broker_address is not None:
+        #workers of the nodes: python broker.py --address host:port --authkey ... --processes -1 --main main.py
+        workers = Broker(broker_address, authkey = broker_authkey)
+        print('broker listening on ' + str(workers.address), flush = True)
+        workers.wait_workers(broker_min_workers)
+    else:
+        #parallel workers: pool instrumented at each generation barrier when the telemetry is active
+        workers = TelemetryMap(telemetry_log) if telemetry else -1
+    
+    if search_mode == 'BnB':
+        #EL and FC are fixed first, then BESS, tank and PV are bisected using the deficit bound: optimum
+        #(or gap) certified under the monotonicity premise of deficit_lower_bound, bounds computed by the workers
+        result = branch_and_bound(LCORE_min_wrapper, 
+                                  LCORE_lower_bound, 
+                                  bounds, 
+                                  branch_order = [0, 1], 
+                                  max_eval = bnb_max_eval, 
+                                  disp = True, 
+                                  workers = workers, 
+                                  certified = False)
+        print(result.message + ' (LCORE lower bound of the lattice: ' + str(result.lower_bound) + ', ' + 
+              str(result.nfev) + ' evaluations, ' + str(result.nbev) + ' bounds)', flush = True)
+    
+    elif search_mode == 'Pareto':
+        result = nsga2(LCORE_objectives, 
+                       bounds, 
+                       pop_size = 40, 
+                       n_gen = 50, 
+                       workers = workers, 
+                       disp = True)
+        
+        if telemetry:
+            telemetry_log.cache('nsga2_history', result.n_history_hits, result.nfev)
+        
+    else:
+        #initial population: best prior designs under the current scenario, then Latin hypercube samples
+        init = 'latinhypercube'
+        if len(warm_start) > 0:
+            init = warm_start_population(warm_start, bounds, scenario, n_pop = 15 * len(bounds), df_data = df_data)
+        
+    if search_mode == 'AsyncDE':
+        #no generation barrier: the pool of the telemetry is not used, each evaluation is still logged
+        result = async_de(LCORE_min_wrapper, 
+                          bounds, 
+                          init = init, 
+                          workers = workers if broker_address is not None else -1, 
+                          n_workers = max(workers.n_workers, broker_min_workers) if broker_address is not None else None, 
+                          disp = True)
+        print(result.message + ' (worker utilization ' + str(round(result.utilization * 100, 1)) + ' %)', flush = True)
+    
+    elif search_mode == 'DE':
+        result = differential_evolution(LCORE_min_wrapper,          #LCORE_minimizer
+                                        bounds, 
+                                        #tol=0.001, 
+                                        integrality = [True, True, True, True, True], 
+                                        updating = 'deferred', 
+                                        workers = workers,
+                                        init = init)
+    
+    if telemetry or broker_address is not None:
+        workers.close()
     
     end_time = time.time()
     print("--- %s seconds ---" % (end_time - start_time))
     
+    if telemetry:
+        for key, value in summarize_telemetry(telemetry_log.path).items():
+            print(key + ':\n' + str(value))
+    
+    if profiling:
+        #stage timings and event counters aggregated over all the evaluations of the run
+        _, df_times, df_counts = aggregate_profiles(profile_file)
+        print(df_times.to_string())
+        print(df_counts.to_string())
+        df_times.to_csv('profile_stages' + str(year) + '.csv', sep = ';')
+        df_counts.to_csv('profile_events' + str(year) + '.csv', sep = ';')
+    
 
 #%%
     'Output'
 
-    df_output = pd.DataFrame()
-    df_output['EL']   = [result.x[0] * comp_dict['EL']['res']]
-    df_output['FC']   = [result.x[1] * comp_dict['FC']['res']]
-    df_output['BESS'] = [result.x[2] * comp_dict['BESS']['res']]
-    df_output['Tank'] = [result.x[3] * comp_dict['Tank']['res']]
-    df_output['PV']   = [160 * (1 + result.x[4] * comp_dict['PV']['res'] / 16)]
-    df_output['LCORE'] = [result.fun]
-    df_output['time'] = [end_time - start_time]
-
-    df_output.to_csv('output' + str(year) + '.csv', sep = ';')
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    if search_mode == 'Pareto':
+        #Pareto front: sizes, objectives and KPIs of each non-dominated design
+        df_output = result.archive.to_dataframe(x_names = ['EL', 'FC', 'BESS', 'Tank', 'PV'], 
+                                                f_names = ['obj_LCORE', 'obj_H2_SC', 'obj_E_excess'])
+        df_output['EL']   = df_output['EL']   * comp_dict['EL']['res']
+        df_output['FC']   = df_output['FC']   * comp_dict['FC']['res']
+        df_output['BESS'] = df_output['BESS'] * comp_dict['BESS']['res']
+        df_output['Tank'] = df_output['Tank'] * comp_dict['Tank']['res']
+        df_output['PV']   = 160 * (1 + df_output['PV'] * comp_dict['PV']['res'] / 16)
+        df_output = df_output.drop(['obj_LCORE', 'obj_H2_SC', 'obj_E_excess'], axis = 1)
+        df_output['time'] = end_time - start_time
+        
+        df_output.to_csv('pareto' + str(year) + '.csv', sep = ';')
+    
+    else:
+        df_output = pd.DataFrame()
+        df_output['EL']   = [result.x[0] * comp_dict['EL']['res']]
+        df_output['FC']   = [result.x[1] * comp_dict['FC']['res']]
+        df_output['BESS'] = [result.x[2] * comp_dict['BESS']['res']]
+        df_output['Tank'] = [result.x[3] * comp_dict['Tank']['res']]
+        df_output['PV']   = [160 * (1 + result.x[4] * comp_dict['PV']['res'] / 16)]
+        df_output['LCORE'] = [result.fun]
+        df_output['time'] = [end_time - start_time]
+    
+        df_output.to_csv('output' + str(year) + '.csv', sep = ';')
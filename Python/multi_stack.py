@@ -0,0 +1,292 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+Electrolyzer model based on: https://doi.org/10.1016/j.renene.2023.03.077
+
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+import MODEL_EL_variable
+import MODEL_FC_variable
+import dispatch_engine
+
+
+'''
+Multi-stack electrolyzer and fuel cell
+
+- the EL cells and FC stacks of the design are split in N stacks with independent temperature, working hours
+  and degradation; the state of the stacks is stored in arrays and each time step is a few vectorized operations
+  (the cost per step does not depend on N)
+- same equations of EL_model/EL_transit (MODEL_EL_variable.py) and FC_model/FC_transit (MODEL_FC_variable.py),
+  written in closed form: linear (EL) and piecewise linear (FC) polarization curves
+- dispatch policies of the power given to the EL (or requested to the FC):
+    'equal'      : all the stacks share the power (lumped operation, same minimum power of the lumped model)
+    'sequential' : stacks switched on one after the other in a fixed order, as many as needed for the power
+    'rotation'   : as 'sequential', the order is updated every rotation_h hours, least worked stacks first
+  with 'sequential' and 'rotation' the minimum power is the one of the first stack
+- the degradation coefficients (MODEL_EL_variable, MODEL_FC_variable) and the minimum power shares
+  (dispatch_engine) are read from their modules at call time, as the lumped models do (sensitivity.py)
+
+complete_sim(df_data, s, stacks = MultiStack(n_EL = 10, n_FC = 10, policy = 'rotation')) simulates the design with
+the stacks; after the simulation stacks.summary() gives the final state of each stack.
+
+'''
+
+class _StackBank:
+
+    P_unit = None          # [kW] nominal power of a cell (EL) or stack (FC)
+    min_frac = None        # minimum power / nominal power
+    T_op = None            # [°C] operating temperature
+
+    def __init__(self, n_units, n_stacks, policy = 'rotation', rotation_h = 24, kWh_factor = 60):
+        if policy not in ['equal', 'sequential', 'rotation']:
+            raise ValueError('stack policy must be equal, sequential or rotation')
+
+        'units (cells or stacks of the lumped model) split as evenly as possible in n_stacks'
+        n_stacks = int(max(1, min(n_stacks, n_units)))
+        self.n = np.full(n_stacks, n_units // n_stacks, dtype = float)
+        self.n[:int(n_units % n_stacks)] += 1
+
+        self.policy = policy
+        self.kWh_factor = kWh_factor
+        self.rotation_steps = max(1, int(round(rotation_h * kWh_factor)))
+        self.step_count = 0
+
+        self.P_nom = self.n * self.P_unit
+        self.P_nom_total = self.P_nom.sum()
+        self.order = np.arange(n_stacks)
+        self.T = np.full(n_stacks, float(self.T_op))
+        self.h_work = np.zeros(n_stacks)
+
+        self.w = self.P_nom / self.P_nom_total     # share of the power of each stack
+        self.CF = self.conversion_factor()
+
+        self.op_time = (60*60)/(kWh_factor)         # [s] duration of the time step
+        self.thermal_constants()
+
+    def allocate(self, P):
+        '''
+        P : power available to the EL (or requested to the FC) [kW]
+
+        returns the conversion factor of the stacks dispatched for P and the minimum power of the dispatch
+        '''
+        self.CF = self.conversion_factor()
+
+        if self.policy == 'equal':
+            self.w = self.P_nom / self.P_nom_total
+            P_min = self.min_frac * self.P_nom_total
+        else:
+            P_cum = np.cumsum(self.P_nom[self.order])
+            m = min(int(np.searchsorted(P_cum, min(P, self.P_nom_total))) + 1, len(self.n))
+            self.w = np.zeros(len(self.n))
+            self.w[self.order[:m]] = self.P_nom[self.order[:m]] / P_cum[m - 1]
+            P_min = self.min_frac * self.P_nom[self.order[0]]
+
+        return float(np.dot(self.w, self.CF)), P_min
+
+    def transit(self, H2, T_ext):
+        '''
+        H2 : hydrogen produced by the EL (or consumed by the FC) in the time step [kg], split over the
+             dispatched stacks proportionally to their power
+        T_ext : external temperature
+
+        returns the mean temperature of the stacks
+        '''
+        H2_k = H2 * self.w * self.CF / np.dot(self.w, self.CF) if H2 > 0 else np.zeros(len(self.n))
+        on = H2_k > 0
+
+        q_lost = (self.T - T_ext) / self.R          # [W] thermal power lost to the environment
+        T_on = np.minimum(self.T + self.heating(H2_k, q_lost), self.T_op)
+        T_off = self.T - (self.op_time / self.mc) * q_lost
+        self.T = np.where(on, T_on, T_off)
+
+        #working hours counting only if activated
+        self.h_work = self.h_work + on / self.kWh_factor
+
+        self.step_count = self.step_count + 1
+        if self.policy == 'rotation' and self.step_count % self.rotation_steps == 0:
+            self.order = np.argsort(self.h_work, kind = 'stable')
+
+        return float(np.dot(self.n, self.T) / self.n.sum())
+
+    def h_work_eq(self):
+        'equivalent working hours of the stacks (weighted with their size)'
+        return float(np.dot(self.n, self.h_work) / self.n.sum())
+
+    def CF_op(self):
+        'conversion factor of each stack at the operating temperature with its working hours'
+        T = self.T
+        self.T = np.full(len(self.n), float(self.T_op))
+        CF = self.conversion_factor()
+        self.T = T
+        return CF
+
+    def CF_final(self):
+        'conversion factor at the operating temperature of the stacks (weighted with their size)'
+        return float(np.dot(self.n, self.CF_op()) / self.n.sum())
+
+    def get_state(self):
+        return {'T': self.T.copy(), 'h_work': self.h_work.copy(), 'order': self.order.copy(), 'step_count': self.step_count}
+
+    def set_state(self, state):
+        self.T = np.array(state['T'], dtype = float)
+        self.h_work = np.array(state['h_work'], dtype = float)
+        self.order = np.array(state['order'])
+        self.step_count = state['step_count']
+
+
+class ELStacks(_StackBank):
+    'alkaline electrolyzer stacks of 9.45 kW cells (EL_model, EL_transit)'
+
+    P_unit = 9.45
+    T_op = 71
+
+    n_cells_design = 106               # number of cells in the 1MW stack
+    H2_design = 18                     # [kg/h] nominal produced hydrogen flow from the 1MW module
+    V_ideal = (1.64, 1.9)              # cell voltage at minimum and maximum current
+    I_cell = (1, 5)                    # [kA] cell current (current density * 0.5 m^2)
+    V_tn = 1.48                        # [V]  thermoneutral voltage
+
+    @property
+    def min_frac(self):
+        return dispatch_engine.EL_P_MIN_FRACTION
+
+    @property
+    def V_degr(self):
+        return MODEL_EL_variable.V_degr            # uV/h time voltage increase
+
+    @property
+    def V_T(self):
+        return MODEL_EL_variable.V_T               # 5mV/°C cool down voltage increase
+
+    def conversion_factor(self):
+        V_max = self.V_ideal[1] + self.V_degr * self.h_work + self.V_T * (self.T_op - self.T)
+        self.high_voltage = np.any(self.V_ideal[1] + self.V_degr * self.h_work > 2.3)
+        return self.H2_design / self.n_cells_design / (self.I_cell[1] * V_max)       # [kg/kWh]
+
+    def thermal_constants(self):
+        SF = self.n / self.n_cells_design
+        L = 3 * SF**(1/3)
+        r1 = 0.3 * SF**(1/3)
+        s1, r3, s2 = 0.004, 1, 0.2
+        h1, h2, h3, k1, k2 = 100, 10, 20, 52, 0.05
+        pi = math.pi
+
+        a = h1*2*pi*r1*L
+        b = k1*2*pi*L/np.log((r1 + s1)/r1)
+        c = h2*2*pi*(r1 + s1)*L
+        d = h2*2*pi*r3*L
+        e = k2*2*pi*L/np.log((r3 + s2)/r3)
+        f = h3*2*pi*(r3 + s2)*L
+        self.R = 1/a + 1/b + 1/c + 1/d + 1/e + 1/f
+        self.mc = (L * r1 * r1 * pi * 1000 / 2) * 4190       # [J/K] electrolyte mass * specific heat
+        self.H2_max = self.H2_design * SF / self.kWh_factor  # [kg] maximum production of each stack in a time step
+
+    def heating(self, H2_k, q_lost):
+        shift = self.V_degr * self.h_work + self.V_T * (self.T_op - self.T)
+        I_op = self.I_cell[0] + (self.I_cell[1] - self.I_cell[0]) * H2_k / self.H2_max
+        V_op = self.V_ideal[0] + shift + (self.V_ideal[1] - self.V_ideal[0]) * (I_op - self.I_cell[0]) / (self.I_cell[1] - self.I_cell[0])
+        q_gain = self.n * (V_op - self.V_tn) * I_op * 1000
+        return (self.op_time / self.mc) * (q_gain - q_lost)
+
+
+class FCStacks(_StackBank):
+    'PEM fuel cell stacks of 13.57 kW units (FC_model, FC_transit)'
+
+    P_unit = 13.57
+    T_op = 60
+
+    n_cells = 96
+    FC_CF_nom = 59 / 1000              # kg/kWh
+    I_array = np.array([0, 40, 80, 120, 160, 200, 230, 250], dtype = float)
+    V_array_ideal = np.array([94, 78, 73, 69, 66, 62, 59, 57], dtype = float)
+    V_tn = 1.48
+
+    @property
+    def min_frac(self):
+        return dispatch_engine.FC_P_MIN_FRACTION
+
+    @property
+    def V_degr(self):
+        return MODEL_FC_variable.V_degr_cell * self.n_cells        # uV/h time degradation for dynamic operation
+
+    @property
+    def V_T(self):
+        return MODEL_FC_variable.V_T_cell * self.n_cells           # mV/°C temperature degradation
+
+    def conversion_factor(self):
+        V_min = self.V_array_ideal.min() - self.V_degr * self.h_work - self.V_T * (self.T_op - self.T)
+        P_H2 = np.max(self.I_array * self.V_array_ideal) * self.FC_CF_nom
+        return P_H2 / (self.I_array.max() * V_min)                           # [kg/kWh]
+
+    def thermal_constants(self):
+        n_design = 96
+        L = 0.58*(n_design/6) * self.n / n_design
+        W, H = 0.196*3, 0.288*2
+        r1 = 0.5*(4*W*H)/(2*H + 2*W)
+        s1, r3, s2 = 0.004, 1, 0.2
+        h2, h3, k1, k2 = 10, 20, 52, 0.05
+        pi = math.pi
+
+        b = k1*2*pi*L/np.log((r1 + s1)/r1)
+        c = h2*2*pi*(r1 + s1)*L
+        d = h2*2*pi*r3*L
+        e = k2*2*pi*L/np.log((r3 + s2)/r3)
+        f = h3*2*pi*(r3 + s2)*L
+        self.R = 1/b + 1/c + 1/d + 1/e + 1/f
+        self.mc = (L * r1 * r1 * pi * 2240)/5 * 710          # [J/K] fuel cell mass * heat capacity
+        self.IV = self.I_array * self.V_array_ideal
+
+    def heating(self, H2_k, q_lost):
+        shift = self.V_degr * self.h_work + self.V_T * (self.T_op - self.T)
+        I_op = np.interp(H2_k * self.kWh_factor * 1000 / (self.n * self.FC_CF_nom), self.IV, self.I_array)
+        V_op = np.interp(I_op, self.I_array, self.V_array_ideal) - shift
+        q_gain = self.n * (self.V_tn - V_op) * I_op * 1000
+        return (self.op_time / self.mc) * np.abs(q_gain - q_lost)
+
+
+#%%
+class MultiStack:
+    '''
+    n_EL, n_FC : number of EL and FC stacks (the cells of the design are split among them)
+    policy : 'equal', 'sequential' or 'rotation'
+    rotation_h : hours between two updates of the order of the stacks ('rotation')
+    '''
+
+    def __init__(self, n_EL = 10, n_FC = 10, policy = 'rotation', rotation_h = 24):
+        self.n_EL = n_EL
+        self.n_FC = n_FC
+        self.policy = policy
+        self.rotation_h = rotation_h
+        self.EL = None
+        self.FC = None
+
+    def setup(self, EL_cells, FC_units, kWh_factor = 60, state = None):
+        'stacks of a design, restored from the state of a previous block if given'
+        self.EL = ELStacks(EL_cells, self.n_EL, self.policy, self.rotation_h, kWh_factor)
+        self.FC = FCStacks(FC_units, self.n_FC, self.policy, self.rotation_h, kWh_factor)
+        if state is not None and 'EL_stacks' in state:
+            self.EL.set_state(state['EL_stacks'])
+            self.FC.set_state(state['FC_stacks'])
+        return self
+
+    def summary(self):
+        'final state of each stack: size, working hours, temperature and conversion factor at operating temperature'
+        rows = []
+        for kind, bank in [('EL', self.EL), ('FC', self.FC)]:
+            if bank is None:
+                continue
+            CF_fin = bank.CF_op()
+            for k in range(len(bank.n)):
+                rows.append({'kind': kind, 'stack': k, 'units': int(bank.n[k]), 'h_work': bank.h_work[k],
+                             'T': bank.T[k], 'CF_fin[kg/MWh]': CF_fin[k] * 1000})
+        return pd.DataFrame(rows)
@@ -0,0 +1,313 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import numpy as np
+import pandas as pd
+from multiprocessing import Pool
+from scipy.optimize import OptimizeResult
+
+
+'''
+Multi-objective sizing with an NSGA-II genetic algorithm on integer decision variables
+
+- all the objectives of a design come from a single evaluation (one physics simulation per design)
+- each design is evaluated only once, repeated designs are taken from the evaluation history
+- the Pareto front of all the evaluated designs is updated incrementally after each evaluation
+
+'''
+
+def dominates(f1, f2):
+    'True if f1 dominates f2 (all objectives minimized)'
+    return all(a <= b for a, b in zip(f1, f2)) and any(a < b for a, b in zip(f1, f2))
+
+
+class ParetoArchive:
+    '''
+    Incremental archive of the non-dominated designs
+
+    add(x, f, info) : stores the design if it is not dominated and drops the designs it dominates
+    '''
+
+    def __init__(self):
+        self.x = []
+        self.f = []
+        self.info = []
+
+    def add(self, x, f, info = None):
+
+        if not np.all(np.isfinite(f)):
+            return False
+
+        for f_old in self.f:
+            if dominates(f_old, f) or list(f_old) == list(f):
+                return False
+
+        keep = [not dominates(f, f_old) for f_old in self.f]
+
+        self.x    = [item for item, k in zip(self.x, keep) if k]    + [list(x)]
+        self.f    = [item for item, k in zip(self.f, keep) if k]    + [list(f)]
+        self.info = [item for item, k in zip(self.info, keep) if k] + [info]
+
+        return True
+
+    def to_dataframe(self, x_names = None, f_names = None):
+        'Pareto front as a DataFrame: designs, objectives and the extra information of each design'
+
+        if x_names is None:
+            x_names = ['x' + str(j) for j in range(len(self.x[0]))] if len(self.x) > 0 else []
+        if f_names is None:
+            f_names = ['f' + str(j) for j in range(len(self.f[0]))] if len(self.f) > 0 else []
+
+        df_front = pd.DataFrame(self.x, columns = x_names)
+        df_f = pd.DataFrame(self.f, columns = f_names)
+        df_front = pd.concat([df_front, df_f], axis = 1)
+
+        if len(self.info) > 0 and isinstance(self.info[0], dict):
+            df_front = pd.concat([df_front, pd.DataFrame(self.info)], axis = 1)
+
+        return df_front.sort_values(f_names[0]).reset_index(drop = True) if len(f_names) > 0 else df_front
+
+
+#%%
+'NSGA-II operators'
+
+def non_dominated_sort(F):
+    'list of fronts (lists of indexes), fast non-dominated sorting'
+
+    n = len(F)
+    S = [[] for _ in range(n)]
+    n_dom = np.zeros(n, dtype = int)
+    fronts = [[]]
+
+    for p in range(n):
+        for q in range(n):
+            if dominates(F[p], F[q]):
+                S[p].append(q)
+            elif dominates(F[q], F[p]):
+                n_dom[p] = n_dom[p] + 1
+        if n_dom[p] == 0:
+            fronts[0].append(p)
+
+    k = 0
+    while len(fronts[k]) > 0:
+        next_front = []
+        for p in fronts[k]:
+            for q in S[p]:
+                n_dom[q] = n_dom[q] - 1
+                if n_dom[q] == 0:
+                    next_front.append(q)
+        k = k + 1
+        fronts.append(next_front)
+
+    return fronts[:-1]
+
+
+def crowding_distance(F):
+    'crowding distance of the designs of one front'
+
+    F = np.asarray(F, dtype = float)
+    n, m = F.shape
+    dist = np.zeros(n)
+
+    if n <= 2:
+        return np.full(n, np.inf)
+
+    for j in range(m):
+        order = np.argsort(F[:, j])
+        f_min = F[order[0], j]
+        f_max = F[order[-1], j]
+        dist[order[0]] = np.inf
+        dist[order[-1]] = np.inf
+        if f_max - f_min == 0 or not np.isfinite(f_max - f_min):
+            continue
+        dist[order[1:-1]] = dist[order[1:-1]] + (F[order[2:], j] - F[order[:-2], j]) / (f_max - f_min)
+
+    return dist
+
+
+def rank_population(F):
+    'rank (front number) and crowding distance of each design'
+
+    rank = np.zeros(len(F), dtype = int)
+    crowd = np.zeros(len(F))
+
+    for k, front in enumerate(non_dominated_sort(F)):
+        rank[front] = k
+        crowd[front] = crowding_distance([F[i] for i in front])
+
+    return rank, crowd
+
+
+def tournament(rank, crowd, rng):
+    'binary tournament: lower rank first, then larger crowding distance'
+
+    i, j = rng.integers(0, len(rank), 2)
+
+    if rank[i] < rank[j] or (rank[i] == rank[j] and crowd[i] > crowd[j]):
+        return i
+    return j
+
+
+def sbx_crossover(x1, x2, lo, hi, rng, eta = 15, prob = 0.9):
+    'simulated binary crossover, children are rounded to the integer lattice'
+
+    c1 = x1.astype(float).copy()
+    c2 = x2.astype(float).copy()
+
+    if rng.random() < prob:
+        for j in range(len(x1)):
+            if rng.random() < 0.5 and x1[j] != x2[j]:
+                u = rng.random()
+                if u <= 0.5:
+                    beta = (2 * u) ** (1 / (eta + 1))
+                else:
+                    beta = (1 / (2 * (1 - u))) ** (1 / (eta + 1))
+                c1[j] = 0.5 * ((1 + beta) * x1[j] + (1 - beta) * x2[j])
+                c2[j] = 0.5 * ((1 - beta) * x1[j] + (1 + beta) * x2[j])
+
+    c1 = np.clip(np.rint(c1), lo, hi).astype(int)
+    c2 = np.clip(np.rint(c2), lo, hi).astype(int)
+
+    return c1, c2
+
+
+def polynomial_mutation(x, lo, hi, rng, eta = 20, prob = None):
+    'polynomial mutation, at least one lattice step when a variable is mutated'
+
+    if prob is None:
+        prob = 1 / len(x)
+
+    y = x.astype(float).copy()
+
+    for j in range(len(x)):
+        if rng.random() < prob and hi[j] > lo[j]:
+            u = rng.random()
+            if u < 0.5:
+                delta = (2 * u) ** (1 / (eta + 1)) - 1
+            else:
+                delta = 1 - (2 * (1 - u)) ** (1 / (eta + 1))
+            step = delta * (hi[j] - lo[j])
+            if abs(step) < 1:
+                step = np.sign(delta) if delta != 0 else 1
+            y[j] = y[j] + step
+
+    return np.clip(np.rint(y), lo, hi).astype(int)
+
+
+#%%
+'optimizer'
+
+def nsga2(fun, bounds, pop_size = 40, n_gen = 50, seed = None, workers = 1, disp = False):
+    '''
+    fun : function s -> (objectives, info), objectives is a list of values to minimize,
+          info is any extra (picklable) information of the design stored in the Pareto archive
+    bounds : list of (min, max) integer bounds of the decision variables
+    pop_size : number of designs in the population
+    n_gen : number of generations
+    workers : number of parallel processes (-1 all the available cores) or a map-like callable
+
+    returns an OptimizeResult with the final Pareto archive (archive), its designs (x) and objectives (F),
+    the number of physics evaluations (nfev) and of designs found in the history (n_history_hits)
+    '''
+
+    rng = np.random.default_rng(seed)
+
+    lo = np.array([int(np.ceil(b[0])) for b in bounds])
+    hi = np.array([int(np.floor(b[1])) for b in bounds])
+
+    archive = ParetoArchive()
+    history = {}          # design -> objectives, each design is simulated only once
+    nfev = 0
+    n_history_hits = 0    # designs taken from the history without a new simulation
+
+    if callable(workers):
+        mapper = workers
+        pool = None
+    elif workers == 1:
+        mapper = map
+        pool = None
+    else:
+        pool = Pool(None if workers == -1 else workers)
+        mapper = pool.map
+
+    def evaluate(X):
+        nonlocal nfev, n_history_hits
+
+        new = []
+        for x in X:
+            key = tuple(int(v) for v in x)
+            if key not in history and key not in new:
+                new.append(key)
+
+        results = list(mapper(fun, [list(key) for key in new]))
+        nfev = nfev + len(new)
+        n_history_hits = n_history_hits + len(X) - len(new)
+
+        for key, (f, info) in zip(new, results):
+            f = [float(v) for v in f]
+            history[key] = f
+            archive.add(key, f, info)
+
+        return [history[tuple(int(v) for v in x)] for x in X]
+
+    try:
+        'initial population: random designs on the lattice'
+        X = rng.integers(lo, hi + 1, size = (pop_size, len(bounds)))
+        F = evaluate(X)
+        rank, crowd = rank_population(F)
+
+        for gen in range(n_gen):
+
+            'offspring'
+            children = []
+            while len(children) < pop_size:
+                p1 = X[tournament(rank, crowd, rng)]
+                p2 = X[tournament(rank, crowd, rng)]
+                c1, c2 = sbx_crossover(p1, p2, lo, hi, rng)
+                children.append(polynomial_mutation(c1, lo, hi, rng))
+                children.append(polynomial_mutation(c2, lo, hi, rng))
+            children = np.array(children[:pop_size])
+            F_children = evaluate(children)
+
+            'elitist selection on parents + offspring'
+            X_all = np.vstack([X, children])
+            F_all = F + F_children
+
+            selected = []
+            for front in non_dominated_sort(F_all):
+                if len(selected) + len(front) <= pop_size:
+                    selected = selected + front
+                else:
+                    crowd_front = crowding_distance([F_all[i] for i in front])
+                    order = np.argsort(-crowd_front)
+                    selected = selected + [front[i] for i in order[:pop_size - len(selected)]]
+                    break
+
+            X = X_all[selected]
+            F = [F_all[i] for i in selected]
+            rank, crowd = rank_population(F)
+
+            if disp:
+                print('NSGA-II generation ' + str(gen + 1) + ': ' + str(len(archive.f)) + ' Pareto designs, '
+                      + str(nfev) + ' evaluations', flush = True)
+
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return OptimizeResult(x = np.array(archive.x),
+                          F = np.array(archive.f),
+                          archive = archive,
+                          nfev = nfev,
+                          n_history_hits = n_history_hits,
+                          nit = n_gen,
+                          success = True,
+                          message = 'maximum number of generations reached')
@@ -0,0 +1,319 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import linprog
+
+from MODEL_EL_variable import EL_model
+from MODEL_FC_variable import FC_model
+import MODEL_battery_NMC
+from MODEL_battery_NMC import (Battery_degradation_day, eta, C_rate_C_max, C_rate_D_max,
+                               coeff_c, coeff_d)
+from complete_simulation import complete_sim, l_compr_ms
+from res_cache import res_profile
+from sim_record import to_frame
+
+
+'''
+Rolling-horizon optimal dispatch of BESS, electrolyzer, fuel cell and tanks
+
+- the year is split in windows (default 48 h) shifted by the commit horizon (default 24 h)
+- each window is a sparse LP minimizing the deficit energy, only the first commit horizon is kept
+  and its final state (SOC, tank levels) is the initial state of the next window
+- perfect foresight by default, with forecast = DataFrame the look-ahead beyond the commit horizon uses the forecast
+- the LP of all the windows has the same sparsity pattern: it is built once and only its coefficients,
+  bounds and right-hand side are updated window by window
+- component limits: SOC and C-rate limits of battery_operation, EL/FC nominal power and conversion factors of
+  EL_model/FC_model (at operating temperature, updated with the working hours), LP tank and compressor flow
+  of complete_sim. Battery degradation is assessed on the committed SOC profile as in battery_operation.
+
+Differences with respect to complete_sim: no minimum power of EL (20%) and FC (1%) (binary variables),
+no thermal transients and free choice of the compression (no 90% trigger), but constant battery efficiencies
+linearized at c_rate_ref and mid SOC (below the maximum of the efficiency map) and a rolling horizon that is
+myopic across windows. The deficit of the optimal dispatch is a benchmark (an estimate of what a better dispatch
+could reach with the same components), not a bound on the deficit of the rule-based cascade.
+
+'''
+
+#variables of each time step
+BC, BD, EB, EL, FC, CP, LP, HP, FLP, FHP, EXC, DEF = range(12)
+N_VAR = 12
+#equality constraints of each time step: power balance, battery, LP tank, HP tank, FC hydrogen
+N_ROW = 5
+
+#(row, variable, previous step, coefficient key) of the nonzeros of one step, coefficient keys:
+#0: +1, 1: -1, 2: -compressor kW per kg/step, 3: -eta_c*dt, 4: dt/eta_d, 5: -EL_CF*dt, 6: FC_CF*dt
+_PATTERN = [(0, BC, False, 1), (0, BD, False, 0), (0, EL, False, 1), (0, FC, False, 0), (0, CP, False, 2),
+            (0, DEF, False, 0), (0, EXC, False, 1),
+            (1, EB, False, 0), (1, EB, True, 1), (1, BC, False, 3), (1, BD, False, 4),
+            (2, LP, False, 0), (2, LP, True, 1), (2, EL, False, 5), (2, CP, False, 0), (2, FLP, False, 0),
+            (3, HP, False, 0), (3, HP, True, 1), (3, CP, False, 1), (3, FHP, False, 0),
+            (4, FC, False, 6), (4, FLP, False, 1), (4, FHP, False, 1)]
+
+
+@lru_cache(maxsize = 4)
+def window_structure(T):
+    'row indexes, column indexes and coefficient keys of the nonzeros of a window of T steps (built once per T)'
+
+    rows, cols, keys = [], [], []
+    t = np.arange(T)
+    for row, var, previous, key in _PATTERN:
+        tt = t[1:] if previous else t
+        rows.append(tt * N_ROW + row)
+        cols.append((tt - 1 if previous else tt) * N_VAR + var)
+        keys.append(np.full(len(tt), key))
+
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(keys)
+
+
+def solve_window(P_RES, P_load, state, limits, eps = 1e-6):
+    '''
+    LP of one window
+
+    P_RES, P_load : [kW] arrays of the window
+    state : initial battery energy [kWh], LP and HP tank levels [kg]
+    limits : dictionary of the component limits of the window (see optimal_dispatch)
+    eps : small cost of the battery throughput, avoids simultaneous charge and discharge
+
+    returns the (T, N_VAR) array of the optimal schedule
+    '''
+    T = len(P_RES)
+    dt = 1 / limits['kWh_factor']
+
+    rows, cols, keys = window_structure(T)
+    coef = np.array([1, -1, -limits['P_comp_per_kg'], -limits['eta_c'] * dt, dt / limits['eta_d'],
+                     -limits['EL_CF'] * dt, limits['FC_CF'] * dt])
+    A_eq = sparse.csr_matrix((coef[keys], (rows, cols)), shape = (T * N_ROW, T * N_VAR))
+
+    b_eq = np.zeros((T, N_ROW))
+    b_eq[:, 0] = P_load - P_RES
+    b_eq[0, 1] = state[0]
+    b_eq[0, 2] = state[1]
+    b_eq[0, 3] = state[2]
+
+    lo = np.zeros(N_VAR)
+    hi = np.full(N_VAR, np.inf)
+    hi[BC] = limits['P_BESS_C_max']
+    hi[BD] = limits['P_BESS_D_max']
+    lo[EB] = limits['E_BESS_min']
+    hi[EB] = limits['E_BESS_max']
+    hi[EL] = limits['EL_P_nom']
+    hi[FC] = limits['FC_P_nom']
+    hi[CP] = limits['H2_comp_max']
+    hi[LP] = limits['lp_tank']
+    hi[HP] = limits['tank']
+    bounds = np.column_stack([np.tile(lo, T), np.tile(hi, T)])
+
+    c = np.zeros((T, N_VAR))
+    c[:, DEF] = dt
+    c[:, BC] = eps * dt
+    c[:, BD] = eps * dt
+
+    res = linprog(c.ravel(), A_eq = A_eq, b_eq = b_eq.ravel(), bounds = bounds, method = 'highs')
+    if res.status != 0:
+        raise RuntimeError('dispatch LP not solved: ' + res.message)
+
+    return res.x.reshape(T, N_VAR)
+
+
+#%%
+def optimal_dispatch(df_data, s, window_h = 48, commit_h = 24, forecast = None, c_rate_ref = 0.2, trace = None):
+    '''
+    df_data : input dataframe (wind_power, PV_power, load, temperature, date), same of complete_sim
+    s : design vector [EL cells, FC cells, BESS kWh, HP tank kg, PV upgrade]
+    window_h : [h] length of the LP windows
+    commit_h : [h] part of each window that is kept (shift of the windows)
+    forecast : optional dataframe like df_data used for the look-ahead beyond the commit horizon
+               (None: perfect foresight)
+    c_rate_ref : C-rate at which the battery efficiencies are linearized
+    trace : optional TraceWriter (trace_export.py) receiving the committed time series (no EL/FC temperatures)
+
+    returns a one-row DataFrame with the same columns of complete_sim
+    '''
+    kWh_factor = 60   #dati min
+    dt = 1 / kWh_factor
+
+    EL_size, FC_size, BESS_size, Tank_size, PV_upgrade = s[0], s[1], s[2], s[3], s[4]
+    H2_storage = not (EL_size == 0 or FC_size == 0)
+
+    P_RES = res_profile(df_data, PV_upgrade)['P_RES']
+    P_load = np.asarray(df_data['load'], dtype = float)
+    if forecast is not None:
+        P_RES_fc = res_profile(forecast, PV_upgrade)['P_RES']
+        P_load_fc = np.asarray(forecast['load'], dtype = float)
+
+    'components, same of complete_sim'
+    EL_P_nom = EL_size * 9.45
+    FC_P_nom = FC_size * 13.57
+    lp_tank = 10
+    tank = Tank_size
+    time_to_compress = lp_tank / (60/kWh_factor)
+    H2_comp_max = lp_tank / time_to_compress                    # [kg] compressed in one step
+    P_comp_per_kg = l_compr_ms * kWh_factor                     # [kW] for 1 kg compressed in one step
+
+    SOC_max, SOC_min = MODEL_battery_NMC.SOC_max, MODEL_battery_NMC.SOC_min     # read at call time (sensitivity.py)
+    eta_c = eta(0.5 * (SOC_max + SOC_min), c_rate_ref, coeff_c)
+    eta_d = eta(0.5 * (SOC_max + SOC_min), c_rate_ref, coeff_d)
+
+    BESS_degr = 0
+    BESS_SOH = 1
+    SOC = 0.4
+    H2_lp = 0
+    H2_hp = 0.1 * tank
+    EL_h_work = 0
+    FC_h_work = 0
+
+    n_window = window_h * kWh_factor
+    n_commit = commit_h * kWh_factor
+    n_steps = len(P_RES)
+
+    sums = dict.fromkeys(['BESS_excess', 'BESS_deficit', 'comp', 'EL_P', 'H2_EL', 'H2_comp', 'excess', 'deficit',
+                          'EL_CF_active', 'FC_CF_active'], 0.0)
+    n_EL_active = 0
+    n_FC_active = 0
+    EL_CF_0 = EL_model(71, 0, EL_size, kWh_factor)[0] if H2_storage else 0.018
+    FC_CF_0 = FC_model(60, 0, FC_size, kWh_factor)[0] if H2_storage else 0.059
+
+    for start in range(0, n_steps, n_commit):
+        stop = min(start + n_window, n_steps)
+        n_keep = min(n_commit, stop - start)
+
+        'component limits of the window (SOH and working hours of the previous windows)'
+        Cap_actual = BESS_size * BESS_SOH
+        if H2_storage:
+            EL_CF = EL_model(71, EL_h_work, EL_size, kWh_factor)[0]
+            FC_CF = FC_model(60, FC_h_work, FC_size, kWh_factor)[0]
+        else:
+            EL_CF, FC_CF = 0, 0
+        limits = {'kWh_factor': kWh_factor, 'eta_c': eta_c, 'eta_d': eta_d, 'P_comp_per_kg': P_comp_per_kg,
+                  'EL_CF': EL_CF, 'FC_CF': FC_CF,
+                  'P_BESS_C_max': C_rate_C_max * Cap_actual, 'P_BESS_D_max': C_rate_D_max * Cap_actual,
+                  'E_BESS_min': SOC_min * Cap_actual, 'E_BESS_max': SOC_max * Cap_actual,
+                  'EL_P_nom': EL_P_nom if H2_storage else 0, 'FC_P_nom': FC_P_nom if H2_storage else 0,
+                  'H2_comp_max': H2_comp_max if H2_storage else 0, 'lp_tank': lp_tank, 'tank': tank}
+
+        P_RES_w = P_RES[start:stop].copy()
+        P_load_w = P_load[start:stop].copy()
+        if forecast is not None:
+            P_RES_w[n_keep:] = P_RES_fc[start + n_keep:stop]
+            P_load_w[n_keep:] = P_load_fc[start + n_keep:stop]
+
+        state = [np.clip(SOC * Cap_actual, limits['E_BESS_min'], limits['E_BESS_max']), H2_lp, H2_hp]
+        x = solve_window(P_RES_w, P_load_w, state, limits)[:n_keep]
+
+        'committed schedule'
+        P_net = P_RES[start:start + n_keep] + x[:, BD] - x[:, BC] - P_load[start:start + n_keep] - P_comp_per_kg * x[:, CP]
+        EL_on = x[:, EL] > 1e-9
+        FC_on = x[:, FC] > 1e-9
+        sums['BESS_excess'] += np.sum(np.maximum(P_net, 0)) * dt
+        sums['BESS_deficit'] += np.sum(np.maximum(-P_net, 0)) * dt
+        sums['comp'] += np.sum(P_comp_per_kg * x[:, CP]) * dt
+        sums['EL_P'] += np.sum(x[:, EL]) * dt
+        sums['H2_EL'] += np.sum(x[:, EL]) * EL_CF * dt
+        sums['H2_comp'] += np.sum(x[:, CP])
+        sums['excess'] += np.sum(x[:, EXC]) * dt
+        sums['deficit'] += np.sum(x[:, DEF]) * dt
+        sums['EL_CF_active'] += EL_CF * np.sum(EL_on)
+        sums['FC_CF_active'] += FC_CF * np.sum(FC_on)
+        n_EL_active = n_EL_active + np.sum(EL_on)
+        n_FC_active = n_FC_active + np.sum(FC_on)
+        EL_h_work = EL_h_work + np.sum(EL_on) / kWh_factor
+        FC_h_work = FC_h_work + np.sum(FC_on) / kWh_factor
+
+        SOC_w = x[:, EB] / Cap_actual
+
+        if trace is not None:
+            for j in range(n_keep):
+                trace.step(P_RES[start + j], P_load[start + j], P_net[j] + P_load[start + j], SOC_w[j], BESS_SOH,
+                           max(P_net[j], 0), max(-P_net[j], 0),
+                           x[j, EL], x[j, EL] * EL_CF * dt, np.nan, EL_CF, x[j, FC], x[j, FC] * FC_CF * dt, np.nan, FC_CF,
+                           x[j, LP], x[j, HP], P_comp_per_kg * x[j, CP], x[j, EXC], x[j, DEF])
+
+        'battery degradation on the committed SOC profile, assessed every hour as in battery_operation'
+        for h in range(0, n_keep, kWh_factor):
+            BESS_degr = Battery_degradation_day(list(SOC_w[h:h + kWh_factor]), BESS_degr)
+        BESS_SOH = 1 - 0.3 * BESS_degr
+
+        SOC = SOC_w[-1]
+        H2_lp = x[-1, LP]
+        H2_hp = x[-1, HP]
+
+    'Data saving, same quantities of complete_sim'
+    RES = res_profile(df_data, PV_upgrade)
+    E_RES = RES['E_RES']
+    E_load = RES['E_load']
+    E_deficit_RES = RES['E_deficit_RES']
+    E_excess_RES = RES['E_excess_RES']
+
+    E_deficit_BESS = sums['BESS_deficit'] / 1000
+    E_excess_BESS = sums['BESS_excess'] / 1000
+    E_deficit_H2 = sums['deficit'] / 1000
+    E_excess_H2 = sums['excess'] / 1000
+
+    output = pd.DataFrame()
+    output['BESS[MWh]'] = [BESS_size]
+    output['SOH_final'] = [BESS_SOH]
+
+    output['PV_power[kWp]'] = [160 * (1 + PV_upgrade/16)]
+    output['EL_n_cells'] = [EL_size]
+    output['FC_n_cells'] = [FC_size]
+    output['HP_tank[kg]'] = [tank]
+    output['LP_tank[kg]'] = [lp_tank]
+
+    output['EL_CF[kg/MWh]'] = [sums['EL_CF_active'] / n_EL_active * 1000 if n_EL_active > 0 else EL_CF_0]
+    output['FC_CF[kg/MWh]'] = [sums['FC_CF_active'] / n_FC_active * 1000 if n_FC_active > 0 else FC_CF_0]
+
+    output['EL_CF_fin'] = [EL_model(71, EL_h_work, EL_size, kWh_factor)[0] if H2_storage else 0]
+    output['FC_CF_fin'] = [FC_model(60, FC_h_work, FC_size, kWh_factor)[0] if H2_storage else 0]
+    output['EL_h_work'] = [EL_h_work]
+    output['FC_h_work'] = [FC_h_work]
+
+    output['H2_prod_EL[kg]'] = [sums['H2_EL']]
+    output['H2_Comp [kg]'] = [sums['H2_comp']]
+
+    output['E_RES[MWh]'] = [E_RES]
+    output['E_deficit_RES[MWh]'] = [E_deficit_RES]
+    output['E_excess_RES[MWh]'] = [E_excess_RES]
+    output['RES_SC[%]'] = [(E_load - E_deficit_RES) / E_load * 100]
+
+    output['E_BESS_deficit[MWh]'] = [E_deficit_BESS]
+    output['E_BESS_excess[MWh]'] = [E_excess_BESS]
+    output['BESS_SC[%]'] = [(E_load - E_deficit_BESS) / E_load * 100]
+
+    output['E_to_H2[MWh]'] = [sums['EL_P'] / 1000]
+    output['E_comp[MWh]'] = [sums['comp'] / 1000]
+
+    output['E_H2_deficit[MWh]'] = [E_deficit_H2]
+    output['E_H2_excess[MWh]'] = [E_excess_H2]
+    output['H2_SC[%]'] = [(E_load - E_deficit_H2) / E_load * 100]
+
+    return output
+
+
+def compare_dispatch(df_data, s, **kwargs):
+    '''
+    Rule-based cascade (complete_sim) against the optimal dispatch of the same design
+
+    kwargs : options of optimal_dispatch
+
+    returns a DataFrame with the main energy flows of both dispatches and their difference
+    '''
+    columns = ['E_BESS_deficit[MWh]', 'E_to_H2[MWh]', 'E_comp[MWh]', 'H2_prod_EL[kg]', 'SOH_final',
+               'E_H2_deficit[MWh]', 'E_H2_excess[MWh]', 'H2_SC[%]']
+
+    df_compare = pd.DataFrame({'rule_based': to_frame(complete_sim(df_data, s))[columns].iloc[0],
+                               'optimal': optimal_dispatch(df_data, s, **kwargs)[columns].iloc[0]})
+    df_compare['difference'] = df_compare['optimal'] - df_compare['rule_based']
+
+    return df_compare
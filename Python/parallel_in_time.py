@@ -0,0 +1,202 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+import MODEL_battery_NMC
+from extra_simplified_simulation import extra_simplified_sim
+from res_cache import res_profile
+
+
+'''
+Parallel-in-time simulation of a single design (extra_simplified_sim)
+
+- the time series is split in blocks of whole days, simulated at the same time on separate cores
+- the first block starts from the initial state, the other blocks from a guessed boundary state:
+  saturated SOC (SOC_max after a net RES surplus in the previous hours, SOC_min after a net deficit)
+- when the SOC saturates the future trajectory no longer depends on the past SOC: a trajectory started
+  from a wrong state merges with the right one at a saturation point where all the states coincide
+- the blocks are stitched in sequence. A block whose guess differs from the end state of the previous block is
+  re-run from the right state only until the first saturation point shared with the speculative run, the rest
+  of the block is taken from the speculative run (exact, apart from the rounding of the cumulative sums)
+
+Only the steps before the merge are simulated twice (about 0.6 % of a 4-block month of synthetic data), the wall
+time falls with the number of workers (with workers = 1 the stitching is an overhead, as in the equivalence report).
+
+complete_sim is not simulated parallel-in-time: battery damage and EL/FC working hours accumulate and never merge,
+so every block after a wrong guess has to be re-run and the blocks end up simulated in sequence. Its blocks are
+combined (combine_outputs) by the sequential block simulations of tank_reuse.py and representative_days.py.
+
+'''
+
+def split_blocks(n_steps, n_blocks, kWh_factor = 60):
+    'start and stop steps of the blocks (whole days, the last one can be shorter)'
+
+    day_steps = kWh_factor * 24
+    n_days = int(np.ceil(n_steps / day_steps))
+    n_blocks = max(1, min(n_blocks, n_days))
+
+    edges = np.round(np.linspace(0, n_days, n_blocks + 1)).astype(int) * day_steps
+    edges[-1] = n_steps
+
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def SOC_guess(P_RES, P_load, stop, kWh_factor = 60, hours = 6):
+    'saturated SOC guessed at the end of a block from the net RES surplus (or deficit) of its last hours'
+
+    #SOC limits read at call time (they can be changed at run time, sensitivity.py)
+    start = max(stop - hours * kWh_factor, 0)
+    if np.sum(P_RES[start:stop] - P_load[start:stop]) > 0:
+        return MODEL_battery_NMC.SOC_max
+    return MODEL_battery_NMC.SOC_min
+
+
+def _run_block(args):
+    df_block, s, sim_args, state = args
+
+    BESS_size, EL_CF, FC_CF = sim_args
+    output = extra_simplified_sim(df_block, s, BESS_size, EL_CF, FC_CF, state = state)
+
+    return output, state
+
+
+def _mapper(workers, n_tasks):
+    'map-like callable from workers (number of processes, -1 all the cores, or a map-like callable) and its pool'
+
+    if callable(workers):
+        return workers, None
+    if workers == 1 or n_tasks == 1:
+        return map, None
+    pool = Pool(min(os.cpu_count() if workers == -1 else workers, n_tasks))
+    return pool.map, pool
+
+
+def _inputs(df_data, s, n_blocks, workers):
+    if n_blocks is None:
+        n_blocks = os.cpu_count() if workers == -1 or callable(workers) else workers
+    blocks = split_blocks(len(df_data), n_blocks)
+
+    P_RES = res_profile(df_data, s[4])['P_RES']
+    P_load = np.asarray(df_data['load'], dtype = float)
+    df_blocks = [df_data.iloc[start:stop].reset_index(drop = True) for start, stop in blocks]
+
+    return blocks, df_blocks, P_RES, P_load
+
+
+#%%
+def pit_extra_simplified_sim(df_data, s, BESS_size, EL_CF, FC_CF, n_blocks = None, workers = -1, full_output = False):
+    '''
+    Parallel-in-time extra_simplified_sim, same inputs and output
+
+    n_blocks : number of blocks (default: number of workers)
+    workers : number of processes (-1 all the cores) or a map-like callable
+    full_output : if True returns also a dictionary with the number of blocks, re-runs and stitches
+    '''
+    blocks, df_blocks, P_RES, P_load = _inputs(df_data, s, n_blocks, workers)
+    sim_args = (BESS_size, EL_CF, FC_CF)
+
+    FAST = ['SOC', 'H2_lp', 'H2_hp', 'counter']
+    init = {'SOC': 0.4, 'H2_lp': 0, 'H2_hp': 0.1 * s[3], 'counter': 0}
+    starts = [init] + [dict(init, SOC = SOC_guess(P_RES, P_load, start)) for start, _ in blocks[1:]]
+
+    'speculative runs of all the blocks'
+    tasks = [(df_blocks[k], s, sim_args, dict(starts[k], sync = {}) if k > 0 else {})
+             for k in range(len(blocks))]
+    mapper, pool = _mapper(workers, len(tasks))
+    try:
+        results = list(mapper(_run_block, tasks))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    'stitching'
+    state = results[0][1]
+    cumulative = np.array(state['cumulative'])
+    end = tuple(state[key] for key in FAST)
+    n_rerun = 0
+    n_stitch = 0
+    rerun_steps = 0
+
+    for k in range(1, len(blocks)):
+        spec = results[k][1]
+
+        if tuple(starts[k][key] for key in FAST) == end:
+            block_cumulative = np.array(spec['cumulative'])
+            end = tuple(spec[key] for key in FAST)
+            cumulative = cumulative + block_cumulative
+            continue
+
+        #wrong guess: re-run from the right state until the first saturation point of the speculative run
+        rerun = dict(zip(FAST, end), target = spec['sync'])
+        _run_block((df_blocks[k], s, sim_args, rerun))
+        n_rerun = n_rerun + 1
+
+        if 'stitch' in rerun:
+            j = rerun['stitch']
+            block_cumulative = np.array(rerun['cumulative']) + np.array(spec['cumulative']) - np.array(spec['sync'][j][1])
+            end = tuple(spec[key] for key in FAST)
+            n_stitch = n_stitch + 1
+            rerun_steps = rerun_steps + j + 1
+        else:
+            block_cumulative = np.array(rerun['cumulative'])
+            end = tuple(rerun[key] for key in FAST)
+            rerun_steps = rerun_steps + len(df_blocks[k])
+
+        cumulative = cumulative + block_cumulative
+
+    #outputs from the cumulative values of the whole series (no time step simulated)
+    output = extra_simplified_sim(df_data.iloc[:0], s, BESS_size, EL_CF, FC_CF,
+                                  state = dict(zip(FAST, end), cumulative = tuple(cumulative)))
+
+    if full_output:
+        return output, {'n_blocks': len(blocks), 'n_rerun': n_rerun, 'n_stitch': n_stitch,
+                        'rerun_steps': rerun_steps, 'n_steps': len(df_data)}
+    return output
+
+
+#%%
+'outputs of consecutive blocks of complete_sim'
+
+SUM_COLUMNS = ['H2_prod_EL[kg]', 'H2_Comp [kg]', 'E_RES[MWh]', 'E_deficit_RES[MWh]', 'E_excess_RES[MWh]',
+               'E_BESS_deficit[MWh]', 'E_BESS_excess[MWh]', 'E_to_H2[MWh]', 'E_comp[MWh]',
+               'E_H2_deficit[MWh]', 'E_H2_excess[MWh]']
+
+
+def combine_outputs(outputs, states, weights = None):
+    '''
+    output of complete_sim for the whole series from the outputs and final states of consecutive blocks:
+    energies and masses are summed, final values (SOH, conversion factors, working hours) come from the last block
+
+    weights : optional number of times each block is counted (representative days, representative_days.py)
+    '''
+    if weights is None:
+        weights = [1] * len(outputs)
+
+    output = outputs[-1].copy()
+
+    for col in SUM_COLUMNS:
+        output[col] = [sum(w * out[col][0] for w, out in zip(weights, outputs))]
+
+    for name, col in [('EL_CF_active', 'EL_CF[kg/MWh]'), ('FC_CF_active', 'FC_CF[kg/MWh]')]:
+        CF_sum = sum(w * state[name][0] for w, state in zip(weights, states))
+        n_active = sum(w * state[name][1] for w, state in zip(weights, states))
+        output[col] = [CF_sum / n_active * 1000 if n_active != 0 else outputs[0][col][0]]
+
+    E_load = sum(w * state['E_load'] for w, state in zip(weights, states))
+    output['RES_SC[%]'] = [(E_load - output['E_deficit_RES[MWh]'][0]) / E_load * 100]
+    output['BESS_SC[%]'] = [(E_load - output['E_BESS_deficit[MWh]'][0]) / E_load * 100]
+    output['H2_SC[%]'] = [(E_load - output['E_H2_deficit[MWh]'][0]) / E_load * 100]
+
+    return output
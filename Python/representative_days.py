@@ -0,0 +1,248 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from scipy.spatial.distance import cdist
+
+from MODEL_EL_variable import EL_model
+from MODEL_FC_variable import FC_model
+from complete_simulation import complete_sim
+from extra_simplified_simulation import extra_simplified_sim
+from parallel_in_time import combine_outputs
+from early_termination import DeficitBoundExceeded
+
+
+'''
+Representative-day compression of the input year
+
+- the days of df_data are clustered with k-medoids on their hourly wind, PV, load and temperature profiles
+- the compressed year contains the k medoid days in chronological order, each with the number of days
+  it represents ('weight' column) and its position in the year ('day' column)
+- chronological linkage: the representative days are simulated in sequence, the storage state (SOC, tanks,
+  temperatures) at the end of a day is the initial state of the next one; energies are counted 'weight' times
+  and the degradation states (battery damage, working hours) advance by 'weight' times the increment of the day
+- LCORE_evaluation recognizes a compressed year from the 'weight' column and uses rep_complete_sim
+  and rep_extra_simplified_sim
+- validation_report compares KPIs and LCORE of the compressed year with the full year for reference designs
+
+'''
+
+kWh_factor = 60   #dati min
+day_steps = kWh_factor * 24
+
+FEATURES = ['wind_power', 'PV_power', 'load', 'temperature']
+
+
+def day_features(df_data):
+    'hourly profiles of each day (rows) of wind, PV, load and temperature, standardized variable by variable'
+
+    n_days = len(df_data) // day_steps
+    if n_days * day_steps != len(df_data):
+        raise ValueError('the input data must contain whole days of ' + str(day_steps) + ' time steps')
+
+    X = []
+    for col in FEATURES:
+        hourly = df_data[col].to_numpy(dtype = float).reshape(n_days, 24, kWh_factor).mean(axis = 2)
+        std = hourly.std()
+        X.append((hourly - hourly.mean()) / std if std > 0 else hourly * 0)
+
+    return np.hstack(X)
+
+
+def k_medoids(X, k, seed = 0, max_iter = 100):
+    '''
+    X : (n, m) array of the days to cluster
+    k : number of clusters
+
+    returns the indexes of the medoids and the cluster (position in the medoids array) of each row of X
+    '''
+    rng = np.random.default_rng(seed)
+    n = len(X)
+    k = min(k, n)
+    D = cdist(X, X)
+
+    'k-medoids++ initialization'
+    medoids = [int(rng.integers(n))]
+    for _ in range(1, k):
+        d2 = np.min(D[:, medoids], axis = 1) ** 2
+        if d2.sum() == 0:
+            candidates = [i for i in range(n) if i not in medoids]
+            medoids.append(int(rng.choice(candidates)))
+        else:
+            medoids.append(int(rng.choice(n, p = d2 / d2.sum())))
+
+    'alternate assignment and medoid update until the medoids do not change'
+    for _ in range(max_iter):
+        labels = np.argmin(D[:, medoids], axis = 1)
+        new_medoids = []
+        for j in range(k):
+            members = np.where(labels == j)[0]
+            new_medoids.append(int(members[np.argmin(D[np.ix_(members, members)].sum(axis = 1))]))
+        if new_medoids == medoids:
+            break
+        medoids = new_medoids
+
+    labels = np.argmin(D[:, medoids], axis = 1)
+
+    return np.array(medoids), labels
+
+
+def compress_year(df_data, k = 12, seed = 0):
+    '''
+    df_data : input dataframe (wind_power, PV_power, load, temperature, date) of whole days
+    k : number of representative days
+
+    returns the compressed dataframe (medoid days in chronological order with 'weight' and 'day' columns)
+    and the representative day of each day of the year
+    '''
+    medoids, labels = k_medoids(day_features(df_data), k, seed = seed)
+
+    order = np.argsort(medoids)
+    weights = np.bincount(labels, minlength = len(medoids))
+
+    days = []
+    for j in order:
+        d = medoids[j]
+        df_day = df_data.iloc[d * day_steps:(d + 1) * day_steps].copy()
+        df_day['weight'] = weights[j]
+        df_day['day'] = d
+        days.append(df_day)
+
+    df_rep = pd.concat(days, axis = 0).reset_index(drop = True)
+
+    return df_rep, medoids[labels]
+
+
+def _days(df_rep):
+    'blocks of the representative days and their weights'
+    n_rep = len(df_rep) // day_steps
+    weights = df_rep['weight'].to_numpy()[::day_steps][:n_rep]
+    blocks = [df_rep.iloc[d * day_steps:(d + 1) * day_steps].reset_index(drop = True) for d in range(n_rep)]
+    return blocks, weights
+
+
+#%%
+def rep_complete_sim(df_rep, s, profiler = None, E_deficit_max = None):
+    '''
+    complete_sim of a compressed year (same inputs and output)
+
+    profiler : optional SimProfiler, filled by the simulations of all the representative days
+    E_deficit_max : optional deficit energy [MWh] of the weighted year, checked at the end of each representative day
+    '''
+    FAST = ['SOC', 'EL_T', 'FC_T', 'H2_lp', 'H2_hp', 'counter']
+    SLOW = ['Degr', 'EL_h_work', 'FC_h_work']
+
+    blocks, weights = _days(df_rep)
+    outputs = []
+    states = []
+    start = {}
+    E_deficit = 0
+
+    for d, (df_day, w) in enumerate(zip(blocks, weights)):
+        state = dict(start)
+        output = complete_sim(df_day, s, profiler = profiler, state = state)
+        if profiler is not None:
+            output = output[0]
+        outputs.append(output)
+        states.append(state)
+
+        'storage states carried to the next day, degradation states advanced by weight times the increment'
+        slow_0 = [start.get(key, 0) for key in SLOW]
+        start = dict((key, state[key]) for key in FAST)
+        for key, x0 in zip(SLOW, slow_0):
+            start[key] = x0 + w * (state[key] - x0)
+
+        E_deficit = E_deficit + w * output['E_H2_deficit[MWh]'][0]
+        if E_deficit_max is not None and E_deficit > E_deficit_max:
+            raise DeficitBoundExceeded(E_deficit, (d + 1) * day_steps)
+
+    output = combine_outputs(outputs, states, weights)
+
+    #end-of-year degradation of the weighted year
+    output['SOH_final'] = [1 - 0.3 * start['Degr']]
+    output['EL_h_work'] = [start['EL_h_work']]
+    output['FC_h_work'] = [start['FC_h_work']]
+    if s[0] != 0 and s[1] != 0:
+        output['EL_CF_fin'] = [EL_model(71, start['EL_h_work'], s[0], kWh_factor)[0]]
+        output['FC_CF_fin'] = [FC_model(60, start['FC_h_work'], s[1], kWh_factor)[0]]
+
+    if profiler is not None:
+        return output, profiler.report()
+    return output
+
+
+def rep_extra_simplified_sim(df_rep, s, BESS_size, EL_CF, FC_CF, E_deficit_max = None):
+    '''
+    extra_simplified_sim of a compressed year (same inputs and output)
+
+    E_deficit_max : optional deficit energy [MWh] of the weighted year, checked at the end of each representative day
+    '''
+    FAST = ['SOC', 'H2_lp', 'H2_hp', 'counter']
+
+    blocks, weights = _days(df_rep)
+    cumulative = 0
+    start = {}
+
+    for d, (df_day, w) in enumerate(zip(blocks, weights)):
+        state = dict(start)
+        extra_simplified_sim(df_day, s, BESS_size, EL_CF, FC_CF, state = state)
+        cumulative = cumulative + w * np.array(state['cumulative'])
+        start = dict((key, state[key]) for key in FAST)
+
+        #last cumulative value: deficit power after H2 [kW x steps]
+        E_deficit = cumulative[-1] / kWh_factor / 1000
+        if E_deficit_max is not None and E_deficit > E_deficit_max:
+            raise DeficitBoundExceeded(E_deficit, (d + 1) * day_steps)
+
+    #outputs from the weighted cumulative values (no time step simulated)
+    return extra_simplified_sim(df_rep.iloc[:0], s, BESS_size, EL_CF, FC_CF,
+                                state = dict(start, cumulative = tuple(cumulative)))
+
+
+#%%
+def validation_report(df_data, df_rep, designs, scenario):
+    '''
+    df_data : full input year
+    df_rep : compressed year (compress_year)
+    designs : reference designs in grid units [EL, FC, BESS, Tank, PV]
+    scenario : dictionary returned by scenario_setup
+
+    returns a DataFrame with the first-year KPIs and the LCORE of each design on the full and compressed year,
+    their relative error and the evaluation times
+    '''
+    #imported here: LCORE_evaluation uses the simulations of this module for compressed years
+    from LCORE_evaluation import LCORE_evaluation
+
+    KPIS = ['SOH_final', 'EL_CF[kg/MWh]', 'FC_CF[kg/MWh]', 'H2_prod_EL[kg]', 'E_BESS_deficit[MWh]',
+            'E_H2_deficit[MWh]', 'E_H2_excess[MWh]', 'H2_SC[%]']
+
+    rows = []
+    for design in designs:
+        results = {}
+        for name, df in [('full', df_data), ('compressed', df_rep)]:
+            t0 = perf_counter()
+            LCORE, df_years = LCORE_evaluation(list(design), df, scenario, full_output = True)
+            results[name] = dict(df_years.iloc[0][KPIS], LCORE = LCORE, time = perf_counter() - t0)
+
+        for kpi in KPIS + ['LCORE']:
+            full = results['full'][kpi]
+            compressed = results['compressed'][kpi]
+            rows.append({'design': str(list(design)), 'KPI': kpi, 'full': full, 'compressed': compressed,
+                         'rel_error[%]': (compressed - full) / full * 100 if full != 0 else np.nan,
+                         'time_full[s]': results['full']['time'],
+                         'time_compressed[s]': results['compressed']['time']})
+
+    df_report = pd.DataFrame(rows)
+    df_report.attrs['steps_fraction'] = len(df_rep) / len(df_data)
+
+    return df_report
@@ -0,0 +1,106 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import hashlib
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+
+'''
+Cache of the design-invariant quantities of the simulations
+
+- the RES power profile depends only on the input data and on PV_upgrade, the same for all the simulated years
+  of a design and for all the designs with the same PV size
+- each entry (key: hash of the input data, PV_upgrade) holds the contiguous P_RES array and the RES-only KPIs
+  of complete_sim (E_RES, E_load, E_deficit_RES, E_excess_RES), computed with the same expressions
+- one cache per process (each worker of the optimizer has its own), at most maxsize entries (least recently used
+  are dropped)
+- the hash of the input data is computed once per dataframe (memo by id, dropped with the dataframe, checked
+  against the memory address of the columns): the input data are not modified in place
+
+'''
+
+kWh_factor = 60   #dati min
+
+_cache = OrderedDict()
+_stats = {'hits': 0, 'misses': 0}
+maxsize = 16
+
+RES_COLUMNS = ('wind_power', 'PV_power', 'load')
+_hashes = {}
+
+
+def data_hash(df_data, columns = RES_COLUMNS):
+    'hash of the columns of the input data (default: the columns that define the RES profile and the load)'
+
+    columns = tuple(columns)
+    arrays = [df_data[col].to_numpy() for col in columns]
+    fingerprint = (len(df_data),) + tuple(a.__array_interface__['data'][0] for a in arrays)
+
+    key = (id(df_data), columns)
+    entry = _hashes.get(key)
+    if entry is not None and entry[0]() is df_data and entry[1] == fingerprint:
+        return entry[2]
+
+    h = hashlib.blake2b(digest_size = 16)
+    for a in arrays:
+        h.update(np.ascontiguousarray(a, dtype = float).tobytes())
+    digest = h.hexdigest()
+
+    _hashes[key] = (weakref.ref(df_data, lambda _, key = key: _hashes.pop(key, None)), fingerprint, digest)
+    return digest
+
+
+def res_profile(df_data, PV_upgrade):
+    '''
+    df_data : input dataframe (wind_power, PV_power, load, temperature, date)
+    PV_upgrade : PV size of the design (s[4])
+
+    returns a dictionary with P_RES [kW] (read-only array) and E_RES, E_load, E_deficit_RES, E_excess_RES [MWh]
+    '''
+    key = (data_hash(df_data), float(PV_upgrade))
+
+    if key in _cache:
+        _stats['hits'] += 1
+        _cache.move_to_end(key)
+        return _cache[key]
+
+    _stats['misses'] += 1
+
+    #same expressions of complete_sim, on arrays
+    P_RES = np.ascontiguousarray((df_data['wind_power'] + df_data['PV_power'] * ( 1 + PV_upgrade / 16)).to_numpy(dtype = float))
+    P_load = df_data['load'].to_numpy(dtype = float)
+    P_RES.flags.writeable = False
+
+    P_mismatch = P_RES - P_load                                                 #[kW] power mismatch between RES and load
+    entry = {'P_RES': P_RES,
+             'E_RES': (sum(P_RES)/kWh_factor)/1000,                            #[MWh]  available energy from RES
+             'E_load': (sum(P_load)/kWh_factor)/1000,                          #[MWh]  total energy required by load
+             'E_deficit_RES': - sum(p for p in P_mismatch if p < 0)/kWh_factor/1000,   #[MWh]  deficit energy with initial RES
+             'E_excess_RES': sum(p for p in P_mismatch if p > 0)/kWh_factor/1000}      #[MWh]  excess energy with initial RES
+
+    _cache[key] = entry
+    if len(_cache) > maxsize:
+        _cache.popitem(last = False)
+
+    return entry
+
+
+def cache_info():
+    'hits, misses and number of entries of the cache of this process'
+    return {'hits': _stats['hits'], 'misses': _stats['misses'], 'size': len(_cache)}
+
+
+def cache_clear():
+    _cache.clear()
+    _stats['hits'] = 0
+    _stats['misses'] = 0
@@ -0,0 +1,473 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import argparse
+import copy
+import json
+import os
+import pickle
+import time
+import warnings
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+from scipy.stats import qmc
+
+import MODEL_EL_variable
+import MODEL_FC_variable
+import MODEL_battery_NMC
+import MODEL_battery_NMC_simplified
+import dispatch_engine
+from LCORE_calculator import LCORE_function
+from LCORE_evaluation import scenario_setup, LCORE_evaluation
+
+
+'''
+Global sensitivity analysis of the LCORE of a design to model and economic parameters
+
+The model parameters are module constants of the component models (EL and FC degradation coefficients, battery
+cycles to end of life EoL = a * DoD^b, SOC window, EL minimum power, compressor trigger of the LP tank): they are
+set in the worker processes for each sample and restored after the evaluation. The prices are multipliers of the
+installation and O&M costs of the cost scenario and of the electricity purchase price.
+
+- morris_sample / sobol_sample : sample matrices in the unit hypercube (Morris trajectories, Saltelli A, B, AB_i)
+- the physics of a sample (component sizes and yearly deficits of LCORE_evaluation) only depends on the design
+  and the model parameters: it is evaluated once and cached (optionally in a journal, a run can be resumed),
+  the samples that differ only in the prices are re-priced with LCORE_function
+- the samples are evaluated in parallel batches, MorrisEffects and SobolIndices aggregate the indices
+  incrementally after each batch (written to the output file)
+
+python sensitivity.py --design 2 2 4 1 2 --method sobol --n 256 --batch 16 --workers -1 --output indices.csv --journal sens.jsonl
+
+'''
+
+#name, kind, bounds, targets: (module, constant) of the model parameters, cost items of the prices
+PARAMETERS = [
+    {'name': 'EL_V_degr',         'kind': 'model', 'bounds': (1.5e-6, 6e-6),   'targets': [(MODEL_EL_variable, 'V_degr')]},
+    {'name': 'EL_V_T',            'kind': 'model', 'bounds': (2.5e-3, 7.5e-3), 'targets': [(MODEL_EL_variable, 'V_T')]},
+    {'name': 'FC_V_degr',         'kind': 'model', 'bounds': (2.5e-6, 1e-5),   'targets': [(MODEL_FC_variable, 'V_degr_cell')]},
+    {'name': 'FC_V_T',            'kind': 'model', 'bounds': (2.5e-4, 7.5e-4), 'targets': [(MODEL_FC_variable, 'V_T_cell')]},
+    {'name': 'BESS_EoL_a',        'kind': 'model', 'bounds': (1200, 1800),     'targets': [(MODEL_battery_NMC, 'EoL_a')]},
+    {'name': 'BESS_EoL_b',        'kind': 'model', 'bounds': (-1.1, -0.85),    'targets': [(MODEL_battery_NMC, 'EoL_b')]},
+    {'name': 'SOC_max',           'kind': 'model', 'bounds': (0.9, 0.98),      'targets': [(MODEL_battery_NMC, 'SOC_max'),
+                                                                                           (MODEL_battery_NMC_simplified, 'SOC_max')]},
+    {'name': 'SOC_min',           'kind': 'model', 'bounds': (0.05, 0.25),     'targets': [(MODEL_battery_NMC, 'SOC_min'),
+                                                                                           (MODEL_battery_NMC_simplified, 'SOC_min')]},
+    {'name': 'EL_P_min_fraction', 'kind': 'model', 'bounds': (0.1, 0.3),       'targets': [(dispatch_engine, 'EL_P_MIN_FRACTION')]},
+    {'name': 'LP_tank_trigger',   'kind': 'model', 'bounds': (0.7, 0.95),      'targets': [(dispatch_engine, 'LP_TANK_TRIGGER')]},
+    {'name': 'price_EL',          'kind': 'price', 'bounds': (0.7, 1.3),       'targets': ['EL']},
+    {'name': 'price_FC',          'kind': 'price', 'bounds': (0.7, 1.3),       'targets': ['FC']},
+    {'name': 'price_BESS',        'kind': 'price', 'bounds': (0.7, 1.3),       'targets': ['BESS']},
+    {'name': 'price_tank',        'kind': 'price', 'bounds': (0.7, 1.3),       'targets': ['HP_tank', 'LP_tank']},
+    {'name': 'price_PV',          'kind': 'price', 'bounds': (0.7, 1.3),       'targets': ['PV']},
+    {'name': 'price_electricity', 'kind': 'price', 'bounds': (0.7, 1.3),       'targets': ['electricity']},
+]
+_BY_NAME = dict((p['name'], p) for p in PARAMETERS)
+
+#nominal values: current model constants, unit price multipliers
+NOMINAL = dict((p['name'], getattr(*p['targets'][0]) if p['kind'] == 'model' else 1.0) for p in PARAMETERS)
+
+
+def set_parameters(values):
+    '''
+    values : dictionary of model parameter values (names of PARAMETERS, price multipliers ignored)
+
+    returns the previous values (to restore them)
+    '''
+    previous = {}
+    for name, value in values.items():
+        p = _BY_NAME[name]
+        if p['kind'] != 'model':
+            continue
+        previous[name] = getattr(*p['targets'][0])
+        for module, constant in p['targets']:
+            setattr(module, constant, value)
+    return previous
+
+
+def reprice(scenario, values):
+    'components and electricity dictionaries of the scenario with the price multipliers of values'
+    components = copy.deepcopy(scenario['components'])
+    electricity = copy.deepcopy(scenario['electricity'])
+    for name, value in values.items():
+        p = _BY_NAME[name]
+        if p['kind'] != 'price':
+            continue
+        for item in p['targets']:
+            if item == 'electricity':
+                electricity['purchase price from grid'] = electricity['purchase price from grid'] * value
+            else:
+                components[item]['total installation costs'] = components[item]['total installation costs'] * value
+                components[item]['OeM'] = components[item]['OeM'] * value
+    return components, electricity
+
+
+#%%
+'sample matrices in the unit hypercube'
+
+def morris_sample(k, r, levels = 4, seed = None):
+    '''
+    k : number of parameters
+    r : number of trajectories
+    levels : number of levels of the grid, step delta = levels / (2 (levels - 1))
+
+    returns the (r, k + 1, k) points of the trajectories (one parameter changed at each step) and the delta
+    '''
+    rng = np.random.default_rng(seed)
+    delta = levels / (2 * (levels - 1))
+    grid = np.arange(levels) / (levels - 1)
+    base_levels = grid[grid <= 1 - delta + 1e-12]
+
+    X = np.empty((r, k + 1, k))
+    for t in range(r):
+        x = rng.choice(base_levels, k)
+        up = rng.random(k) < 0.5
+        x = np.where(up, x, x + delta)          # the step goes up or down from a point of the grid
+        X[t, 0] = x
+        for step, j in enumerate(rng.permutation(k)):
+            x = x.copy()
+            x[j] = x[j] + delta if up[j] else x[j] - delta
+            X[t, step + 1] = x
+    return X, delta
+
+
+def sobol_sample(k, n, seed = None):
+    '''
+    k : number of parameters
+    n : number of base samples (power of 2 for the balance of the Sobol sequence)
+
+    returns the (n, k) matrices A and B (Saltelli scheme, AB_i is A with the column i of B)
+    '''
+    AB = qmc.Sobol(d = 2 * k, scramble = True, seed = seed).random(n)
+    return AB[:, :k], AB[:, k:]
+
+
+#%%
+'incremental aggregation of the indices'
+
+class _Running:
+    'running mean and variance of arrays (Welford)'
+
+    def __init__(self, shape = ()):
+        self.n = 0
+        self.mean = np.zeros(shape)
+        self.M2 = np.zeros(shape)
+
+    def update(self, x):
+        self.n = self.n + 1
+        d = x - self.mean
+        self.mean = self.mean + d / self.n
+        self.M2 = self.M2 + d * (x - self.mean)
+
+    @property
+    def var(self):
+        return self.M2 / (self.n - 1) if self.n > 1 else np.full(np.shape(self.mean), np.nan)
+
+
+class MorrisEffects:
+    '''
+    names : parameter names
+
+    update(X, f) with the unit points (k + 1, k) of a trajectory and their outputs, indices() gives
+    mu, mu_star (mean absolute elementary effect) and sigma of each parameter (elementary effects per unit range),
+    the trajectories with a failed evaluation are skipped and counted (n_failed)
+    '''
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.effects = _Running(len(self.names))
+        self.abs_effects = _Running(len(self.names))
+        self.n_failed = 0
+
+    def update(self, X, f):
+        f = np.asarray(f, dtype = float)
+        if not np.all(np.isfinite(f)):
+            self.n_failed = self.n_failed + 1
+            return
+        EE = np.empty(len(self.names))
+        for step in range(len(self.names)):
+            dx = X[step + 1] - X[step]
+            j = int(np.argmax(np.abs(dx)))
+            EE[j] = (f[step + 1] - f[step]) / dx[j]
+        self.effects.update(EE)
+        self.abs_effects.update(np.abs(EE))
+
+    def indices(self):
+        return pd.DataFrame({'parameter': self.names, 'mu': self.effects.mean, 'mu_star': self.abs_effects.mean,
+                             'sigma': np.sqrt(self.effects.var), 'n': self.effects.n, 'n_failed': self.n_failed})
+
+
+class SobolIndices:
+    '''
+    names : parameter names
+
+    update(fA, fB, fAB) with the outputs of a base sample (fAB of the k matrices AB_i), indices() gives the first
+    order (Saltelli 2010) and total (Jansen) indices with their 95 % confidence half-widths, the base samples with a
+    failed evaluation are skipped and counted (n_failed)
+    '''
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.f = _Running()
+        self.first = _Running(len(self.names))
+        self.total = _Running(len(self.names))
+        self.n_failed = 0
+
+    def update(self, fA, fB, fAB):
+        fAB = np.asarray(fAB, dtype = float)
+        if not (np.isfinite(fA) and np.isfinite(fB) and np.all(np.isfinite(fAB))):
+            self.n_failed = self.n_failed + 1
+            return
+        self.f.update(fA)
+        self.f.update(fB)
+        self.first.update(fB * (fAB - fA))
+        self.total.update(0.5 * (fA - fAB) ** 2)
+
+    def indices(self):
+        V = self.f.var
+        n = self.first.n
+        return pd.DataFrame({'parameter': self.names,
+                             'S1': self.first.mean / V, 'S1_conf': 1.96 * np.sqrt(self.first.var / n) / V,
+                             'ST': self.total.mean / V, 'ST_conf': 1.96 * np.sqrt(self.total.var / n) / V,
+                             'n': n, 'n_failed': self.n_failed})
+
+
+#%%
+'evaluation of the physics in the worker processes'
+
+_worker = {}
+
+
+def _init_worker(df_data, scenario):
+    'input data and scenario sent once to each worker process'
+    _worker['df_data'] = df_data
+    _worker['scenario'] = scenario
+
+
+def _evaluate_physics(task):
+    '(design, model parameter values) -> key, component sizes and yearly deficits (or the error) of the design'
+    design, values = task
+    previous = set_parameters(values)
+    try:
+        _, df_output_years = LCORE_evaluation(list(design), _worker['df_data'], _worker['scenario'], full_output = True)
+        physics = {'sizes': dict((key, float(v)) for key, v in df_output_years.attrs['sizes'].items()),
+                   'E_def': [float(v) for v in df_output_years['E_H2_deficit[MWh]']]}
+    except Exception as e:
+        physics = {'error': type(e).__name__ + ': ' + str(e)}
+    finally:
+        set_parameters(previous)
+    return (tuple(design), tuple(values.values())), physics
+
+
+class SensitivityDriver:
+    '''
+    df_data : input dataframe
+    scenario : cost scenario (scenario_setup)
+    designs : list of designs in grid units [EL, FC, BESS, Tank, PV]
+    parameters : names of the varied parameters (default all of PARAMETERS), the others stay nominal
+    bounds : optional dictionary name -> (min, max) overriding the bounds of PARAMETERS
+    workers : number of processes (-1 all the cores, 1 evaluations in this process)
+    journal : optional jsonl file of the evaluated physics, loaded at start and appended (resumed runs)
+    max_failed : largest share of failed evaluations (points x designs), evaluate raises RuntimeError above it
+    '''
+
+    def __init__(self, df_data, scenario, designs, parameters = None, bounds = None, workers = -1, journal = None,
+                 max_failed = 0.05):
+        self.scenario = scenario
+        self.designs = [tuple(int(v) for v in d) for d in designs]
+        self.names = list(parameters) if parameters is not None else [p['name'] for p in PARAMETERS]
+        for name in self.names:
+            if name not in _BY_NAME:
+                raise ValueError('unknown parameter ' + name)
+        bounds = dict(bounds or {})
+        self.lo = np.array([bounds.get(name, _BY_NAME[name]['bounds'])[0] for name in self.names], dtype = float)
+        self.hi = np.array([bounds.get(name, _BY_NAME[name]['bounds'])[1] for name in self.names], dtype = float)
+        self.model_names = [p['name'] for p in PARAMETERS if p['kind'] == 'model']
+
+        self.cache = {}
+        self.n_evaluated = 0
+        self.n_points = 0
+        self.n_failed = 0
+        self.max_failed = max_failed
+        self.journal = journal
+        if journal is not None and os.path.exists(journal):
+            with open(journal) as f:
+                for line in f:
+                    record = json.loads(line)
+                    self.cache[(tuple(record['design']), tuple(record['model']))] = record['physics']
+
+        _init_worker(df_data, scenario)
+        self.processes = os.cpu_count() if workers == -1 else workers
+        self.pool = Pool(self.processes, _init_worker, (df_data, scenario)) if self.processes > 1 else None
+
+    def _values(self, u):
+        'all parameter values of a unit point (nominal for the parameters not varied)'
+        values = dict(NOMINAL)
+        values.update(zip(self.names, self.lo + u * (self.hi - self.lo)))
+        return values
+
+    def _model(self, values):
+        return dict((name, float(values[name])) for name in self.model_names)
+
+    def evaluate(self, points):
+        '''
+        points : (n, k) unit points
+
+        returns the (n, number of designs) LCOREs (nan for failed evaluations), the physics of the points is
+        evaluated in parallel once for each design and set of model parameters
+
+        raises RuntimeError if the share of failed evaluations of all the points so far exceeds max_failed
+        '''
+        values = [self._values(u) for u in points]
+        tasks = {}
+        for v in values:
+            model = self._model(v)
+            for design in self.designs:
+                key = (design, tuple(model.values()))
+                if key not in self.cache:
+                    tasks[key] = (design, model)
+
+        results = self.pool.imap_unordered(_evaluate_physics, tasks.values()) if self.pool is not None else \
+                  map(_evaluate_physics, tasks.values())
+        for key, physics in results:
+            self.cache[key] = physics
+            self.n_evaluated = self.n_evaluated + 1
+            if self.journal is not None:
+                with open(self.journal, 'a') as f:
+                    f.write(json.dumps({'design': list(key[0]), 'model': list(key[1]), 'physics': physics}) + '\n')
+
+        LCORE = np.full((len(values), len(self.designs)), np.nan)
+        error = None
+        for n, v in enumerate(values):
+            components, electricity = reprice(self.scenario, v)
+            model = tuple(self._model(v).values())
+            for d, design in enumerate(self.designs):
+                physics = self.cache[(design, model)]
+                if 'error' not in physics:
+                    LCORE[n, d] = LCORE_function(physics['sizes'], physics['E_def'], components, electricity,
+                                                 self.scenario['lifetime'], dict(self.scenario['hydrogen']), self.scenario['r'])
+                else:
+                    self.n_failed = self.n_failed + 1
+                    error = physics['error']
+        self.n_points = self.n_points + len(values)
+
+        if self.n_failed > self.max_failed * self.n_points * len(self.designs):
+            raise RuntimeError(str(self.n_failed) + ' failed evaluations of ' + str(self.n_points * len(self.designs)) +
+                               ' (max_failed = ' + str(self.max_failed) + '), last error: ' + str(error))
+        return LCORE
+
+    def morris(self, r = 20, levels = 4, batch = 4, seed = None, callback = None):
+        '''
+        r : number of trajectories, evaluated batch trajectories at a time
+        callback : optional function (indices) called after each batch with the dictionary design -> DataFrame
+
+        returns the dictionary design -> DataFrame of the Morris indices
+        '''
+        X, _ = morris_sample(len(self.names), r, levels, seed)
+        effects = dict((design, MorrisEffects(self.names)) for design in self.designs)
+        for start in range(0, r, batch):
+            X_batch = X[start:start + batch]
+            LCORE = self.evaluate(X_batch.reshape(-1, len(self.names))).reshape(len(X_batch), len(self.names) + 1, -1)
+            for d, design in enumerate(self.designs):
+                for t in range(len(X_batch)):
+                    effects[design].update(X_batch[t], LCORE[t, :, d])
+            if callback is not None:
+                callback(dict((design, e.indices()) for design, e in effects.items()))
+        return dict((design, e.indices()) for design, e in effects.items())
+
+    def sobol(self, n = 256, batch = 16, seed = None, callback = None):
+        '''
+        n : number of base samples (n (k + 2) points), evaluated batch base samples at a time
+        callback : optional function (indices) called after each batch with the dictionary design -> DataFrame
+
+        returns the dictionary design -> DataFrame of the Sobol indices
+        '''
+        k = len(self.names)
+        A, B = sobol_sample(k, n, seed)
+        indices = dict((design, SobolIndices(self.names)) for design in self.designs)
+        for start in range(0, n, batch):
+            A_batch, B_batch = A[start:start + batch], B[start:start + batch]
+            #rows of a base sample: A, B, AB_1 ... AB_k
+            points = np.empty((len(A_batch), k + 2, k))
+            points[:, 0] = A_batch
+            points[:, 1] = B_batch
+            for i in range(k):
+                points[:, i + 2] = A_batch
+                points[:, i + 2, i] = B_batch[:, i]
+            LCORE = self.evaluate(points.reshape(-1, k)).reshape(len(A_batch), k + 2, -1)
+            for d, design in enumerate(self.designs):
+                for j in range(len(A_batch)):
+                    indices[design].update(LCORE[j, 0, d], LCORE[j, 1, d], LCORE[j, 2:, d])
+            if callback is not None:
+                callback(dict((design, s.indices()) for design, s in indices.items()))
+        return dict((design, s.indices()) for design, s in indices.items())
+
+    def info(self):
+        'number of points, of physics evaluations, of failed evaluations and share of the points answered by the cache'
+        return {'points': self.n_points * len(self.designs), 'evaluations': self.n_evaluated, 'failed': self.n_failed,
+                'cached[%]': (1 - self.n_evaluated / (self.n_points * len(self.designs))) * 100 if self.n_points > 0 else 0.0}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+
+def indices_frame(indices):
+    'one DataFrame of the indices of all the designs'
+    return pd.concat([df.assign(design = str(list(design))) for design, df in indices.items()], axis = 0).reset_index(drop = True)
+
+
+#%%
+if __name__ == "__main__":
+
+    warnings.filterwarnings('ignore')
+
+    parser = argparse.ArgumentParser(description = 'global sensitivity of the LCORE to model and economic parameters')
+    parser.add_argument('--design', type = int, nargs = 5, action = 'append', required = True, help = 'EL FC BESS Tank PV in grid units (repeatable)')
+    parser.add_argument('--data', default = 'df_load_and_power.pkl')
+    parser.add_argument('--prices', default = 'prices_excel.xlsx')
+    parser.add_argument('--year', type = int, default = 2020, help = 'price scenario (2020, 2030, 2050)')
+    parser.add_argument('--method', default = 'morris', choices = ['morris', 'sobol'])
+    parser.add_argument('--n', type = int, default = 20, help = 'Morris trajectories or Sobol base samples')
+    parser.add_argument('--batch', type = int, default = 4, help = 'trajectories or base samples of each parallel batch')
+    parser.add_argument('--parameters', nargs = '+', default = None, help = 'varied parameters (default all)')
+    parser.add_argument('--seed', type = int, default = None)
+    parser.add_argument('--workers', type = int, default = -1)
+    parser.add_argument('--journal', default = None, help = 'jsonl file of the evaluated physics (resume)')
+    parser.add_argument('--output', default = 'sensitivity.csv', help = 'csv file of the indices, rewritten after each batch')
+    parser.add_argument('--max-failed', type = float, default = 0.05, help = 'largest share of failed evaluations')
+    args = parser.parse_args()
+
+    with open(args.data, 'rb') as f:
+        df_data = pickle.load(f)
+
+    driver = SensitivityDriver(df_data, scenario_setup(args.year, args.prices), args.design, args.parameters,
+                               workers = args.workers, journal = args.journal, max_failed = args.max_failed)
+    t_start = time.perf_counter()
+
+    def progress(indices):
+        indices_frame(indices).to_csv(args.output, sep = ';', index = False)
+        info = driver.info()
+        print(str(info['points']) + ' points, ' + str(info['evaluations']) + ' simulations (' +
+              str(round(info['cached[%]'], 1)) + ' % cached), ' + str(info['failed']) + ' failed, ' +
+              str(round(time.perf_counter() - t_start)) + ' s', flush = True)
+
+    try:
+        if args.method == 'morris':
+            indices = driver.morris(args.n, batch = args.batch, seed = args.seed, callback = progress)
+        else:
+            indices = driver.sobol(args.n, batch = args.batch, seed = args.seed, callback = progress)
+    finally:
+        driver.close()
+
+    pd.set_option('display.width', 200)
+    print(indices_frame(indices).to_string(index = False))
@@ -0,0 +1,94 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import json
+import os
+from collections import defaultdict
+from time import perf_counter
+
+import pandas as pd
+
+
+'''
+Optional instrumentation of the simulations: stage timings and event counters
+
+- the simulations take profiler = None (default, no instrumentation) or a SimProfiler
+- stage timings are accumulated with lap(stage, t0) calls placed between the stages of the dispatch loop
+- events (branches of the dispatch logic) are counted with count(event)
+- stages of the LCORE evaluation pipeline are prefixed with 'eval/' (they contain the stages of the simulations)
+- reports of many evaluations (for example the workers of a DE run) are appended to a JSONL file
+  and aggregated with aggregate_profiles
+
+'''
+
+class SimProfiler:
+
+    def __init__(self, detail = True):
+        'detail : if False only the stages of the LCORE evaluation are recorded, not the dispatch loop'
+        self.detail = detail
+        self.times = defaultdict(float)     # [s] accumulated time of each stage
+        self.counts = defaultdict(int)      # number of occurrences of each event
+
+    def lap(self, stage, t0):
+        'adds the time elapsed since t0 to the stage, returns the current time (start of the next stage)'
+        t1 = perf_counter()
+        self.times[stage] += t1 - t0
+        return t1
+
+    def count(self, event, n = 1):
+        self.counts[event] += n
+
+    def merge(self, other):
+        'adds the timings and counters of another profiler (or report)'
+        times = other.times if isinstance(other, SimProfiler) else other['times']
+        counts = other.counts if isinstance(other, SimProfiler) else other['counts']
+        for stage, t in times.items():
+            self.times[stage] += t
+        for event, n in counts.items():
+            self.counts[event] += n
+
+    def report(self):
+        return {'times': dict(self.times), 'counts': dict(self.counts)}
+
+    def dump(self, path, **info):
+        'appends the report to a JSONL file (one line per evaluation), info is saved with it (for example the design)'
+        record = dict(info, **self.report())
+        with open(path, 'a') as f:
+            f.write(json.dumps(record, default = float) + '\n')
+
+
+def aggregate_profiles(path):
+    '''
+    path : JSONL file written by SimProfiler.dump
+
+    returns the total profiler, a DataFrame of the stages (total time, share, mean time per evaluation)
+    and a DataFrame of the events (total and mean count per evaluation)
+    '''
+    total = SimProfiler()
+    n_eval = 0
+
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    total.merge(json.loads(line))
+                    n_eval = n_eval + 1
+
+    df_times = pd.DataFrame({'time[s]': pd.Series(total.times, dtype = float)})
+    #share of each stage within its level (simulation stages or 'eval/' stages)
+    level = pd.Series([stage.split('/')[0] if '/' in stage else 'sim' for stage in df_times.index], index = df_times.index)
+    df_times['share[%]'] = df_times['time[s]'] / df_times['time[s]'].groupby(level).transform('sum') * 100
+    df_times['mean_per_eval[s]'] = df_times['time[s]'] / max(n_eval, 1)
+    df_times = df_times.sort_values('time[s]', ascending = False)
+
+    df_counts = pd.DataFrame({'count': pd.Series(total.counts, dtype = float)})
+    df_counts['mean_per_eval'] = df_counts['count'] / max(n_eval, 1)
+
+    return total, df_times, df_counts
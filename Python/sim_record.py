@@ -0,0 +1,58 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import numpy as np
+import pandas as pd
+
+
+'''
+Result records of the simulations
+
+complete_sim and extra_simplified_sim return a NumPy structured row of shape (1,) instead of a one-row DataFrame:
+the fields are read and written as the columns were (output['E_H2_deficit[MWh]'][0], output['SOH_final'] = [x]),
+records are cheap to build, copy and pickle. The LCORE evaluation stacks the years in a structured array of
+YEAR_DTYPE and converts it to a DataFrame (to_frame) only for the full outputs.
+
+'''
+
+YEAR_FIELDS = ['BESS[MWh]', 'SOH_final', 'PV_power[kWp]', 'EL_n_cells', 'FC_n_cells', 'HP_tank[kg]', 'LP_tank[kg]',
+               'EL_CF[kg/MWh]', 'FC_CF[kg/MWh]', 'H2_prod_EL[kg]', 'H2_Comp [kg]',
+               'E_RES[MWh]', 'E_deficit_RES[MWh]', 'E_excess_RES[MWh]', 'RES_SC[%]',
+               'E_BESS_deficit[MWh]', 'E_BESS_excess[MWh]', 'BESS_SC[%]', 'E_to_H2[MWh]', 'E_comp[MWh]',
+               'E_H2_deficit[MWh]', 'E_H2_excess[MWh]', 'H2_SC[%]']
+
+#complete_sim: degradation state at the end of the year after the conversion factors
+COMPLETE_FIELDS = YEAR_FIELDS[:9] + ['EL_CF_fin', 'FC_CF_fin', 'EL_h_work', 'FC_h_work'] + YEAR_FIELDS[9:]
+
+YEAR_DTYPE = np.dtype([(name, np.float64) for name in YEAR_FIELDS])             # extra_simplified_sim, lifetime years
+COMPLETE_DTYPE = np.dtype([(name, np.float64) for name in COMPLETE_FIELDS])     # complete_sim
+
+
+def new_record(dtype = COMPLETE_DTYPE, n = 1):
+    'zero record(s) of the given fields'
+    return np.zeros(n, dtype = dtype)
+
+
+def year_record(output):
+    'fields of a year (YEAR_DTYPE) of a complete_sim record'
+    record = new_record(YEAR_DTYPE)
+    for name in YEAR_FIELDS:
+        record[name] = output[name]
+    return record
+
+
+def to_frame(records):
+    'DataFrame of a record, of an array of records or of a list of records (missing fields are NaN)'
+    if isinstance(records, pd.DataFrame):
+        return records
+    if isinstance(records, np.ndarray):
+        return pd.DataFrame.from_records(records)
+    return pd.concat([pd.DataFrame.from_records(r) if isinstance(r, np.ndarray) else r for r in records],
+                     axis = 0).reset_index(drop = True)
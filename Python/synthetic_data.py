@@ -0,0 +1,91 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import numpy as np
+import pandas as pd
+
+
+'''
+Deterministic synthetic input year
+
+- same columns of df_load_and_power.pkl: wind_power, PV_power, load [kW], temperature [°C], date
+- any number of days and any time resolution (kWh_factor = time steps per hour)
+- the same seed always returns the same dataframe
+
+'''
+
+def wind_power_curve(v, P_rated = 800, v_in = 3, v_rated = 12, v_out = 25):
+    'power curve of the wind turbine [kW] from the wind speed [m/s]'
+
+    P = np.where((v >= v_in) & (v < v_rated), P_rated * ((v - v_in) / (v_rated - v_in)) ** 3, 0)
+    P = np.where((v >= v_rated) & (v < v_out), P_rated, P)
+
+    return P
+
+
+def synthetic_year(n_days = 365, kWh_factor = 60, seed = 0, WT_power = 800, PV_power = 160, load_mean = 343, start = '2020-01-01'):
+    '''
+    n_days : number of simulated days
+    kWh_factor : time steps per hour (60 = minute data)
+    seed : seed of the random generator
+    WT_power : rated power of the wind turbine [kW]
+    PV_power : peak power of the reference PV plant [kWp]
+    load_mean : average load [kW] (343 kW ~ 3000 MWh/y)
+
+    returns the input dataframe of complete_sim and extra_simplified_sim
+    '''
+
+    rng = np.random.default_rng(seed)
+
+    n = int(n_days * 24 * kWh_factor)
+    t_h = np.arange(n) / kWh_factor                 # [h] time from the start
+    hour = t_h % 24                                 # [h] hour of the day
+    day = np.floor(t_h / 24)                        # day of the simulation
+    season = np.cos(2 * np.pi * (day + 10) / 365)   # +1 winter, -1 summer
+
+    'wind: hourly AR(1) wind speed with seasonal mean, interpolated to the time resolution'
+    n_h = int(np.ceil(n / kWh_factor)) + 1
+    phi = 0.95
+    noise = rng.normal(0, 1, n_h)
+    z = np.zeros(n_h)
+    for h in range(1, n_h):
+        z[h] = phi * z[h-1] + np.sqrt(1 - phi**2) * noise[h]
+    season_h = np.cos(2 * np.pi * (np.arange(n_h) / 24 + 10) / 365)
+    v_h = np.clip(7 + 1.5 * season_h + 3.5 * z, 0, None)                 # [m/s]
+    v = np.interp(t_h, np.arange(n_h), v_h)
+    P_wind = wind_power_curve(v, P_rated = WT_power)
+
+    'PV: clear sky daily bell with seasonal day length and daily cloudiness'
+    day_length = 12 - 3.5 * season                                       # [h]
+    sunrise = 12 - day_length / 2
+    x = (hour - sunrise) / day_length
+    clear_sky = np.where((x > 0) & (x < 1), np.sin(np.pi * np.clip(x, 0, 1)), 0) * (0.85 - 0.25 * season)
+    n_d = int(day[-1]) + 1
+    clouds_d = np.clip(rng.beta(2, 1.5, n_d), 0.1, 1)
+    P_pv = PV_power * clear_sky * clouds_d[day.astype(int)]
+
+    'load: daily profile with morning and evening peaks, seasonal modulation and noise'
+    daily = (1 + 0.25 * np.exp(-0.5 * ((hour - 9) / 2) ** 2)
+               + 0.45 * np.exp(-0.5 * ((hour - 20) / 2.5) ** 2)
+               - 0.25 * np.exp(-0.5 * ((hour - 4) / 2.5) ** 2))
+    P_load = load_mean / 1.12 * daily * (1 + 0.15 * season) * (1 + rng.normal(0, 0.03, n))
+
+    'temperature: seasonal and daily sinusoids with daily anomaly'
+    anomaly_d = rng.normal(0, 2, n_d)
+    T_ext = 15 - 8 * season - 4 * np.cos(2 * np.pi * (hour - 3) / 24) + anomaly_d[day.astype(int)]
+
+    df_data = pd.DataFrame()
+    df_data['date'] = pd.date_range(start, periods = n, freq = pd.Timedelta(hours = 1 / kWh_factor))
+    df_data['wind_power'] = P_wind
+    df_data['PV_power'] = P_pv
+    df_data['load'] = P_load
+    df_data['temperature'] = T_ext
+
+    return df_data
@@ -0,0 +1,138 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+from complete_simulation import complete_sim
+from early_termination import DeficitBoundExceeded
+from parallel_in_time import split_blocks, combine_outputs
+from res_cache import data_hash, RES_COLUMNS
+
+
+'''
+Trajectory-prefix reuse for designs that differ only in the HP tank size
+
+The HP tank size enters complete_sim only through the initial level (10 % of the tank) and the two limits of the
+tank: full (H2_to_c + H2_buffer > tank) and empty (H2_buffer + H2_lp_buffer < FC_H2_req). With a tank larger by
+dT the tank level is shifted by 0.1 dT and every other quantity is the same, until the first step where one of
+the limits is active for either tank: the room left at the full-tank check grows by 0.9 dT, the hydrogen left at
+the empty-tank check by 0.1 dT.
+
+- TankCheckpoints simulates the year in blocks of interval_days and keeps, for each design without the tank
+  (input data, EL, FC, BESS, PV), the state at the start of each block (checkpoints), the block outputs and the
+  smallest margins of the tank limits in each block
+- a new tank size takes the blocks of the stored trajectory before the first block where its shifted margins
+  become negative and resumes the simulation from the checkpoint at the start of that block
+- the result is the one of complete_sim apart from the rounding of the sums of the blocks and of the shifted
+  tank level
+
+'''
+
+def _data_key(df_data):
+    'hash of the input data, temperature included (EL and FC thermal model), computed once per dataframe'
+    return data_hash(df_data, RES_COLUMNS + ('temperature',))
+
+
+def divergence_block(headroom, reserve, dT):
+    '''
+    headroom, reserve : smallest margins of the full and empty tank limits in each block of the stored trajectory [kg]
+    dT : tank size of the new design - tank size of the stored trajectory [kg]
+
+    returns the first block where the trajectories can differ (number of blocks if none)
+    '''
+    diverged = (np.asarray(headroom) < max(0, -0.9 * dT)) | (np.asarray(reserve) < max(0, -0.1 * dT))
+    return int(np.argmax(diverged)) if diverged.any() else len(diverged)
+
+
+class TankCheckpoints:
+    '''
+    interval_days : days between two checkpoints
+    max_entries : stored trajectories (least recently used dropped first)
+
+    simulate(df_data, s) is used as complete_sim (first_year_sim of LCORE_evaluation)
+    '''
+
+    def __init__(self, interval_days = 1, max_entries = 64):
+        self.interval_days = interval_days
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.n_runs = 0
+        self.n_hits = 0
+        self.steps_total = 0
+        self.steps_reused = 0
+
+    def _blocks(self, df_data):
+        n_days = int(np.ceil(len(df_data) / (24 * 60)))
+        return split_blocks(len(df_data), int(np.ceil(n_days / self.interval_days)))
+
+    def simulate(self, df_data, s, profiler = None, E_deficit_max = None):
+        '''
+        same inputs and output of complete_sim (with a profiler the design is simulated by complete_sim)
+        '''
+        if profiler is not None:
+            return complete_sim(df_data, s, profiler = profiler, E_deficit_max = E_deficit_max)
+
+        key = (_data_key(df_data), s[0], s[1], s[2], s[4])
+        blocks = self._blocks(df_data)
+        tank = s[3]
+
+        'blocks taken from the stored trajectory, shifted to the new tank'
+        reused = []
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            dT = tank - entry['tank']
+            k = divergence_block([b['headroom'] for b in entry['blocks']], [b['reserve'] for b in entry['blocks']], dT)
+            for block in entry['blocks'][:k]:
+                reused.append({'start': dict(block['start'], H2_hp = block['start']['H2_hp'] + 0.1 * dT) if block['start'] else {},
+                               'output': block['output'],
+                               'end': dict(block['end'], H2_hp = block['end']['H2_hp'] + 0.1 * dT),
+                               'headroom': block['headroom'] + 0.9 * dT,
+                               'reserve': block['reserve'] + 0.1 * dT})
+            if k > 0:
+                self.n_hits = self.n_hits + 1
+                self.steps_reused = self.steps_reused + int(blocks[k - 1][1])
+
+        'simulation of the following blocks from the last checkpoint'
+        new_blocks = list(reused)
+        E_deficit = sum(b['output']['E_H2_deficit[MWh]'][0] for b in reused)
+        try:
+            for start, stop in blocks[len(reused):]:
+                begin = dict(new_blocks[-1]['end']) if len(new_blocks) > 0 else {}
+                state = dict(begin)
+                E_max = E_deficit_max - E_deficit if E_deficit_max is not None else None
+                try:
+                    output = complete_sim(df_data.iloc[start:stop].reset_index(drop = True), s,
+                                          E_deficit_max = E_max, state = state)
+                except DeficitBoundExceeded as e:
+                    raise DeficitBoundExceeded(E_deficit + e.E_deficit, start + e.step)
+                E_deficit = E_deficit + output['E_H2_deficit[MWh]'][0]
+                new_blocks.append({'start': begin, 'output': output, 'end': state,
+                                   'headroom': state['HP_headroom'], 'reserve': state['HP_reserve']})
+        finally:
+            #the completed blocks are a valid prefix even if the simulation was stopped early
+            if len(new_blocks) > len(reused) or entry is None:
+                self.entries[key] = {'tank': tank, 'blocks': new_blocks}
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last = False)
+            self.n_runs = self.n_runs + 1
+            self.steps_total = self.steps_total + len(df_data)
+
+        output = combine_outputs([b['output'] for b in new_blocks], [b['end'] for b in new_blocks])
+        output['HP_tank[kg]'] = [tank]
+        return output
+
+    def info(self):
+        'number of simulations, of simulations resumed from a checkpoint and share of the reused steps'
+        return {'runs': self.n_runs, 'hits': self.n_hits,
+                'reused_steps[%]': self.steps_reused / self.steps_total * 100 if self.steps_total > 0 else 0.0}
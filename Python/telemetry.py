@@ -0,0 +1,178 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import json
+import os
+import socket
+import time
+import traceback
+from collections import defaultdict
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+
+'''
+Optimizer telemetry written as JSONL (one JSON record per line)
+
+- 'evaluation' : design, objective, start/end time, process, latency split (first year, projection, LCORE)
+- 'error'      : design, error class, message and traceback of a failed evaluation
+- 'generation' : one parallel batch of the optimizer (a DE generation): wall time, evaluations/s,
+                 busy and idle time of the workers waiting at the generation barrier
+- 'cache'      : hits and misses of an evaluation cache
+
+Records are appended by every worker process to the same file, summarize_telemetry aggregates them.
+
+'''
+
+class Telemetry:
+
+    def __init__(self, path):
+        self.path = path
+        self.host = socket.gethostname()
+
+    def emit(self, record_type, **fields):
+        record = {'type': record_type, 'time': time.time(), 'pid': os.getpid(), 'host': self.host}
+        record.update(fields)
+        #single write per record: lines of different processes are not interleaved
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, default = float) + '\n')
+
+    def evaluation(self, config, objective, t_start, t_end, profiler = None, bounded = False):
+        '''
+        profiler : SimProfiler of the evaluation, its eval/ stages give the latency split
+        bounded : the evaluation was stopped early and the objective is a lower bound
+        '''
+        latency = {}
+        if profiler is not None:
+            latency = {stage.split('/')[1]: t for stage, t in profiler.times.items() if stage.startswith('eval/')}
+        self.emit('evaluation', config = config, objective = objective, t_start = t_start, t_end = t_end,
+                  latency = t_end - t_start, stages = latency, bounded = bounded)
+
+    def error(self, config, exception, t_start, t_end):
+        self.emit('error', config = config, t_start = t_start, t_end = t_end,
+                  error_class = type(exception).__name__, message = str(exception),
+                  traceback = ''.join(traceback.format_exception(type(exception), exception, exception.__traceback__)))
+
+    def cache(self, name, hits, misses):
+        self.emit('cache', name = name, hits = hits, misses = misses,
+                  hit_rate = hits / (hits + misses) if hits + misses > 0 else None)
+
+
+#%%
+'map-like callable for the workers of the optimizers, measuring the utilization at each generation barrier'
+
+def _timed_call(args):
+    func, x = args
+    t_start = time.time()
+    value = func(x)
+    return value, t_start, time.time(), os.getpid()
+
+
+class TelemetryMap:
+    '''
+    Pool of worker processes usable as workers = TelemetryMap(...) in differential_evolution (or nsga2).
+    Each call is a generation: the time between the end of the evaluations of a worker and the end of
+    the generation is idle time spent waiting at the barrier.
+    '''
+
+    def __init__(self, telemetry, processes = None):
+        self.telemetry = telemetry
+        self.processes = processes if processes is not None and processes > 0 else os.cpu_count()
+        self.pool = Pool(self.processes)
+        self.generation = 0
+
+    def __call__(self, func, iterable):
+        tasks = [(func, x) for x in iterable]
+
+        t0 = time.time()
+        out = self.pool.map(_timed_call, tasks)
+        t1 = time.time()
+
+        wall = t1 - t0
+        busy = defaultdict(float)
+        for _, t_start, t_end, pid in out:
+            busy[pid] += t_end - t_start
+
+        #workers that received no task are idle for the whole generation
+        busy_total = sum(busy.values())
+        idle_total = max(self.processes * wall - busy_total, 0)
+
+        self.generation = self.generation + 1
+        self.telemetry.emit('generation', generation = self.generation, n_eval = len(tasks), wall = wall,
+                            eval_per_s = len(tasks) / wall if wall > 0 else None,
+                            n_workers = self.processes, workers_used = len(busy),
+                            busy = busy_total, idle = idle_total,
+                            utilization = busy_total / (self.processes * wall) if wall > 0 else None,
+                            slowest = max(t_end - t_start for _, t_start, t_end, _ in out) if len(out) > 0 else None)
+
+        return [value for value, _, _, _ in out]
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+#%%
+def summarize_telemetry(path):
+    '''
+    path : JSONL telemetry file
+
+    returns a dictionary with evaluations/s, latency statistics (total and per stage), worker utilization,
+    cache hit rates and error counts per class
+    '''
+    records = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                records[record['type']].append(record)
+
+    summary = {}
+
+    evals = records['evaluation']
+    errors = records['error']
+    if len(evals) + len(errors) > 0:
+        t_first = min(r['t_start'] for r in evals + errors)
+        t_last = max(r['t_end'] for r in evals + errors)
+        summary['n_eval'] = len(evals)
+        summary['n_error'] = len(errors)
+        summary['eval_per_s'] = (len(evals) + len(errors)) / (t_last - t_first) if t_last > t_first else None
+        summary['n_bounded'] = sum(1 for r in evals if r.get('bounded', False))
+
+    if len(evals) > 0:
+        df_lat = pd.DataFrame([dict(r['stages'], total = r['latency']) for r in evals])
+        summary['latency[s]'] = df_lat.describe(percentiles = [0.5, 0.9, 0.99]).T
+
+    gens = records['generation']
+    if len(gens) > 0:
+        df_gen = pd.DataFrame(gens)
+        summary['generations'] = len(gens)
+        summary['utilization'] = df_gen['busy'].sum() / (df_gen['n_workers'] * df_gen['wall']).sum()
+        summary['idle[s]'] = df_gen['idle'].sum()
+        summary['straggler_ratio'] = np.mean(df_gen['slowest'] / (df_gen['busy'] / df_gen['n_eval']))
+
+    caches = records['cache']
+    if len(caches) > 0:
+        #counters are cumulative in each process: last record of each process (of each node)
+        df_cache = pd.DataFrame(caches).groupby(['name', 'host', 'pid'])[['hits', 'misses']].last().groupby('name').sum()
+        summary['cache_hit_rate'] = (df_cache['hits'] / (df_cache['hits'] + df_cache['misses'])).to_dict()
+
+    if len(errors) > 0:
+        summary['errors'] = pd.Series([r['error_class'] for r in errors]).value_counts().to_dict()
+
+    return summary
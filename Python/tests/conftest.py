@@ -0,0 +1,32 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import os
+import sys
+import warnings
+
+import pytest
+
+'''
+Common setup of the tests: the modules of the model are imported from the Python folder and the tests run
+from there, where scenario_setup finds prices_excel.xlsx. The inputs are short synthetic years
+(synthetic_data.py), no measured data is needed.
+'''
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PYTHON_DIR)
+
+
+@pytest.fixture(autouse = True)
+def python_dir(monkeypatch):
+    monkeypatch.chdir(PYTHON_DIR)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        yield
@@ -0,0 +1,54 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from async_optimizer import async_de
+
+'''
+Failed evaluations of async_de: an exception of the objective is told as an infinite objective and counted,
+the search goes on with the other designs in this process, in a pool of processes and on an executor.
+'''
+
+BOUNDS = [(0, 10), (0, 10)]
+
+
+def _objective(x):
+    'quadratic with its minimum in (3, 7), the designs with x[0] == 5 fail'
+    if x[0] == 5:
+        raise ValueError('failed design')
+    return (x[0] - 3) ** 2 + (x[1] - 7) ** 2
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_failures_do_not_stop_the_run(workers):
+    result = async_de(_objective, BOUNDS, maxfev = 300, seed = 0, workers = workers)
+
+    assert result.n_failed > 0
+    assert list(result.x) == [3, 7]
+    assert result.fun == 0
+
+
+def test_failures_on_an_executor():
+    with ThreadPoolExecutor(2) as executor:
+        result = async_de(_objective, BOUNDS, maxfev = 300, seed = 0, workers = executor, n_workers = 2)
+
+    assert result.n_failed > 0
+    assert list(result.x) == [3, 7]
+    assert np.isinf(result.population_energies).sum() <= result.n_failed
+
+
+def test_executor_needs_n_workers():
+    with ThreadPoolExecutor(2) as executor:
+        with pytest.raises(ValueError):
+            async_de(_objective, BOUNDS, workers = executor)
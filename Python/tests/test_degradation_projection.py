@@ -0,0 +1,103 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.optimize import curve_fit
+
+from complete_simulation import complete_sim
+from degradation_projection import project_degradation
+from equivalence import DESIGNS
+from sim_record import to_frame
+from synthetic_data import synthetic_year
+
+'''
+project_degradation gives the lists of the per-design curve_fit projection it replaced (_curve_fit_projection,
+the projection of LCORE_minimizer in main.py before degradation_projection.py), for single designs and batches.
+'''
+
+#first-year outputs: slow and fast battery fade, EL conversion factors reaching the end of life, no hydrogen
+FIRST_YEARS = pd.DataFrame({'SOH_final':     [0.995, 0.97, 0.9, 0.82, 0.95],
+                            'BESS[MWh]':     [0.5, 2.0, 5.0, 12.0, 1.0],
+                            'EL_CF_fin':     [0.01795, 0.0176, 0.0172, 0.0168, 0.018],
+                            'EL_CF[kg/MWh]': [17.9, 17.7, 17.4, 17.2, 0.0],
+                            'FC_CF[kg/MWh]': [59.5, 60.2, 61.0, 62.5, 0.0],
+                            'EL_h_work':     [3000.0, 4500.0, 6000.0, 7000.0, 0.0],
+                            'FC_h_work':     [1000.0, 1500.0, 2500.0, 3000.0, 0.0]})
+
+
+def _curve_fit_projection(out):
+    'Capacity, EL_CF and FC_CF lists (20 years) and lifetimes of the curve_fit projection of one first-year output'
+    lifetimes = {}
+
+    SOHy = out['SOH_final']
+    corr = max(-5.43e-07 * out['BESS[MWh]'] + 0.00763, 0)
+    a = curve_fit(lambda x, a: a * x ** 1.06 + 1, [0, 0.5, 1], [1, (1 + SOHy) / 2 + corr, SOHy])[0][0]
+    y_fit = [a * x ** 1.06 + 1 for x in np.arange(0, 11)]
+    SOH_list = [y for y in y_fit[:10] if y > 0.7]
+    SOH_list_avg = [(y_fit[i] + y_fit[i + 1]) / 2 for i in range(10) if y_fit[i] > 0.7]
+    lifetimes['BESS'] = len(SOH_list)
+    SOH_list20 = (SOH_list * int(np.ceil(20 / lifetimes['BESS'])))[:21]
+    Capacity_list = [item * out['BESS[MWh]'] for item in (SOH_list_avg * int(np.ceil(20 / lifetimes['BESS'])))[:21]]
+
+    if out['EL_h_work'] == 0 or out['FC_h_work'] == 0:
+        lifetimes['EL'] = 10
+        EL_CF_list = [18 / 1000] * 20
+        lifetimes['FC'] = 10
+        FC_CF_list = [59 / 1000] * 20
+    else:
+        EL_CF_lim = 18 / 106 / (2.3 * 5000 / 1000000)
+        m, q = curve_fit(lambda x, m, q: m * x + q, [-1, 0], [18, out['EL_CF_fin'] * 1000])[0]
+        EL_CF_fin_list = [y for y in [m * x + q for x in np.arange(0, 10)] if y > EL_CF_lim]
+        lifetimes['EL'] = len(EL_CF_fin_list)
+        EL_CF_fin_list20 = (EL_CF_fin_list * int(np.ceil(20 / lifetimes['EL'])))[:21]
+        y_p = out['EL_CF_fin'] * 1000 - out['EL_CF[kg/MWh]']
+        DFC_EL_list = [1.1 * (x - SOHy) + y_p for x in SOH_list20]
+        #years of the analysis only: the 21st item of the list raised IndexError with a 10-year battery
+        EL_CF_list = [EL_CF_fin_list20[i] - DFC_EL_list[i] for i in range(20)]
+
+        FC_CF_lim = 59 / 74 / (46.2 * 230 / 1000)
+        a = 700.23 * np.exp(out['BESS[MWh]'] / 1000 * -0.386) / 1000
+        FC_CF_list1 = [y for y in [a * x ** 1.25 + out['FC_CF[kg/MWh]'] for x in np.arange(0, 10)] if y > FC_CF_lim]
+        lifetimes['FC'] = len(FC_CF_list1)
+        FC_CF_list = (FC_CF_list1 * int(np.ceil(20 / lifetimes['FC'])))[:21]
+
+    return {'Capacity': Capacity_list[:20], 'EL_CF': EL_CF_list[:20], 'FC_CF': FC_CF_list[:20], 'lifetimes': lifetimes}
+
+
+def _assert_same(projection, outputs):
+    for n, (_, out) in enumerate(outputs.iterrows()):
+        expected = _curve_fit_projection(out)
+        for name in ('Capacity', 'EL_CF', 'FC_CF'):
+            np.testing.assert_allclose(projection[name][n], expected[name], rtol = 1e-6, err_msg = name)
+        for component, life in expected['lifetimes'].items():
+            assert projection['lifetimes'][component][n] == life, component
+
+
+def test_batch_matches_curve_fit():
+    projection = project_degradation(FIRST_YEARS)
+    _assert_same(projection, FIRST_YEARS)
+
+    #the cases reach the end of life of the battery and of the EL before 10 years
+    assert projection['lifetimes']['BESS'].min() < 10
+    assert projection['lifetimes']['EL'].min() < 10
+
+
+@pytest.mark.parametrize('n', range(len(FIRST_YEARS)))
+def test_single_design_matches_curve_fit(n):
+    out = FIRST_YEARS.iloc[n]
+    _assert_same(project_degradation(dict(out)), FIRST_YEARS.iloc[[n]])
+
+
+def test_simulated_first_years():
+    df_data = synthetic_year(2, seed = 0)
+    outputs = pd.concat([to_frame(complete_sim(df_data, list(s))) for s in DESIGNS.values()]).reset_index(drop = True)
+    _assert_same(project_degradation(outputs), outputs)
@@ -0,0 +1,60 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from complete_simulation import complete_sim
+from dispatch_engine import COMPLETE, SIMPLIFIED, dispatch
+from equivalence import DESIGNS
+from extra_simplified_simulation import extra_simplified_sim
+from sim_record import to_frame
+from synthetic_data import synthetic_year
+
+'''
+The single dispatch engine reproduces the two original dispatch loops: data/baseline_dispatch.csv holds the
+outputs of the original complete_sim and extra_simplified_sim (before dispatch_engine.py) on synthetic_year(2,
+seed = 0) for the designs of equivalence.DESIGNS, the extra simplified runs with 0.9 BESS and the conversion
+factors 18.5 / 1000 and 61 / 1000 kg/kWh (fixture_corpus).
+'''
+
+BASELINE = pd.read_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'baseline_dispatch.csv'), sep = ';')
+
+
+@pytest.fixture(scope = 'module')
+def df_data():
+    return synthetic_year(2, seed = 0)
+
+
+def _compare(output, engine, design):
+    expected = BASELINE[(BASELINE['engine'] == engine) & (BASELINE['design'] == design)].iloc[0]
+    output = to_frame(output).iloc[0]
+    for col in BASELINE.columns[2:]:
+        if np.isnan(expected[col]):
+            continue        #columns of the complete record only
+        np.testing.assert_allclose(float(output[col]), expected[col], rtol = 1e-12, atol = 1e-12, err_msg = col)
+
+
+@pytest.mark.parametrize('design', list(DESIGNS))
+def test_complete_fidelity_matches_baseline(df_data, design):
+    s = DESIGNS[design]
+    _compare(dispatch(df_data, list(s), COMPLETE), 'complete_sim', design)
+    _compare(complete_sim(df_data, list(s)), 'complete_sim', design)
+
+
+@pytest.mark.parametrize('design', list(DESIGNS))
+def test_simplified_fidelity_matches_baseline(df_data, design):
+    s = DESIGNS[design]
+    args = (0.9 * s[2], 18.5 / 1000, 61 / 1000)
+    _compare(dispatch(df_data, list(s), SIMPLIFIED, *args), 'extra_simplified_sim', design)
+    _compare(extra_simplified_sim(df_data, list(s), *args), 'extra_simplified_sim', design)
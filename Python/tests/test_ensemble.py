@@ -0,0 +1,66 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import numpy as np
+import pytest
+
+from ensemble import P2Quantile, StreamingStats
+
+'''
+Accuracy of the streaming statistics of the ensembles: P2Quantile is exact up to its stored values and then
+within 0.01 of the probability of the quantile (share of the values below the estimate) on skewed and
+symmetric samples, StreamingStats gives the moments of numpy and counts the failed values.
+'''
+
+DISTRIBUTIONS = ['normal', 'lognormal', 'uniform', 'exponential']
+
+
+@pytest.mark.parametrize('p', [0.05, 0.5, 0.95])
+def test_exact_up_to_the_stored_values(p):
+    x = np.random.default_rng(0).normal(size = 64)
+    estimator = P2Quantile(p, exact = 64)
+    for v in x:
+        estimator.update(v)
+    assert estimator.value() == pytest.approx(np.quantile(x, p), rel = 1e-12)
+
+
+@pytest.mark.parametrize('distribution', DISTRIBUTIONS)
+@pytest.mark.parametrize('p', [0.05, 0.5, 0.9, 0.95])
+def test_P2_accuracy(distribution, p):
+    x = getattr(np.random.default_rng(1), distribution)(size = 5000)
+    estimator = P2Quantile(p)
+    for v in x:
+        estimator.update(v)
+
+    assert abs(np.mean(x <= estimator.value()) - p) < 0.01
+    assert np.quantile(x, p - 0.01) <= estimator.value() <= np.quantile(x, p + 0.01)
+
+
+def test_P2_probability_bounds():
+    with pytest.raises(ValueError):
+        P2Quantile(1.0)
+
+
+def test_streaming_stats():
+    x = np.random.default_rng(2).lognormal(size = 2000)
+    stats = StreamingStats(quantiles = (0.1, 0.5))
+    for v in x:
+        stats.update(v)
+    stats.update(np.nan)
+    stats.update(np.inf)
+
+    summary = stats.summary()
+    assert summary['n'] == len(x)
+    assert summary['failed'] == 2
+    assert summary['mean'] == pytest.approx(np.mean(x), rel = 1e-12)
+    assert summary['std'] == pytest.approx(np.std(x, ddof = 1), rel = 1e-9)
+    assert (summary['min'], summary['max']) == (np.min(x), np.max(x))
+    assert abs(np.mean(x <= summary['q50']) - 0.5) < 0.01
+    assert abs(np.mean(x <= summary['q10']) - 0.1) < 0.01
@@ -0,0 +1,41 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import pytest
+
+from equivalence import ENGINES, equivalence_report, fixture_corpus
+
+'''
+Every candidate engine registered in equivalence.ENGINES must reproduce its reference on the fixture corpus
+(two synthetic days of each design) within the default tolerances of equivalence_report.
+'''
+
+CANDIDATES = [(engine, name) for engine, spec in ENGINES.items() for name in spec['candidates']]
+
+
+@pytest.mark.parametrize('engine, name', CANDIDATES)
+def test_candidate_matches_reference(engine, name):
+    spec = ENGINES[engine]
+    df_cases, df_columns = equivalence_report(spec['reference'], spec['candidates'][name],
+                                              fixture_corpus(engine, n_days = 2))
+
+    assert len(df_cases) > 0
+    assert (df_cases['n_failed'] == 0).all()
+    assert df_cases['passed'].all(), df_cases.to_string()
+
+
+def test_tank_reuse_candidate_reuses_trajectories():
+    #the large_tank case resumes from the stored trajectory of the large case
+    candidate = type(ENGINES['LCORE']['candidates']['tank_reuse'])()
+    df_cases, df_columns = equivalence_report(ENGINES['LCORE']['reference'], candidate,
+                                              fixture_corpus('LCORE', n_days = 2))
+
+    assert df_cases['passed'].all()
+    assert candidate.checkpoints.info()['hits'] >= 1
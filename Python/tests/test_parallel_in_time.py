@@ -0,0 +1,53 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import numpy as np
+import pytest
+
+from equivalence import DESIGNS
+from extra_simplified_simulation import extra_simplified_sim
+from parallel_in_time import pit_extra_simplified_sim
+from sim_record import to_frame
+from synthetic_data import synthetic_year
+
+'''
+pit_extra_simplified_sim gives the output of the sequential extra_simplified_sim for any number of blocks, with the
+blocks run in this process, in a pool of processes or by a map-like callable.
+'''
+
+
+@pytest.fixture(scope = 'module')
+def df_data():
+    return synthetic_year(4, seed = 0)
+
+
+def _assert_same(output, expected):
+    output, expected = to_frame(output).iloc[0], to_frame(expected).iloc[0]
+    for col in expected.index:
+        np.testing.assert_allclose(float(output[col]), float(expected[col]), rtol = 1e-9, atol = 1e-9, err_msg = col)
+
+
+@pytest.mark.parametrize('design', list(DESIGNS))
+@pytest.mark.parametrize('n_blocks', [1, 2, 4])
+def test_matches_sequential_run(df_data, design, n_blocks):
+    s = DESIGNS[design]
+    args = (0.9 * s[2], 18.5 / 1000, 61 / 1000)
+    output, info = pit_extra_simplified_sim(df_data, list(s), *args, n_blocks = n_blocks, workers = 1, full_output = True)
+
+    _assert_same(output, extra_simplified_sim(df_data, list(s), *args))
+    assert info['n_blocks'] == n_blocks
+
+
+@pytest.mark.parametrize('workers', [2, map])
+def test_workers(df_data, workers):
+    s = DESIGNS['base']
+    args = (0.9 * s[2], 18.5 / 1000, 61 / 1000)
+    _assert_same(pit_extra_simplified_sim(df_data, list(s), *args, n_blocks = 4, workers = workers),
+                 extra_simplified_sim(df_data, list(s), *args))
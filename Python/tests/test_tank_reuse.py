@@ -0,0 +1,50 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import numpy as np
+import pytest
+
+from complete_simulation import complete_sim
+from sim_record import to_frame
+from synthetic_data import synthetic_year
+from tank_reuse import TankCheckpoints
+
+'''
+TankCheckpoints.simulate gives the output of complete_sim for every HP tank size, whether the design is simulated
+from the start, resumed from a checkpoint of a stored trajectory or taken whole from it.
+'''
+
+#designs without the tank [EL cells, FC cells, BESS kWh, PV upgrade], HP tank sizes simulated in this order and
+#smallest number of resumed simulations (the small tank of the base design is full or empty on the first day)
+DESIGNS = {'base': ([20, 20, 500, 10], [300, 310, 290, 2000, 0, 300], 0),
+           'large': ([70, 90, 5000, 100], [2000, 2100, 1900, 20000, 2000], 3)}
+
+
+@pytest.fixture(scope = 'module')
+def df_data():
+    return synthetic_year(4, seed = 0)
+
+
+def _assert_same(output, expected):
+    output, expected = to_frame(output).iloc[0], to_frame(expected).iloc[0]
+    for col in expected.index:
+        np.testing.assert_allclose(float(output[col]), float(expected[col]), rtol = 1e-9, atol = 1e-9, err_msg = col)
+
+
+@pytest.mark.parametrize('name', list(DESIGNS))
+def test_simulate_matches_complete_sim(df_data, name):
+    (EL, FC, BESS, PV), tanks, min_hits = DESIGNS[name]
+    checkpoints = TankCheckpoints(interval_days = 1)
+    for tank in tanks:
+        s = [EL, FC, BESS, tank, PV]
+        _assert_same(checkpoints.simulate(df_data, s), complete_sim(df_data, s))
+
+    assert checkpoints.info()['runs'] == len(tanks)
+    assert checkpoints.info()['hits'] >= min_hits
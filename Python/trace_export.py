@@ -0,0 +1,187 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import json
+import os
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:         # optional dependency, only needed for fmt = 'parquet'
+    pa = None
+    pq = None
+
+
+'''
+Chunked columnar export of the time series of the simulations
+
+- the simulation calls step(...) once per time step with all the TRACE_COLUMNS (fixed order)
+- values are stored in a preallocated buffer of chunk_size rows, only the selected columns are kept
+- full buffers are written to disk as .npz shards (chunk_00000.npz, ...) or as row groups of one Parquet file
+- TraceReader reads back the columns lazily, one chunk at a time
+
+'''
+
+#columns of the trace, in the order of the arguments of TraceWriter.step
+TRACE_COLUMNS = ['P_RES[kW]', 'P_load[kW]', 'P_BESS[kW]', 'SOC', 'SOH',
+                 'P_BESS_excess[kW]', 'P_BESS_deficit[kW]',
+                 'EL_P[kW]', 'EL_H2[kg]', 'EL_T[C]', 'EL_CF[kg/kWh]',
+                 'FC_P[kW]', 'FC_H2[kg]', 'FC_T[C]', 'FC_CF[kg/kWh]',
+                 'H2_LP_tank[kg]', 'H2_HP_tank[kg]', 'P_compressor[kW]',
+                 'P_excess[kW]', 'P_deficit[kW]']
+
+
+class TraceWriter:
+
+    def __init__(self, path, columns = None, chunk_size = 2**16, float32 = False, fmt = 'npz'):
+        '''
+        path : output directory (npz shards) or file (parquet)
+        columns : subset of TRACE_COLUMNS to export (all if None)
+        chunk_size : rows per chunk (memory of the buffer = chunk_size x number of TRACE_COLUMNS)
+        float32 : downcast of the exported values
+        fmt : 'npz' or 'parquet' (requires pyarrow)
+        '''
+        if columns is None:
+            columns = TRACE_COLUMNS
+        for col in columns:
+            if col not in TRACE_COLUMNS:
+                raise ValueError('unknown trace column: ' + col)
+        if fmt not in ['npz', 'parquet']:
+            raise ValueError('trace format must be npz or parquet')
+        if fmt == 'parquet' and pa is None:
+            raise ImportError('pyarrow is required to export traces as parquet')
+
+        self.path = path
+        self.columns = list(columns)
+        self.col_index = [TRACE_COLUMNS.index(col) for col in self.columns]
+        self.chunk_size = int(chunk_size)
+        self.dtype = np.float32 if float32 else np.float64
+        self.fmt = fmt
+
+        self.buffer = np.empty((self.chunk_size, len(TRACE_COLUMNS)), dtype = np.float64)
+        self.n_buffer = 0
+        self.n_rows = 0
+        self.n_chunks = 0
+        self.closed = False
+
+        if fmt == 'npz':
+            os.makedirs(path, exist_ok = True)
+            self.parquet_writer = None
+        else:
+            schema = pa.schema([(col, pa.float32() if float32 else pa.float64()) for col in self.columns])
+            self.parquet_writer = pq.ParquetWriter(path, schema)
+
+    def step(self, *values):
+        'values of one time step, in the order of TRACE_COLUMNS'
+        self.buffer[self.n_buffer] = values
+        self.n_buffer = self.n_buffer + 1
+        if self.n_buffer == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.n_buffer == 0:
+            return
+
+        data = self.buffer[:self.n_buffer, self.col_index].astype(self.dtype)
+
+        if self.fmt == 'npz':
+            arrays = {'c' + str(j): data[:, j] for j in range(len(self.columns))}
+            np.savez(os.path.join(self.path, 'chunk_%05d.npz' % self.n_chunks), **arrays)
+        else:
+            table = pa.table({col: data[:, j] for j, col in enumerate(self.columns)})
+            self.parquet_writer.write_table(table)
+
+        self.n_rows = self.n_rows + self.n_buffer
+        self.n_chunks = self.n_chunks + 1
+        self.n_buffer = 0
+
+    def close(self):
+        if self.closed:
+            return
+        self.flush()
+        if self.fmt == 'npz':
+            meta = {'columns': self.columns, 'n_rows': self.n_rows, 'n_chunks': self.n_chunks,
+                    'chunk_size': self.chunk_size, 'dtype': np.dtype(self.dtype).name}
+            with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+                json.dump(meta, f, indent = 2)
+        else:
+            self.parquet_writer.close()
+        self.buffer = None
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class TraceReader:
+    '''
+    Lazy reader of an exported trace (npz directory or parquet file)
+
+    iter_chunks(columns) : yields one dict of arrays per chunk
+    read(columns, start, stop) : rows start:stop of the columns, loading only the chunks involved
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.fmt = 'npz' if os.path.isdir(path) else 'parquet'
+
+        if self.fmt == 'npz':
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            self.columns = meta['columns']
+            self.n_rows = meta['n_rows']
+            self.n_chunks = meta['n_chunks']
+            self.chunk_size = meta['chunk_size']
+        else:
+            if pq is None:
+                raise ImportError('pyarrow is required to read parquet traces')
+            self.parquet_file = pq.ParquetFile(path)
+            self.columns = self.parquet_file.schema_arrow.names
+            self.n_rows = self.parquet_file.metadata.num_rows
+            self.n_chunks = self.parquet_file.num_row_groups
+            self.chunk_size = self.parquet_file.metadata.row_group(0).num_rows if self.n_chunks > 0 else 0
+
+    def __len__(self):
+        return self.n_rows
+
+    def chunk(self, k, columns = None):
+        if columns is None:
+            columns = self.columns
+        if self.fmt == 'npz':
+            with np.load(os.path.join(self.path, 'chunk_%05d.npz' % k)) as data:
+                return {col: data['c' + str(self.columns.index(col))] for col in columns}
+        table = self.parquet_file.read_row_group(k, columns = list(columns))
+        return {col: table.column(col).to_numpy() for col in columns}
+
+    def iter_chunks(self, columns = None):
+        for k in range(self.n_chunks):
+            yield self.chunk(k, columns)
+
+    def read(self, columns = None, start = 0, stop = None):
+        if columns is None:
+            columns = self.columns
+        if stop is None or stop > self.n_rows:
+            stop = self.n_rows
+
+        parts = {col: [] for col in columns}
+        for k in range(start // self.chunk_size, (stop - 1) // self.chunk_size + 1 if stop > start else 0):
+            k_start = k * self.chunk_size
+            data = self.chunk(k, columns)
+            a = max(start - k_start, 0)
+            b = min(stop - k_start, len(data[columns[0]]))
+            for col in columns:
+                parts[col].append(data[col][a:b])
+
+        return {col: np.concatenate(parts[col]) if len(parts[col]) > 0 else np.zeros(0) for col in columns}
@@ -0,0 +1,176 @@
+"""
+Citation notice:
+
+If you use this model, please cite:
+F. Superchi, A. Moustakis, G. Pechlivanoglou and A. Bianchini, Applied Energy, vol. 377, Part D, p. 124645, 2025.
+"On the importance of degradation modeling for the robust design of hybrid energy systems including renewables and storage"
+https://doi.org/10.1016/j.apenergy.2024.124645
+
+"""
+
+import copy
+import json
+
+import numpy as np
+import pandas as pd
+from scipy.stats import qmc
+
+from LCORE_calculator import LCORE_function
+from res_cache import data_hash
+
+
+'''
+Warm start of the optimization from previous runs
+
+- EvaluationJournal saves the physics of each evaluated design (component sizes and yearly deficit energies):
+  they do not depend on the prices, the LCORE of a journaled design under a new cost scenario is
+  recomputed with LCORE_function without simulating it again (exact for the same input data)
+- prior designs are also read from the telemetry and profile logs (design and LCORE of each evaluation) and from
+  the output/pareto csv files of main.py, ranked after the re-priced ones with their stored LCORE
+- warm_start_population seeds part of the initial population of differential_evolution (init = ...) with the best
+  prior designs and fills the rest with Latin hypercube samples of the sizing lattice
+
+'''
+
+X_NAMES = ['EL', 'FC', 'BESS', 'Tank', 'PV']
+
+
+class EvaluationJournal:
+    '''
+    JSONL journal of the evaluated designs (one record per line, appended by every worker process)
+    '''
+
+    def __init__(self, path, df_data = None):
+        self.path = path
+        self.data = data_hash(df_data) if df_data is not None else None
+
+    def record(self, config, LCORE, df_output_years):
+        '''
+        config : design in grid units
+        df_output_years : yearly outputs of LCORE_evaluation (full_output = True)
+        '''
+        self.write(config, LCORE, df_output_years.attrs.get('sizes'), list(df_output_years['E_H2_deficit[MWh]']))
+
+    def write(self, config, LCORE, sizes, E_def):
+        'sizes : component sizes of LCORE_function, E_def : yearly deficit energies [MWh]'
+        record = {'config': [int(v) for v in config], 'LCORE': LCORE, 'data': self.data,
+                  'sizes': sizes, 'E_def': [float(e) for e in E_def]}
+        #single write per record: lines of different processes are not interleaved
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, default = float) + '\n')
+
+
+def _grid_from_csv(df, comp_dict):
+    'designs in grid units from the sizes of the output/pareto csv files'
+
+    X = np.column_stack([df['EL'] / comp_dict['EL']['res'],
+                         df['FC'] / comp_dict['FC']['res'],
+                         df['BESS'] / comp_dict['BESS']['res'],
+                         df['Tank'] / comp_dict['Tank']['res'],
+                         (df['PV'] / 160 - 1) * 16 / comp_dict['PV']['res']])
+    return np.round(X).astype(int)
+
+
+def load_prior(paths, comp_dict):
+    '''
+    paths : journals (EvaluationJournal), telemetry or profile JSONL logs, output or pareto csv files of main.py
+    comp_dict : sizing lattice of the scenario
+
+    returns a list of records with the design in grid units (config), the stored LCORE and, for the journals,
+    the physics (sizes, yearly deficits, input data hash)
+    '''
+    records = []
+
+    for path in paths:
+        if str(path).endswith('.csv'):
+            df = pd.read_csv(path, sep = ';', index_col = 0)
+            LCORE = df['LCORE'] if 'LCORE' in df.columns else [np.nan] * len(df)
+            for config, value in zip(_grid_from_csv(df, comp_dict), LCORE):
+                records.append({'config': tuple(config), 'LCORE': float(value), 'source': str(path)})
+            continue
+
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+
+                if 'E_def' in record:
+                    records.append({'config': tuple(record['config']), 'LCORE': record['LCORE'],
+                                    'sizes': record['sizes'], 'E_def': record['E_def'],
+                                    'data': record['data'], 'source': str(path)})
+                elif record.get('type') == 'evaluation' and not record.get('bounded', False):
+                    records.append({'config': tuple(record['config']), 'LCORE': record['objective'], 'source': str(path)})
+                elif 'config' in record and 'LCORE' in record:
+                    records.append({'config': tuple(record['config']), 'LCORE': record['LCORE'], 'source': str(path)})
+
+    return records
+
+
+def rank_prior(records, scenario, df_data = None):
+    '''
+    records : prior designs (load_prior)
+    scenario : new cost scenario (scenario_setup)
+    df_data : new input data, the re-priced LCORE is exact only for records of the same data
+
+    returns a DataFrame of the unique prior designs (grid units) with their LCORE under the new scenario where the
+    physics is available (repriced = True), otherwise the stored one; re-priced designs first, then by LCORE
+    '''
+    data = data_hash(df_data) if df_data is not None else None
+    components  = copy.deepcopy(scenario['components'])
+    electricity = copy.deepcopy(scenario['electricity'])
+    hydrogen    = copy.deepcopy(scenario['hydrogen'])
+
+    designs = {}
+    for record in records:
+        config = tuple(int(v) for v in record['config'])
+        if 'E_def' in record and record['sizes'] is not None:
+            row = {'LCORE': LCORE_function(record['sizes'], record['E_def'], components, electricity,
+                                           scenario['lifetime'], hydrogen, scenario['r']),
+                   'repriced': True, 'same_data': data is not None and record['data'] == data}
+        else:
+            row = {'LCORE': record['LCORE'], 'repriced': False, 'same_data': False}
+        row['source'] = record['source']
+
+        #one row per design: re-priced physics first, then the best stored LCORE
+        old = designs.get(config)
+        if old is None or (row['repriced'], row['same_data'], -row['LCORE']) > (old['repriced'], old['same_data'], -old['LCORE']):
+            designs[config] = row
+
+    df_prior = pd.DataFrame([dict(zip(X_NAMES, config), **row) for config, row in designs.items()],
+                            columns = X_NAMES + ['LCORE', 'repriced', 'same_data', 'source'])
+    df_prior = df_prior[np.isfinite(df_prior['LCORE'].astype(float))]
+
+    return df_prior.sort_values(['repriced', 'LCORE'], ascending = [False, True]).reset_index(drop = True)
+
+
+def warm_start_population(paths, bounds, scenario, n_pop, fraction = 0.5, df_data = None, seed = None):
+    '''
+    paths : prior runs (see load_prior)
+    bounds : list of (min, max) bounds of the decision variables (grid units)
+    scenario : new cost scenario (scenario_setup)
+    n_pop : size of the initial population (differential_evolution: popsize * number of variables)
+    fraction : share of the population seeded with the best prior designs
+    df_data : new input data (see rank_prior)
+
+    returns the (n_pop, number of variables) initial population for differential_evolution(init = ...)
+    '''
+    lo = np.array([int(np.ceil(b[0])) for b in bounds])
+    hi = np.array([int(np.floor(b[1])) for b in bounds])
+
+    df_prior = rank_prior(load_prior(paths, scenario['comp_dict']), scenario, df_data)
+    X_prior = df_prior[X_NAMES[:len(bounds)]].to_numpy(dtype = int)
+    X_prior = X_prior[np.all((X_prior >= lo) & (X_prior <= hi), axis = 1)]
+
+    population = [tuple(x) for x in X_prior[:int(fraction * n_pop)]]
+
+    'Latin hypercube samples of the lattice for the rest of the population, designs already present are skipped'
+    sampler = qmc.LatinHypercube(d = len(bounds), seed = seed)
+    n_lattice = np.prod(hi - lo + 1)
+    while len(population) < n_pop:
+        U = sampler.random(n_pop)
+        for x in np.minimum(lo + np.floor(U * (hi - lo + 1)), hi).astype(int):
+            if len(population) < n_pop and (tuple(x) not in population or len(population) >= n_lattice):
+                population.append(tuple(x))
+
+    return np.array(population, dtype = float)